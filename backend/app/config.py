@@ -8,6 +8,7 @@ class Config:
     # --- 1. Existing API Keys ---
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. a regional endpoint or a local stand-in (host:port)
     PAYMENT_UPI_ID = os.getenv("PAYMENT_UPI_ID", "yourname@upi") 
 
     # --- 2. GitHub Headers (Automated) ---
@@ -15,6 +16,13 @@ class Config:
         "Authorization": f"token {GITHUB_TOKEN}",
         "Accept": "application/vnd.github.com.v3+json"
     } if GITHUB_TOKEN else {}
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+    # Token pool for the rate-limit scheduler: GITHUB_TOKEN plus any extra
+    # comma-separated tokens in GITHUB_TOKENS (each has its own 5,000 req/h)
+    GITHUB_TOKENS = list(dict.fromkeys(filter(None, [GITHUB_TOKEN] + os.getenv("GITHUB_TOKENS", "").replace(" ", "").split(","))))
+    GITHUB_RATE_LIMIT_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", 50))  # calls kept back per token
+    GITHUB_RATE_LIMIT_MAX_WAIT = float(os.getenv("GITHUB_RATE_LIMIT_MAX_WAIT", 30))  # seconds to queue before shedding
 
     # --- 3. Google OAuth Configuration ---
     GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -45,7 +53,106 @@ class Config:
     # --- 6. RENDER KEEP-ALIVE CONFIGURATION (NEW) ---
     RENDER_EXTERNAL_URL = os.getenv("RENDER_EXTERNAL_URL")
     
-    # --- 7. Validation ---
+    # --- 7. Shared HTTP Client (Connection Pool) ---
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 20))  # 0 = no per-host cap
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))  # seconds
+    HTTP_ENABLE_HTTP2 = os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true"
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 20))
+    HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 10))
+
+    # --- 8. GitHub Response Cache (ETag / Conditional Requests) ---
+    GITHUB_CACHE_ENABLED = os.getenv("GITHUB_CACHE_ENABLED", "true").lower() == "true"
+    GITHUB_CACHE_PATH = os.getenv("GITHUB_CACHE_PATH", "cache/github_responses.sqlite3")
+    GITHUB_CACHE_MEMORY_MB = int(os.getenv("GITHUB_CACHE_MEMORY_MB", 64))
+    GITHUB_CACHE_DISK_MB = int(os.getenv("GITHUB_CACHE_DISK_MB", 512))
+    GITHUB_CACHE_MAX_ENTRY_MB = int(os.getenv("GITHUB_CACHE_MAX_ENTRY_MB", 8))
+
+    # --- 9. Analysis Result Cache (keyed on head commit SHA) ---
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", 256))
+
+    # --- 10. File Tree Walking (large monorepos) ---
+    TREE_MAX_ENTRIES = int(os.getenv("TREE_MAX_ENTRIES", 200000))
+    TREE_MAX_DEPTH = int(os.getenv("TREE_MAX_DEPTH", 32))
+    TREE_WALK_CONCURRENCY = int(os.getenv("TREE_WALK_CONCURRENCY", 8))
+
+    # --- 11. Fetch Backend ---
+    # "rest" = 3 parallel REST calls, "graphql" = one GraphQL v4 query (needs a token)
+    GITHUB_FETCH_MODE = os.getenv("GITHUB_FETCH_MODE", "rest").lower()
+    GITHUB_GRAPHQL_TREE_DEPTH = int(os.getenv("GITHUB_GRAPHQL_TREE_DEPTH", 6))  # deeper trees fall back to REST
+
+    # --- 12. Batch Scoring (/api/analyze/score-batch) ---
+    BATCH_SCORE_MAX_REPOS = int(os.getenv("BATCH_SCORE_MAX_REPOS", 500))
+    BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", 8))
+
+    # --- 13. Incremental Rescoring (GitHub compare API) ---
+    INCREMENTAL_SCORING_ENABLED = os.getenv("INCREMENTAL_SCORING_ENABLED", "true").lower() == "true"
+
+    # --- 14. Gemini Response Cache (keyed on a hash of the rendered prompt) ---
+    GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE_ENABLED", "true").lower() == "true"
+    GEMINI_CACHE_TTL_HOURS = float(os.getenv("GEMINI_CACHE_TTL_HOURS", 24 * 7))
+    GEMINI_CACHE_MEMORY_ENTRIES = int(os.getenv("GEMINI_CACHE_MEMORY_ENTRIES", 512))
+
+    # --- 15. Gemini Executor (concurrency, deadline, hedging, priority lanes) ---
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))
+    GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 30))  # Seconds, queueing included
+    GEMINI_USER_RESERVED_SLOTS = int(os.getenv("GEMINI_USER_RESERVED_SLOTS", 2))  # Never used by anonymous calls
+    GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 0))  # e.g. 95; 0 = no hedged requests
+    GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+
+    # --- 16. Gemini Prompt Budget ---
+    # Estimated tokens per prompt (instructions + README excerpt + file section)
+    GEMINI_PROMPT_TOKEN_BUDGET = int(os.getenv("GEMINI_PROMPT_TOKEN_BUDGET", 1500))
+
+    # --- 17. Gemini Streaming ---
+    # Read answers as they're generated: stream events early, keep the parts that parse
+    GEMINI_STREAMING = os.getenv("GEMINI_STREAMING", "true").lower() == "true"
+
+    # --- 18. Gemini Batch Prompts (AIService.analyze_code_quality_batch) ---
+    GEMINI_BATCH_TOKEN_BUDGET = int(os.getenv("GEMINI_BATCH_TOKEN_BUDGET", 6000))  # Estimated tokens per batched prompt
+    GEMINI_BATCH_REPO_TOKEN_BUDGET = int(os.getenv("GEMINI_BATCH_REPO_TOKEN_BUDGET", 600))  # Files + README per repo
+    GEMINI_BATCH_MAX_REPOS = int(os.getenv("GEMINI_BATCH_MAX_REPOS", 8))  # Per prompt; also bounds the answer length
+
+    # --- 19. Local Tech Stack Detection (manifests read from the repo, no Gemini) ---
+    STACK_DETECTION_ENABLED = os.getenv("STACK_DETECTION_ENABLED", "true").lower() == "true"
+    STACK_MAX_MANIFESTS = int(os.getenv("STACK_MAX_MANIFESTS", 10))  # Files fetched per analysis
+    STACK_FETCH_CONCURRENCY = int(os.getenv("STACK_FETCH_CONCURRENCY", 4))
+
+    # --- 20. Background Analysis Jobs (/api/analyze/jobs, queued in the database) ---
+    JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))  # Per process
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))  # Seconds between claims when idle
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))  # A job whose worker stops renewing is run again
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", 1000))  # New jobs are refused beyond this
+    JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 72))  # Finished jobs are deleted after this
+
+    # --- 21. Bulk Owner Analysis (/api/analyze/owner) ---
+    BULK_MAX_REPOS = int(os.getenv("BULK_MAX_REPOS", 300))  # Per request
+    BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 8))  # Repos fetched and scored at once
+    BULK_BATCH_WAIT = float(os.getenv("BULK_BATCH_WAIT", 0.5))  # Seconds a scored repo waits for others to share its prompt
+
+    # --- 22. Database Connection Pool (sync and async engines, each per process) ---
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))  # Connections kept open
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))  # Extra connections under load, closed when returned
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # Reconnect older connections (hosted Postgres drops idle ones)
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Test connections on checkout
+
+    # --- 23. Write-Behind Analysis Rows (history + result cache rows, inserted in bulk) ---
+    ANALYSIS_WRITE_BEHIND_ENABLED = os.getenv("ANALYSIS_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+    ANALYSIS_WRITE_BATCH_SIZE = int(os.getenv("ANALYSIS_WRITE_BATCH_SIZE", 100))  # Rows per INSERT (x9 bind parameters; Postgres allows 32767)
+    ANALYSIS_WRITE_INTERVAL = float(os.getenv("ANALYSIS_WRITE_INTERVAL", 1.0))  # Seconds between flushes
+    ANALYSIS_WRITE_MAX_PENDING = int(os.getenv("ANALYSIS_WRITE_MAX_PENDING", 5000))  # Queue bound: saving waits for a write, or drops the row if the database is down
+
+    # --- 24. Analysis History (/api/analyze/history) ---
+    HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 20))  # Analyses per page by default
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 100))  # Largest `limit` accepted
+
+    # --- 25. Validation ---
     if not GEMINI_API_KEY:
         print("WARNING: GEMINI_API_KEY is missing in .env")
     if not GOOGLE_CLIENT_ID or not GOOGLE_CLIENT_SECRET:
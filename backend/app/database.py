@@ -1,20 +1,68 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
+from app.config import Config
 
 load_dotenv()
 
 # Get the URL from .env
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Create the engine (the core connection)
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async drivers for the sync URL's database (asyncpg for Postgres, aiosqlite locally)
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_database_url(url: str):
+    """
+    DATABASE_URL with its async driver: postgresql://... -> postgresql+asyncpg://...,
+    sqlite://... -> sqlite+aiosqlite://... asyncpg takes `ssl` where libpq takes `sslmode`.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    if "sslmode" in url.query:
+        sslmode = url.query["sslmode"]
+        url = url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return url
+
+
+def pool_options(url) -> dict:
+    """
+    Pool settings from Config. In-memory SQLite keeps SQLAlchemy's default
+    single-connection pool, which takes no size options.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING,
+    }
+
+
+# Create the engine (the core connection). Used for table creation and by
+# code running in worker threads; request handlers use async_engine.
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
 
 # Create a Session factory (to talk to the DB)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The same database through an async driver: queries don't block the event loop.
+# Objects stay readable after commit (an expired attribute would need a
+# lazy load, which async sessions can't do implicitly).
+async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL),
+                                   **pool_options(SQLALCHEMY_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class for our database models
 Base = declarative_base()
 
@@ -24,4 +72,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Async variant of get_db, for `async def` routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
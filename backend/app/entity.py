@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -17,20 +17,95 @@ class User(Base):
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    # History listing (/api/analyze/history): a user's rows newest first, walked by keyset.
+    # On Postgres the listed columns are included, so pages come from the index alone.
+    __table_args__ = (Index("ix_analyses_user_history", "user_id", "created_at", "id",
+                            postgresql_include=["repo_name", "github_url", "overall_score", "commit_sha"]),)
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     github_url = Column(String)
     repo_name = Column(String)
+
+    # Head commit the analysis was computed for, plus the result cache lookup key
+    # (owner|repo|sha|scoring version|prompt version)
+    commit_sha = Column(String)
+    cache_key = Column(String, index=True)
     
     # Store the AI scores and summary
     overall_score = Column(Float)
     summary = Column(Text)
     
     # Store the full JSON result for caching (The Magic Column)
-    full_json_result = Column(JSON)
+    # Holds the complete AnalysisResult, served back by the result cache.
+    # Deferred: only queries that ask for it (undefer) load it; touching it otherwise raises
+    full_json_result = deferred(Column(JSON), raiseload=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship link back to user
-    owner = relationship("User", back_populates="analyses")
\ No newline at end of file
+    owner = relationship("User", back_populates="analyses")
+
+class RepoState(Base):
+    """
+    Per-repository scoring state from the last full tree download: the
+    feature counters and prompt file samples for `commit_sha`. Lets the next
+    analysis apply only the commit diff (incremental rescoring).
+    """
+    __tablename__ = "repo_states"
+
+    id = Column(Integer, primary_key=True, index=True)
+    repo_key = Column(String, unique=True, index=True)  # "owner/repo", lowercase
+    commit_sha = Column(String)
+    scoring_version = Column(String)
+    feature_state = Column(JSON)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class GeminiResponse(Base):
+    """
+    Persistent tier of the Gemini response cache: the parsed JSON answer for
+    one prompt, keyed on sha256(model name + rendered prompt).
+    """
+    __tablename__ = "gemini_responses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_hash = Column(String, unique=True, index=True)
+    model = Column(String)
+    response = Column(JSON)
+    expires_at = Column(Float, index=True)  # unix time
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AnalysisJob(Base):
+    """
+    One queued /api/analyze/jobs analysis (see JobQueue). Workers claim the
+    oldest available job of the best priority and hold it for a lease they
+    keep renewing; a job whose lease ran out (its worker died) is claimed
+    again.
+    """
+    __tablename__ = "analysis_jobs"
+    __table_args__ = (Index("ix_analysis_jobs_claim", "status", "priority", "available_at"),)
+
+    id = Column(String, primary_key=True)  # Random hex: job ids can't be guessed
+    status = Column(String, nullable=False)  # queued | running | done | failed
+    priority = Column(Integer, nullable=False)  # 0 = signed-in user, 1 = anonymous
+    available_at = Column(Float, nullable=False)  # unix time: enqueued, or when a retry is due
+
+    github_url = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    lane = Column(String, nullable=False)  # Gemini executor lane
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_by = Column(String)
+    locked_until = Column(Float)  # unix time the lease ends
+
+    result = Column(JSON)  # The AnalysisResult, once done
+    error = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
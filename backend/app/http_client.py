@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+from app.config import Config
+
+# One pooled client for the whole app. It is opened by the FastAPI lifespan
+# (see main.py) and shared by every service that talks to GitHub / Google,
+# so connections (DNS + TCP + TLS) are reused across requests.
+_client = None
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the normal httpx transport and caps how many requests may be
+    in flight to a single host at once. httpx only limits the pool as a
+    whole, so without this one slow upstream could take every connection.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores = {}
+
+    def _semaphore_for(self, host: str):
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self._max_per_host)
+        return self._semaphores[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        semaphore = self._semaphore_for(request.url.host)
+        await semaphore.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        # Hold the slot until the body has been read (or the stream closed)
+        response.stream = _ReleasingStream(response.stream, semaphore)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, semaphore: asyncio.Semaphore):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client(verify=True) -> httpx.AsyncClient:
+    """Builds the pooled AsyncClient from the HTTP_* settings in Config."""
+    http2 = Config.HTTP_ENABLE_HTTP2
+    if http2 and not _http2_available():
+        print("WARNING: HTTP_ENABLE_HTTP2 is set but 'h2' is not installed. Falling back to HTTP/1.1")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        Config.HTTP_READ_TIMEOUT,
+        connect=Config.HTTP_CONNECT_TIMEOUT,
+        pool=Config.HTTP_POOL_TIMEOUT,
+    )
+
+    transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits, retries=1, verify=verify)
+    if Config.HTTP_MAX_CONNECTIONS_PER_HOST:
+        transport = HostLimitedTransport(transport, Config.HTTP_MAX_CONNECTIONS_PER_HOST)
+
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Dependency: returns the shared pooled client.
+    Scripts that never run the lifespan (benchmarks, debug tools) get one lazily.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Literal
 
 # --- Sub-Models for Structured Data (NEW) ---
 class RoadmapItem(BaseModel):
@@ -15,6 +16,8 @@ class TechStack(BaseModel):
 # --- 1. Analysis Models ---
 class AnalyzeRequest(BaseModel):
     github_url: str
+    # "fast": no Gemini call; the tech stack comes from the repo's manifests
+    mode: Literal["full", "fast"] = "full"
 
 class RepoDetails(BaseModel):
     name: str
@@ -38,6 +41,52 @@ class AnalysisResult(BaseModel):
     
     file_structure: List[str]
 
+class OwnerAnalyzeRequest(BaseModel):
+    owner: str  # "<login>" or "https://github.com/<login>", user or organization
+    max_repos: Optional[int] = None  # Most recently pushed first; at most BULK_MAX_REPOS
+    include_forks: bool = False
+    include_archived: bool = False
+    mode: Literal["full", "fast"] = "full"
+
+class AnalysisJobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    github_url: str
+    mode: str
+    attempts: int
+    position: Optional[int] = None  # Queued jobs ahead of this one, while queued
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+
+class AnalysisHistoryItem(BaseModel):
+    id: int
+    github_url: str
+    repo_name: str
+    score: float
+    commit_sha: Optional[str] = None
+    created_at: datetime
+
+class AnalysisHistoryPage(BaseModel):
+    items: List[AnalysisHistoryItem]  # Newest first
+    next_cursor: Optional[str] = None  # Pass as `cursor` for the next page; None on the last one
+
+class AnalysisHistoryDetail(AnalysisHistoryItem):
+    summary: Optional[str] = None
+    result: Optional[AnalysisResult] = None
+
+class ScoreBatchRequest(BaseModel):
+    github_urls: List[str]
+
+class BatchScoreItem(BaseModel):
+    github_url: str
+    score: Optional[int] = None
+    error: Optional[str] = None
+
+class ScoreBatchResponse(BaseModel):
+    results: List[BatchScoreItem]
+    scored: int
+    failed: int
+
 # --- 2. Payment Models ---
 class PaymentRequest(BaseModel):
     amount: float
@@ -1,13 +1,38 @@
-from fastapi import APIRouter, HTTPException, Header, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from fastapi import APIRouter, HTTPException, Header, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, undefer
+from app.database import get_async_db, AsyncSessionLocal
 from app import entity  
-from app.models import AnalyzeRequest, AnalysisResult, RepoDetails, SendReportRequest
+from app.models import (
+    AnalyzeRequest, AnalysisResult, RepoDetails, SendReportRequest, AnalysisJobStatus, OwnerAnalyzeRequest,
+    ScoreBatchRequest, BatchScoreItem, ScoreBatchResponse, RoadmapItem, TechStack,
+    AnalysisHistoryItem, AnalysisHistoryPage, AnalysisHistoryDetail
+)
 from app.services.github_service import GitHubService
+from app.services.github_scheduler import GitHubError, RateLimitExceeded
 from app.services.scoring_service import ScoringService
+from app.services.batch_scoring import BatchScorer
 from app.services.ai_service import AIService
 from app.services.email_service import EmailService
+from app.services.result_cache import get_result_cache
+from app.services.incremental_scoring import get_incremental_scorer
+from app.services.job_queue import JobWorkerPool, QueueFull, get_job_queue
+from app.services.single_flight import get_analysis_flights
+from app.services.stack_detector import get_stack_detector
+from app.services.analysis_progress import AnalysisProgress
+from app.services.analysis_writer import get_analysis_writer
 from app.config import Config
+from collections import Counter
+from datetime import datetime, timezone
+import asyncio
+import base64
+import json
+import re
+import statistics
+import time
 import jwt
 
 router = APIRouter(tags=["analyze"])
@@ -15,101 +40,930 @@ router = APIRouter(tags=["analyze"])
 
 github_service = GitHubService()
 scoring_service = ScoringService()
+batch_scorer = BatchScorer()
 ai_service = AIService()
 email_service = EmailService()
+result_cache = get_result_cache()
+incremental_scorer = get_incremental_scorer()
+analysis_flights = get_analysis_flights()
+stack_detector = get_stack_detector()
+job_queue = get_job_queue()
+analysis_writer = get_analysis_writer()
+flight_progress = {}  # running analysis task -> its AnalysisProgress (for /stream)
 
 
-@router.post("/", response_model=AnalysisResult)
-async def analyze_repo(
-    request: AnalyzeRequest, 
-    db: Session = Depends(get_db),      
-    authorization: str = Header(None)   
-):
+def _parse_repo_url(github_url: str):
+    """'https://github.com/<owner>/<repo>' -> (owner, repo). Raises ValueError if it can't."""
+    parts = github_url.rstrip("/").split("/")
+    if len(parts) < 2:
+        raise ValueError("Invalid GitHub URL")
+    return parts[-2], parts[-1]
+
+
+def _parse_owner(owner: str) -> str:
+    """'<login>' or 'https://github.com/<login>' -> login. Raises ValueError if it isn't one."""
+    login = owner.rstrip("/").split("/")[-1]
+    if not re.fullmatch(r"[A-Za-z0-9](?:[A-Za-z0-9-]{0,38})", login):
+        raise ValueError("Invalid GitHub user or organization")
+    return login
+
+
+async def _get_user_from_token(db: AsyncSession, authorization: str):
+    """Returns the logged-in User for a 'Bearer <jwt>' header, or None."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+
+    token = authorization.split(" ")[1]
+    payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
+    user_email = payload.get("sub")
+
+    user = (await db.execute(select(entity.User).where(entity.User.email == user_email))).scalars().first()
+    if not user:
+        print(" User found in token but not in DB. Skipping save.")
+    return user
+
+
+async def _save_analysis(db: AsyncSession, user, github_url: str, repo_name: str, result: AnalysisResult,
+                         head_sha: str = None, cache_key: str = None):
+    """
+    Stores one Analysis row. Rows without a user are cache-only entries:
+    they let the result cache survive restarts for anonymous analyses.
+    The row is queued on the AnalysisWriter, which inserts it in bulk
+    within ANALYSIS_WRITE_INTERVAL, unless write-behind is disabled.
+    """
+    if user:
+        print(f" Saving report to Database for: {user.email}")
+    row = dict(
+        user_id=user.id if user else None,
+        github_url=github_url,
+        repo_name=repo_name,
+        overall_score=result.score,
+        summary=result.summary,
+        commit_sha=head_sha,
+        cache_key=cache_key,
+        full_json_result=result.model_dump(mode="json"),
+        # Set here rather than by the database, so queued rows keep when the analysis finished
+        created_at=datetime.now(timezone.utc)
+    )
+    if analysis_writer:
+        await analysis_writer.add(row)
+        return
     try:
-      
-        parts = request.github_url.rstrip("/").split("/")
-        if len(parts) < 2:
-            raise HTTPException(status_code=400, detail="Invalid GitHub URL")
-        
-        owner = parts[-2]
-        repo_name = parts[-1]
+        db.add(entity.Analysis(**row))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        print(f" Warning: Could not save to DB: {e}")
 
-        # 2. Fetch Data
-        print(f"Fetching data for {owner}/{repo_name}...")
-        repo_data = await github_service.fetch_repo_data(owner, repo_name)
-        
-        
+
+def _publish_analysis(progress: AnalysisProgress, tech_stack, summary: str, roadmap, sent: dict = None):
+    """
+    The Gemini part of an analysis as stream events (see analyze_repo_stream),
+    minus what `sent` says was already published while Gemini answered.
+    """
+    sent = sent or {}
+    if not sent.get("tech_stack"):
+        progress.publish("tech_stack", _jsonable(tech_stack))
+    if not sent.get("summary"):
+        progress.publish("summary", {"summary": summary})
+    for item in roadmap[sent.get("roadmap", 0):]:
+        progress.publish("roadmap_item", _jsonable(item))
+
+
+def _field_publisher(progress: AnalysisProgress):
+    """
+    (on_field, sent): an AIService.analyze_code_quality callback publishing
+    Gemini's fields as they're read, and the record of what it published.
+    A field that doesn't validate is left to the final _publish_analysis
+    (for the roadmap, that item and the ones after it, to keep the order).
+    """
+    sent = {"tech_stack": False, "summary": False, "roadmap": 0, "roadmap_stopped": False}
+
+    def on_field(key: str, value):
+        try:
+            if key == "tech_stack":
+                progress.publish("tech_stack", _jsonable(TechStack(**value)))
+                sent["tech_stack"] = True
+            elif key == "summary" and isinstance(value, str):
+                progress.publish("summary", {"summary": value})
+                sent["summary"] = True
+            elif key == "roadmap" and not sent["roadmap_stopped"]:
+                progress.publish("roadmap_item", _jsonable(RoadmapItem(**value)))
+                sent["roadmap"] += 1
+        except (TypeError, ValidationError):
+            if key == "roadmap":
+                sent["roadmap_stopped"] = True
+    return on_field, sent
+
+
+def _jsonable(value):
+    return value.model_dump(mode="json") if hasattr(value, "model_dump") else value
+
+
+async def _detect_stack(owner: str, repo_name: str, file_context, head_sha: str, mode: str):
+    """
+    (TechStack, manifests read) from the repo's manifests, or (None, [])
+    when detection is off or failed. Only a fast analysis, which has no
+    other source for the stack, fails on GitHub's rate limit.
+    """
+    if not stack_detector:
+        return None, []
+    try:
+        return await stack_detector.detect(owner, repo_name, file_context[2]["candidates"], head_sha or "HEAD")
+    except RateLimitExceeded:
+        if mode == "fast":
+            raise
+        print(" Warning: Skipped stack detection (GitHub rate limit)")
+    except Exception as e:
+        print(f" Warning: Stack detection failed: {e}")
+    return None, []
+
+
+def _fast_analysis(base_score: int, detected_stack, manifests: list) -> dict:
+    """The analysis a "fast" request gets instead of Gemini's: the detected stack, the logic score."""
+    if manifests:
+        summary = f"Tech stack read from {', '.join(manifests)}."
+    else:
+        summary = "No dependency manifests were found to read the tech stack from."
+    return {
+        "tech_stack": detected_stack or TechStack(),
+        "summary": summary + " Fast mode skips the AI review: run a full analysis for the summary and roadmap.",
+        "roadmap": [],
+        "quality_bonus": 0,
+    }
+
+
+async def _prepare_analysis(db: AsyncSession, owner: str, repo_name: str, mode: str,
+                            progress: AnalysisProgress) -> dict:
+    """
+    Everything of an analysis up to Gemini: head commit, result cache,
+    fetch, logic score, detected stack. Returns {"cached", "head_sha",
+    "cache_key"} on a result cache hit, else the inputs of the Gemini step
+    and of _finish_analysis. Publishes details and base_score.
+    """
+    # 1. Resolve the head commit while the full fetch starts in parallel.
+    # On a cache hit the fetch is simply cancelled. Repos with stored
+    # feature counters usually don't need the tree, so it isn't started.
+    print(f"Fetching data for {owner}/{repo_name}...")
+    previous_state = await incremental_scorer.load(db, owner, repo_name) if incremental_scorer else None
+    # Hand the connection back to the pool while GitHub is awaited (the
+    # session takes a new one when next used): a bulk audit has many
+    # analyses in flight, more than the pool has connections.
+    await db.close()
+    sha_task = asyncio.create_task(github_service.fetch_head_sha(owner, repo_name))
+    fetch_task = None
+    if previous_state is None:
+        fetch_task = asyncio.create_task(github_service.fetch_repo_data(owner, repo_name))
+
+    try:
+        head_sha = await sha_task
+    except RateLimitExceeded:
+        if fetch_task:
+            fetch_task.cancel()
+        raise
+    except Exception as e:
+        print(f" Warning: Could not resolve head commit: {e}")
+        head_sha = None
+
+    cache_key = None
+    if result_cache and head_sha:
+        # A fast request is happy with a full analysis of the same commit.
+        # cache_key ends up as this mode's key, where a new result goes.
+        for cached_mode in dict.fromkeys(["full", mode]):
+            cache_key = result_cache.make_key(owner, repo_name, head_sha, cached_mode)
+            cached = await result_cache.get(db, cache_key)
+            if cached:
+                if fetch_task:
+                    fetch_task.cancel()
+                print(f"Result cache hit for {owner}/{repo_name}@{head_sha[:7]} ({cached_mode})")
+                progress.publish("details", _jsonable(cached.details))
+                _publish_analysis(progress, cached.tech_stack, cached.summary, cached.roadmap)
+                return {"cached": cached, "head_sha": head_sha, "cache_key": cache_key}
+
+    await db.close()
+
+    # 2. Fetch Data: the changes since the stored state if possible, else the whole tree
+    repo_data = None
+    if previous_state is not None and head_sha:
+        repo_data = await incremental_scorer.fetch_repo_data(owner, repo_name, previous_state, head_sha)
+    if repo_data is None:
+        repo_data = await (fetch_task or github_service.fetch_repo_data(owner, repo_name))
+
+    state = repo_data.get('state')
+    if state is not None:
+        base_score = scoring_service.score_from_counts(repo_data['metadata'], state['scoring'], repo_data['readme'])
+        file_context = incremental_scorer.file_context(state)
+        file_structure = incremental_scorer.file_structure(state)
+    else:
         base_score = scoring_service.calculate_score(
             repo_data['metadata'], 
             repo_data['files'], 
             repo_data['readme']
         )
+        file_context = ai_service.describe_files(repo_data['files'])
+        file_structure = repo_data['files'][:50]
 
-        
-        print("Asking Gemini AI (2.5-Flash)...")
-        ai_result = await ai_service.analyze_code_quality(
-            repo_data['readme'], 
-            repo_data['files'], 
-            base_score
-        )
+    details = RepoDetails(
+        name=repo_data['metadata'].get('name', repo_name),
+        owner=repo_data['metadata'].get('owner', {}).get('login', owner),
+        description=repo_data['metadata'].get('description') or "No description provided.",
+        stars=repo_data['metadata'].get('stargazers_count', 0),
+        forks=repo_data['metadata'].get('forks_count', 0),
+        open_issues=repo_data['metadata'].get('open_issues_count', 0),
+        language=repo_data['metadata'].get('language') or "Multi-language"
+    )
+    progress.publish("details", _jsonable(details))
+    progress.publish("base_score", {"base_score": base_score})
+
+    detected_stack, manifests = await _detect_stack(owner, repo_name, file_context, head_sha, mode)
+    return {
+        "head_sha": head_sha, "cache_key": cache_key, "repo_data": repo_data, "state": state,
+        "base_score": base_score, "file_context": file_context, "file_structure": file_structure,
+        "details": details, "detected_stack": detected_stack, "manifests": manifests,
+    }
+
+
+async def _finish_analysis(db: AsyncSession, owner: str, repo_name: str, prepared: dict, ai_result: dict,
+                           progress: AnalysisProgress, sent: dict = None) -> dict:
+    """
+    The AnalysisResult from a _prepare_analysis output and Gemini's answer
+    (or _fast_analysis), published, cached and with the repo state saved.
+    Returns {"result", "head_sha", "cache_key", "fresh"} (see _run_analysis).
+    """
+    base_score, detected_stack = prepared["base_score"], prepared["detected_stack"]
+    final_score = min(100, max(0, base_score + ai_result.get('quality_bonus', 0)))
+
+    # Gemini's stack, unless it gave none (fallback, answer cut short)
+    tech_stack = ai_result.get("tech_stack")
+    if detected_stack and (not tech_stack or tech_stack == TechStack().model_dump()):
+        tech_stack = detected_stack
+
+    result = AnalysisResult(
+        details=prepared["details"],
+        score=final_score,
+        summary=ai_result.get("summary", "Analysis complete."),
+        roadmap=ai_result.get("roadmap", []),      
+        tech_stack=tech_stack,    
+        file_structure=prepared["file_structure"]     
+    )
+    _publish_analysis(progress, result.tech_stack, result.summary, result.roadmap, sent)
+
+    # 3. Cache. Fallback (Gemini failed) and partial (answer cut short)
+    # results are never cached, nor ones from an incomplete file list (some
+    # tree listing failed). The Analysis rows are written by each caller
+    # (see analyze_repo).
+    head_sha, cache_key, state = prepared["head_sha"], prepared["cache_key"], prepared["state"]
+    tree_stats = prepared["repo_data"].get("tree_stats") or {}
+    if ai_result.get("is_fallback") or ai_result.get("is_partial") or tree_stats.get("failed_listings"):
+        cache_key = None
+    if cache_key:
+        result_cache.put(cache_key, result)
+    if incremental_scorer and head_sha:
+        if state is None:
+            repo_data = prepared["repo_data"]
+            state = incremental_scorer.build_state(repo_data['files'], repo_data.get('tree_stats'))
+        if state is not None:
+            await incremental_scorer.save(db, owner, repo_name, head_sha, state)
+
+    return {"result": result, "head_sha": head_sha, "cache_key": cache_key, "fresh": True}
 
-        
-        final_score = min(100, max(0, base_score + ai_result.get('quality_bonus', 0)))
 
+async def _run_analysis(owner: str, repo_name: str, lane: str = "anonymous", progress: AnalysisProgress = None,
+                        mode: str = "full"):
+    """
+    Fetch, score, Gemini and caching for one repository: the part shared by
+    every concurrent request for it (see analyze_repo). Uses its own DB
+    session, since it can outlive the request that started it.
+    `lane` is the Gemini executor priority of the request that started it.
+    `mode` "fast" skips Gemini: the stack comes from StackDetector alone,
+    and a cached full analysis of the same commit is served if there is one.
+    Stage events go to `progress` as they finish (details, base_score,
+    then the Gemini fields); it's closed when the analysis ends.
+    Returns {"result", "head_sha", "cache_key", "fresh"}; `fresh` is False
+    when the result came from the result cache.
+    """
+    progress = progress or AnalysisProgress()
+    db = AsyncSessionLocal()
+    try:
+        prepared = await _prepare_analysis(db, owner, repo_name, mode, progress)
+        if "cached" in prepared:
+            return {"result": prepared["cached"], "head_sha": prepared["head_sha"],
+                    "cache_key": prepared["cache_key"], "fresh": False}
+
+        sent = None
+        if mode == "fast":
+            ai_result = _fast_analysis(prepared["base_score"], prepared["detected_stack"], prepared["manifests"])
+        else:
+            print("Asking Gemini AI (2.5-Flash)...")
+            on_field, sent = _field_publisher(progress)
+            repo_data = prepared["repo_data"]
+            ai_result = await ai_service.analyze_code_quality(
+                repo_data['readme'], 
+                repo_data.get('files'), 
+                prepared["base_score"],
+                file_context=prepared["file_context"],
+                lane=lane,
+                on_field=on_field,
+                detected_stack=prepared["detected_stack"]
+            )
+
+        return await _finish_analysis(db, owner, repo_name, prepared, ai_result, progress, sent)
+    finally:
+        progress.close()
+        await db.close()
+
+
+def _start_analysis(owner: str, repo_name: str, lane: str, mode: str = "full"):
+    """
+    Starts the analysis of a repo, or joins the one already running in the
+    same mode (concurrent requests share it, in the first caller's lane).
+    Returns (task, leader, progress); await the task through asyncio.shield.
+    `progress` is None only if the joined analysis finished in between.
+    """
+    progress = AnalysisProgress()
+    flight_key = f"{owner}/{repo_name}".lower() + ("" if mode == "full" else f"|{mode}")
+    task, leader = analysis_flights.start(
+        flight_key, lambda: _run_analysis(owner, repo_name, lane, progress, mode)
+    )
+    if leader:
+        flight_progress[task] = progress
+        task.add_done_callback(lambda t: flight_progress.pop(t, None))
+    else:
+        print(f"Joined the in-flight analysis of {owner}/{repo_name}")
+    return task, leader, flight_progress.get(task)
+
+
+async def _read_user(db: AsyncSession, authorization: str):
+    try:
+        return await _get_user_from_token(db, authorization)
+    except Exception as e:
+        print(f" Warning: Could not read user from token: {e}")
+        return None
+    finally:
+        # The request waits for the analysis next: the pool gets the connection back meanwhile
+        await db.close()
+
+
+async def _save_for_caller(db: AsyncSession, user, leader: bool, github_url: str, repo_name: str, analysis: dict):
+    """
+    Persist per caller: the user's history row. A fresh result also gets a
+    cache row (written once, by the request that computed it).
+    """
+    if user or (leader and analysis["fresh"] and analysis["cache_key"]):
+        await _save_analysis(db, user, github_url, repo_name, analysis["result"],
+                             analysis["head_sha"], analysis["cache_key"])
+
+
+@router.post("/", response_model=AnalysisResult)
+async def analyze_repo(
+    request: AnalyzeRequest, 
+    db: AsyncSession = Depends(get_async_db),      
+    authorization: str = Header(None)   
+):
+    try:
       
-        if authorization and authorization.startswith("Bearer "):
-            try:
-              
-                token = authorization.split(" ")[1]
-                payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-                user_email = payload.get("sub")
-                
-                
-                user = db.query(entity.User).filter(entity.User.email == user_email).first()
-                
-                if user:
-                    print(f" Saving report to Database for: {user.email}")
-                    new_analysis = entity.Analysis(
-                        user_id=user.id,
-                        github_url=request.github_url,
-                        repo_name=repo_name,
-                        overall_score=final_score,
-                        summary=ai_result.get("summary"),
-                        full_json_result=ai_result  
-                    )
-                    db.add(new_analysis)
-                    db.commit()
-                else:
-                    print(" User found in token but not in DB. Skipping save.")
-            except Exception as e:
-          
-                print(f" Warning: Could not save to DB: {e}")
+        try:
+            owner, repo_name = _parse_repo_url(request.github_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        
-        return AnalysisResult(
-            details=RepoDetails(
-                name=repo_data['metadata'].get('name', repo_name),
-                owner=repo_data['metadata'].get('owner', {}).get('login', owner),
-                description=repo_data['metadata'].get('description') or "No description provided.",
-                stars=repo_data['metadata'].get('stargazers_count', 0),
-                forks=repo_data['metadata'].get('forks_count', 0),
-                open_issues=repo_data['metadata'].get('open_issues_count', 0),
-                language=repo_data['metadata'].get('language') or "Multi-language"
-            ),
-            score=final_score,
-            summary=ai_result.get("summary", "Analysis complete."),
-            roadmap=ai_result.get("roadmap", []),      
-            tech_stack=ai_result.get("tech_stack"),    
-            file_structure=repo_data['files'][:50]     
-        )
+        user = await _read_user(db, authorization)
+
+        task, leader, _ = _start_analysis(owner, repo_name, "user" if user else "anonymous", request.mode)
+        analysis = await asyncio.shield(task)
+        await _save_for_caller(db, user, leader, request.github_url, repo_name, analysis)
+
+        return analysis["result"]
 
     except HTTPException as he:
         raise he
+    except RateLimitExceeded as e:
+        print(f"ERROR in analyze_repo: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         print(f"ERROR in analyze_repo: {str(e)}")
         raise HTTPException(status_code=404, detail=f"Analysis failed: {str(e)}")
 
 
+@router.post("/stream")
+async def analyze_repo_stream(
+    request: AnalyzeRequest,
+    format: str = "sse",
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None),
+    accept: str = Header(None)
+):
+    """
+    Streaming variant of analyze_repo: one event per stage as it finishes,
+    so repo details and the logic score arrive without waiting for Gemini.
+
+    Events, in order: details, base_score, tech_stack, summary, one
+    roadmap_item per roadmap entry, then result (the AnalysisResult
+    /api/analyze/ returns, with the final score). base_score is skipped on
+    result cache hits. The Gemini events are sent as Gemini writes each
+    part (in the order it writes them), not when its answer is complete.
+    With "mode": "fast" they carry the manifest-detected stack instead and
+    follow base_score right away. A failure after the stream started is
+    sent as an error event: {"status", "detail"} with the status
+    /api/analyze/ would use.
+
+    Sent as Server-Sent Events, or as NDJSON ({"event", "data"} per line)
+    with ?format=ndjson or Accept: application/x-ndjson.
+    """
+    try:
+        owner, repo_name = _parse_repo_url(request.github_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user = await _read_user(db, authorization)
+    ndjson = format == "ndjson" or "application/x-ndjson" in (accept or "")
+    task, leader, progress = _start_analysis(owner, repo_name, "user" if user else "anonymous", request.mode)
+
+    def encode(event: str, data) -> str:
+        if ndjson:
+            return json.dumps({"event": event, "data": data}) + "\n"
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def stream():
+        try:
+            if progress is not None:
+                async for event, data in progress.events():
+                    yield encode(event, data)
+            analysis = await asyncio.shield(task)
+            result = analysis["result"]
+            if progress is None:
+                replay = AnalysisProgress()
+                replay.publish("details", _jsonable(result.details))
+                _publish_analysis(replay, result.tech_stack, result.summary, result.roadmap)
+                replay.close()
+                async for event, data in replay.events():
+                    yield encode(event, data)
+
+            # The request's session may already be closed while the body streams
+            async with AsyncSessionLocal() as save_db:
+                await _save_for_caller(save_db, user, leader, request.github_url, repo_name, analysis)
+            yield encode("result", _jsonable(result))
+
+        except RateLimitExceeded as e:
+            print(f"ERROR in analyze_repo_stream: {str(e)}")
+            yield encode("error", {"status": 429, "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"ERROR in analyze_repo_stream: {str(e)}")
+            yield encode("error", {"status": 404, "detail": f"Analysis failed: {str(e)}"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson" if ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _run_job(job: dict) -> dict:
+    """
+    JobWorkerPool handler: one queued analysis, run like analyze_repo (and
+    shared with requests for the same repo). Returns the AnalysisResult JSON.
+    """
+    owner, repo_name = _parse_repo_url(job["github_url"])
+    task, leader, _ = _start_analysis(owner, repo_name, job["lane"], job["mode"])
+    analysis = await asyncio.shield(task)
+    async with AsyncSessionLocal() as db:
+        user = await db.get(entity.User, job["user_id"]) if job["user_id"] else None
+        await _save_for_caller(db, user, leader, job["github_url"], repo_name, analysis)
+    return _jsonable(analysis["result"])
+
+
+def start_job_workers():
+    """The worker pool for queued analyses (started by the app lifespan), or None when jobs are disabled."""
+    return JobWorkerPool(job_queue, _run_job).start() if job_queue else None
+
+
+def start_analysis_writer():
+    """The write-behind buffer for Analysis rows (started by the app lifespan), or None when disabled."""
+    return analysis_writer.start() if analysis_writer else None
+
+
+async def _job_status(db: AsyncSession, job) -> AnalysisJobStatus:
+    return AnalysisJobStatus(
+        job_id=job.id,
+        status=job.status,
+        github_url=job.github_url,
+        mode=job.mode,
+        attempts=job.attempts,
+        position=await job_queue.position(db, job) if job.status == "queued" else None,
+        result=job.result if job.status == "done" else None,
+        error=job.error,
+    )
+
+
+@router.post("/jobs", response_model=AnalysisJobStatus, status_code=202)
+async def enqueue_analysis(
+    request: AnalyzeRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None)
+):
+    """
+    Queues an analysis instead of running it inside the request. Poll the
+    job at /api/analyze/jobs/{job_id} (the Location header) until its
+    status is "done" (the AnalysisResult is in `result`) or "failed".
+    Jobs are stored in the database: they survive restarts and client
+    disconnects, and are run by the JOB_WORKERS workers of each process.
+    Signed-in users' jobs go first and are saved to their history.
+    """
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Background analyses are disabled")
+    try:
+        _parse_repo_url(request.github_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user = await _read_user(db, authorization)
+    try:
+        job = await job_queue.enqueue(db, request.github_url, request.mode, "user" if user else "anonymous",
+                                      user.id if user else None)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "60"})
+    response.headers["Location"] = f"/api/analyze/jobs/{job.id}"
+    return await _job_status(db, job)
+
+
+@router.get("/jobs/{job_id}", response_model=AnalysisJobStatus)
+async def get_analysis_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Status of a queued analysis, with its result once done."""
+    job = await job_queue.get(db, job_id) if job_queue else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return await _job_status(db, job)
+
+
+async def _require_user(db: AsyncSession, authorization: str):
+    """The signed-in User for a 'Bearer <jwt>' header; 401 without one."""
+    try:
+        user = await _get_user_from_token(db, authorization)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired. Please login again.")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token.")
+    if not user:
+        raise HTTPException(status_code=401, detail="Missing or invalid token")
+    return user
+
+
+# What a history page shows; the rest of the row (summary, full_json_result) is only read by the detail endpoint
+HISTORY_COLUMNS = (entity.Analysis.id, entity.Analysis.github_url, entity.Analysis.repo_name,
+                   entity.Analysis.overall_score, entity.Analysis.commit_sha, entity.Analysis.created_at)
+
+
+def _history_cursor(row) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last row of a page."""
+    raw = json.dumps([row.created_at.isoformat(), row.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _parse_history_cursor(cursor: str):
+    """_history_cursor's text -> (created_at, id). Raises ValueError if it isn't one."""
+    try:
+        created_at, analysis_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(analysis_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _history_item(row, model=AnalysisHistoryItem, **extra):
+    return model(id=row.id, github_url=row.github_url, repo_name=row.repo_name, score=row.overall_score,
+                 commit_sha=row.commit_sha, created_at=row.created_at, **extra)
+
+
+@router.get("/history", response_model=AnalysisHistoryPage)
+async def list_history(
+    limit: int = Query(None, ge=1),
+    cursor: str = None,
+    repo: str = None,
+    min_score: float = None,
+    max_score: float = None,
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None)
+):
+    """
+    The signed-in user's analyses, newest first, `limit` per page (at most
+    HISTORY_MAX_PAGE_SIZE). Pass `next_cursor` back as `cursor` for the
+    next page. `repo` filters by repository: a name matches it under any
+    owner, owner/name or a URL only that repository. `min_score` /
+    `max_score` filter by score.
+
+    Pages are read by keyset on (user_id, created_at, id), the
+    ix_analyses_user_history index, instead of OFFSET: any page costs the
+    same however long the history is. The full result is left out; it is
+    at /api/analyze/history/{analysis_id}.
+    """
+    user = await _require_user(db, authorization)
+    limit = min(limit or Config.HISTORY_PAGE_SIZE, Config.HISTORY_MAX_PAGE_SIZE)
+    if analysis_writer and analysis_writer.has_pending(user.id):
+        await analysis_writer.flush()  # The user's latest analyses are still queued
+
+    query = (
+        select(entity.Analysis)
+        .options(load_only(*HISTORY_COLUMNS, raiseload=True))
+        .where(entity.Analysis.user_id == user.id)
+        .order_by(entity.Analysis.created_at.desc(), entity.Analysis.id.desc())
+        .limit(limit + 1)  # One more tells whether there is a next page
+    )
+    if cursor:
+        try:
+            created_at, analysis_id = _parse_history_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # A row-value comparison seeks the index to the cursor (an OR of the two cases would scan up to it)
+        query = query.where(tuple_(entity.Analysis.created_at, entity.Analysis.id) < tuple_(created_at, analysis_id))
+    if repo:
+        owner, name = _parse_repo_url(repo) if "/" in repo.rstrip("/") else (None, repo.rstrip("/"))
+        query = query.where(func.lower(entity.Analysis.repo_name) == name.lower())
+        if owner:
+            # github_url is stored as given: compare its last two segments
+            query = query.where(func.rtrim(func.lower(entity.Analysis.github_url), "/")
+                                .endswith(f"/{owner}/{name}".lower(), autoescape=True))
+    if min_score is not None:
+        query = query.where(entity.Analysis.overall_score >= min_score)
+    if max_score is not None:
+        query = query.where(entity.Analysis.overall_score <= max_score)
+
+    rows = (await db.execute(query)).scalars().all()
+    return AnalysisHistoryPage(
+        items=[_history_item(row) for row in rows[:limit]],
+        next_cursor=_history_cursor(rows[limit - 1]) if len(rows) > limit else None,
+    )
+
+
+@router.get("/history/{analysis_id}", response_model=AnalysisHistoryDetail)
+async def get_history_analysis(
+    analysis_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None)
+):
+    """One analysis from the signed-in user's history, with its full result."""
+    user = await _require_user(db, authorization)
+    # No flush: a queued row has no id yet, so it can't be the one asked for
+    row = (await db.execute(
+        select(entity.Analysis)
+        .options(undefer(entity.Analysis.full_json_result))
+        .where(entity.Analysis.id == analysis_id, entity.Analysis.user_id == user.id)
+    )).scalars().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    try:
+        result = AnalysisResult.model_validate(row.full_json_result) if row.full_json_result else None
+    except ValidationError as e:
+        print(f" Warning: Stored analysis {row.id} no longer matches AnalysisResult: {e}")
+        result = None
+    return _history_item(row, AnalysisHistoryDetail, summary=row.summary, result=result)
+
+
+async def _bulk_analyses(owner: str, names: list, mode: str):
+    """
+    Analyzes the repos `names` of `owner`, yielding (name, analysis) as each
+    finishes; `analysis` is the exception instead if it failed.
+
+    Up to BULK_CONCURRENCY repos are fetched and scored at once. Those that
+    need Gemini wait up to BULK_BATCH_WAIT seconds for others to share a
+    prompt (AIService.analyze_code_quality_batch), in the anonymous lane so
+    a bulk audit never takes the slots reserved for signed-in requests.
+    After a GitHub rate limit error, repos not started yet fail with it too.
+    """
+    finished = asyncio.Queue()
+    waiting = asyncio.Queue()  # (name, prepared), for Gemini
+    semaphore = asyncio.Semaphore(Config.BULK_CONCURRENCY)
+    rate_limited = []
+
+    async def finish(name: str, prepared: dict, ai_result: dict):
+        async with AsyncSessionLocal() as db:
+            try:
+                return await _finish_analysis(db, owner, name, prepared, ai_result, AnalysisProgress())
+            except Exception as e:
+                return e
+
+    async def prepare(name: str):
+        async with semaphore:
+            if rate_limited:
+                finished.put_nowait((name, rate_limited[0]))
+                return
+            async with AsyncSessionLocal() as db:
+                try:
+                    prepared = await _prepare_analysis(db, owner, name, mode, AnalysisProgress())
+                except RateLimitExceeded as e:
+                    rate_limited.append(e)
+                    finished.put_nowait((name, e))
+                    return
+                except Exception as e:
+                    finished.put_nowait((name, e))
+                    return
+        if "cached" in prepared:
+            finished.put_nowait((name, {"result": prepared["cached"], "head_sha": prepared["head_sha"],
+                                        "cache_key": prepared["cache_key"], "fresh": False}))
+        elif mode == "fast":
+            ai_result = _fast_analysis(prepared["base_score"], prepared["detected_stack"], prepared["manifests"])
+            finished.put_nowait((name, await finish(name, prepared, ai_result)))
+        else:
+            waiting.put_nowait((name, prepared))
+
+    async def ask_gemini(batch: list):
+        try:
+            ai_results = await ai_service.analyze_code_quality_batch([{
+                "name": f"{owner}/{name}",
+                "readme": prepared["repo_data"]["readme"],
+                "file_context": prepared["file_context"],
+                "base_score": prepared["base_score"],
+                "detected_stack": prepared["detected_stack"],
+            } for name, prepared in batch])
+        except Exception as e:
+            print(f"ERROR in analyze_owner: Gemini batch of {len(batch)} failed: {e}")
+            ai_results = [HTTPException(status_code=502, detail=f"Gemini failed: {e}")] * len(batch)
+        for (name, prepared), ai_result in zip(batch, ai_results):
+            failed = isinstance(ai_result, Exception)
+            finished.put_nowait((name, ai_result if failed else await finish(name, prepared, ai_result)))
+
+    async def batch_for_gemini(preparing: asyncio.Future):
+        loop = asyncio.get_running_loop()
+        asks = []
+        while not (preparing.done() and waiting.empty()):
+            try:
+                batch = [await asyncio.wait_for(waiting.get(), 0.1)]  # Short, to notice the end
+            except asyncio.TimeoutError:
+                continue
+            deadline = loop.time() + Config.BULK_BATCH_WAIT
+            while len(batch) < Config.GEMINI_BATCH_MAX_REPOS:
+                if preparing.done():  # Nothing more is coming: send what's there
+                    if waiting.empty():
+                        break
+                    batch.append(waiting.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(waiting.get(), max(0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+            asks.append(asyncio.create_task(ask_gemini(batch)))
+        await asyncio.gather(*asks)
+
+    preparing = asyncio.gather(*(prepare(name) for name in names))
+    gemini = asyncio.create_task(batch_for_gemini(preparing))
+    try:
+        for _ in names:
+            yield await finished.get()
+    finally:
+        preparing.cancel()
+        gemini.cancel()
+        await asyncio.gather(preparing, gemini, return_exceptions=True)
+
+
+def _failure(error: BaseException):
+    """
+    (status, detail) for a failed analysis: an HTTPException's own, 429 for
+    GitHub rate limits, 404 for a repo GitHub doesn't have, 502 for other
+    GitHub failures, 500 for errors on our side (database, bugs).
+    """
+    if isinstance(error, HTTPException):
+        return error.status_code, error.detail
+    if isinstance(error, RateLimitExceeded):
+        return 429, str(error)
+    if isinstance(error, GitHubError):
+        return error.status_code, str(error)
+    return 500, str(error)
+
+
+def _bulk_summary(owner: str, results: list, failed: int, from_cache: int, elapsed: float) -> dict:
+    """The closing event of analyze_owner: score spread, best and worst repos, what they're built with."""
+    scores = [result.score for result in results]
+    ranked = sorted(results, key=lambda result: result.score, reverse=True)
+    techs = Counter(
+        tech for result in results if result.tech_stack
+        for tech in result.tech_stack.frontend + result.tech_stack.backend + result.tech_stack.infrastructure
+    )
+    return {
+        "owner": owner,
+        "repos": len(results) + failed,
+        "analyzed": len(results),
+        "failed": failed,
+        "from_cache": from_cache,
+        "score": {
+            "mean": round(statistics.mean(scores), 1),
+            "median": statistics.median(scores),
+            "min": min(scores),
+            "max": max(scores),
+        } if scores else None,
+        "best": [{"name": result.details.name, "score": result.score} for result in ranked[:5]],
+        "worst": [{"name": result.details.name, "score": result.score} for result in ranked[::-1][:5]],
+        "languages": dict(Counter(result.details.language for result in results).most_common()),
+        "technologies": dict(techs.most_common(15)),
+        "elapsed_s": round(elapsed, 1),
+    }
+
+
+@router.post("/owner")
+async def analyze_owner(
+    request: OwnerAnalyzeRequest,
+    db: AsyncSession = Depends(get_async_db),
+    authorization: str = Header(None)
+):
+    """
+    Analyzes the public repositories of a GitHub user or organization (most
+    recently pushed first, forks and archived repos left out unless asked)
+    and streams NDJSON, one {"event", "data"} object per line:
+    - repos: {"owner", "count"}, once the listing is read
+    - repo: {"github_url", "result", "from_cache"} or {"github_url",
+      "status", "error"}, per repository as it finishes (not in order)
+    - summary: totals, score spread, best and worst repos, languages and
+      technologies, at the end
+
+    Repos go through the same pipeline and caches as /api/analyze/, with
+    Gemini prompts shared between repos (see _bulk_analyses). Results are
+    saved like single analyses, to the caller's history when signed in.
+    """
+    try:
+        owner = _parse_owner(request.owner)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    user = await _read_user(db, authorization)
+    limit = max(1, min(request.max_repos or Config.BULK_MAX_REPOS, Config.BULK_MAX_REPOS))
+
+    try:
+        repos = await github_service.list_repos(owner, limit, request.include_forks, request.include_archived)
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=_failure(e)[0], detail=str(e))
+
+    def encode(event: str, data) -> str:
+        return json.dumps({"event": event, "data": data}) + "\n"
+
+    async def stream():
+        started = time.perf_counter()
+        yield encode("repos", {"owner": owner, "count": len(repos)})
+        results, failed, from_cache = [], 0, 0
+        async with AsyncSessionLocal() as save_db:
+            async for name, analysis in _bulk_analyses(owner, [repo["name"] for repo in repos], request.mode):
+                github_url = f"https://github.com/{owner}/{name}"
+                if isinstance(analysis, BaseException):
+                    failed += 1
+                    status, detail = _failure(analysis)
+                    yield encode("repo", {"github_url": github_url, "status": status,
+                                          "error": f"Analysis failed: {detail}"})
+                    continue
+                await _save_for_caller(save_db, user, True, github_url, name, analysis)
+                results.append(analysis["result"])
+                from_cache += not analysis["fresh"]
+                yield encode("repo", {"github_url": github_url, "result": _jsonable(analysis["result"]),
+                                      "from_cache": not analysis["fresh"]})
+        yield encode("summary", _bulk_summary(owner, results, failed, from_cache, time.perf_counter() - started))
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/score-batch", response_model=ScoreBatchResponse)
+async def score_batch(request: ScoreBatchRequest):
+    """
+    Logic scores for many repositories at once (hackathon cohorts, org
+    audits). Skips Gemini: repos are fetched with bounded concurrency and
+    scored together by BatchScorer. A repo that can't be fetched gets an
+    `error` instead of a score; the rest of the batch still completes.
+    """
+    if not request.github_urls:
+        raise HTTPException(status_code=400, detail="No repositories given")
+    if len(request.github_urls) > Config.BATCH_SCORE_MAX_REPOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {Config.BATCH_SCORE_MAX_REPOS} repositories per batch"
+        )
+
+    semaphore = asyncio.Semaphore(Config.BATCH_FETCH_CONCURRENCY)
+
+    async def fetch(github_url: str):
+        owner, repo_name = _parse_repo_url(github_url)
+        async with semaphore:
+            return await github_service.fetch_repo_data(owner, repo_name)
+
+    fetched = await asyncio.gather(*(fetch(url) for url in request.github_urls), return_exceptions=True)
+
+    ok = [i for i, data in enumerate(fetched) if not isinstance(data, BaseException)]
+    scores = batch_scorer.score_batch([fetched[i] for i in ok])
+    score_by_index = dict(zip(ok, scores))
+
+    results = []
+    for i, github_url in enumerate(request.github_urls):
+        if i in score_by_index:
+            results.append(BatchScoreItem(github_url=github_url, score=score_by_index[i]))
+        else:
+            print(f"Batch scoring: could not fetch {github_url}: {fetched[i]}")
+            results.append(BatchScoreItem(github_url=github_url, error=str(fetched[i])))
+
+    return ScoreBatchResponse(results=results, scored=len(ok), failed=len(results) - len(ok))
+
 
 @router.post("/send-report")
 async def send_report(
@@ -4,8 +4,10 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
+from app.http_client import get_http_client
 from app import entity
 from app.config import Config
 import httpx
@@ -28,32 +30,34 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, Config.JWT_SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
 
 @router.post("/google")
-async def login_with_google(request: LoginRequest, db: Session = Depends(get_db)):
- 
-    async with httpx.AsyncClient() as client:
-        token_url = "https://oauth2.googleapis.com/token"
-        data = {
-            "client_id": Config.GOOGLE_CLIENT_ID,
-            "client_secret": Config.GOOGLE_CLIENT_SECRET,
-            "code": request.code,
-            "grant_type": "authorization_code",
-            "redirect_uri": Config.GOOGLE_REDIRECT_URI,
-        }
-        response = await client.post(token_url, data=data)
-        
-        if response.status_code != 200:
-            print(f"Google Token Error: {response.text}")
-            raise HTTPException(status_code=400, detail="Invalid Google code")
-        
-        access_token = response.json().get("access_token")
-
-       
-        user_info_response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        user_info = user_info_response.json()
+async def login_with_google(
+    request: LoginRequest,
+    db: AsyncSession = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_http_client)
+):
+
+    token_url = "https://oauth2.googleapis.com/token"
+    data = {
+        "client_id": Config.GOOGLE_CLIENT_ID,
+        "client_secret": Config.GOOGLE_CLIENT_SECRET,
+        "code": request.code,
+        "grant_type": "authorization_code",
+        "redirect_uri": Config.GOOGLE_REDIRECT_URI,
+    }
+    response = await client.post(token_url, data=data)
+    
+    if response.status_code != 200:
+        print(f"Google Token Error: {response.text}")
+        raise HTTPException(status_code=400, detail="Invalid Google code")
     
+    access_token = response.json().get("access_token")
+
+    user_info_response = await client.get(
+        "https://www.googleapis.com/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    user_info = user_info_response.json()
+
     email = user_info.get("email")
     full_name = user_info.get("name")
 
@@ -61,7 +65,7 @@ async def login_with_google(request: LoginRequest, db: Session = Depends(get_db)
         raise HTTPException(status_code=400, detail="Email not found in Google account")
 
    
-    user = db.query(entity.User).filter(entity.User.email == email).first()
+    user = (await db.execute(select(entity.User).where(entity.User.email == email))).scalars().first()
 
     if not user:
       
@@ -70,8 +74,8 @@ async def login_with_google(request: LoginRequest, db: Session = Depends(get_db)
             full_name=full_name
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         print(f"Created new user in DB: {email}")
         user = new_user
     else:
@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from app.services.analysis_writer import get_analysis_writer
+from app.services.gemini_cache import get_gemini_cache
+from app.services.gemini_executor import get_gemini_executor
+from app.services.github_cache import get_github_cache
+from app.services.github_scheduler import get_github_rate_limiter
+from app.services.incremental_scoring import get_incremental_scorer
+from app.services.job_queue import get_job_queue
+from app.services.prompt_builder import get_prompt_builder
+from app.services.result_cache import get_result_cache
+from app.services.single_flight import get_analysis_flights
+from app.services.stack_detector import get_stack_detector
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/")
+async def get_metrics():
+    """
+    Runtime counters (cache hits/misses etc.) for this process.
+    """
+    github_cache = get_github_cache()
+    result_cache = get_result_cache()
+    incremental_scorer = get_incremental_scorer()
+    gemini_cache = get_gemini_cache()
+    stack_detector = get_stack_detector()
+    job_queue = get_job_queue()
+    analysis_writer = get_analysis_writer()
+
+    return {
+        "github_rate_limit": get_github_rate_limiter().stats(),
+        "github_cache": github_cache.stats() if github_cache else None,
+        "result_cache": result_cache.stats() if result_cache else None,
+        "gemini_cache": gemini_cache.stats() if gemini_cache else None,
+        "gemini_executor": get_gemini_executor().stats(),
+        "gemini_prompt": get_prompt_builder().stats(),
+        "analysis_single_flight": get_analysis_flights().stats(),
+        "incremental_scoring": incremental_scorer.stats() if incremental_scorer else None,
+        "stack_detection": stack_detector.stats() if stack_detector else None,
+        "analysis_jobs": await job_queue.stats() if job_queue else None,
+        "analysis_writes": analysis_writer.stats() if analysis_writer else None,
+    }
@@ -0,0 +1,43 @@
+import asyncio
+
+
+class AnalysisProgress:
+    """
+    Stage events of one running analysis, for streaming clients.
+
+    The analysis publishes (event, data) pairs as stages finish; each
+    listener iterates `events()` and gets every event from the start, so a
+    stream that joins an analysis already under way (single flight) still
+    sees the stages it missed. Events are kept until the analysis ends;
+    there are a handful per run.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, event: str, data):
+        if self._closed:
+            return
+        self._events.append((event, data))
+        self._wake()
+
+    def close(self):
+        """No more events; listeners stop once they have read the rest."""
+        self._closed = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def events(self):
+        sent = 0
+        while True:
+            while sent < len(self._events):
+                yield self._events[sent]
+                sent += 1
+            if self._closed:
+                return
+            await self._changed.wait()
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from app import entity
+from app.config import Config
+from app.database import AsyncSessionLocal
+
+
+class AnalysisWriter:
+    """
+    Write-behind buffer for Analysis rows (users' history and the result
+    cache's persistent tier). Requests queue their row and return; a
+    background task writes the queue in bulk, one multi-row INSERT and
+    one commit per ANALYSIS_WRITE_BATCH_SIZE rows, once that many are
+    waiting or every ANALYSIS_WRITE_INTERVAL seconds.
+
+    Rows keep the time they were queued as created_at. With
+    ANALYSIS_WRITE_MAX_PENDING rows queued, add() writes before queueing
+    (back-pressure); if the database can't take them either, the new row
+    is dropped and counted, so memory stays bounded.
+
+    While the database is unreachable (connection or operational errors)
+    rows stay queued and writes back off, from the interval up to
+    MAX_BACKOFF seconds. Only rows the database rejects (IntegrityError,
+    DataError) are dropped: a rejected batch is split in halves until the
+    bad rows are found, and the rest is written. stop() makes a last
+    attempt and reports what it couldn't write.
+    """
+
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, batch_size: int = None, interval: float = None, max_pending: int = None):
+        self.batch_size = batch_size or Config.ANALYSIS_WRITE_BATCH_SIZE
+        self.interval = interval or Config.ANALYSIS_WRITE_INTERVAL
+        self.max_pending = max_pending or Config.ANALYSIS_WRITE_MAX_PENDING
+        self._pending = []  # Row dicts, oldest first
+        self._backoff = 0.0  # Seconds to wait after the last failed write (0: none failed)
+        self._retry_at = 0.0  # loop time before which flushes don't try the database again
+        self._task = None
+        self._wakeup = None
+        self._lock = None  # One flush at a time
+        self.queued = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rejected = 0
+        self.dropped = 0
+        self.unwritten_at_stop = 0
+        self.max_depth = 0
+        self.last_flush_ms = None
+
+    def start(self):
+        """Starts the background flushes in the running loop (add() does it too)."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def stop(self):
+        """Stops the background flushes and writes what is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._lock is not None and not await self.flush(force=True):
+            self.unwritten_at_stop = len(self._pending)
+            print(f" Warning: {self.unwritten_at_stop} analysis rows could not be written before shutdown")
+
+    async def add(self, row: dict):
+        """Queues one Analysis row (column -> value)."""
+        self.start()
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                print(f" Warning: Analysis write queue full ({len(self._pending)} rows), "
+                      f"dropped the row for {row.get('github_url')}")
+                return
+        row.setdefault("created_at", datetime.now(timezone.utc))
+        self._pending.append(row)
+        self.queued += 1
+        self.max_depth = max(self.max_depth, len(self._pending))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def has_pending(self, user_id) -> bool:
+        """Whether rows of this user are still queued."""
+        return any(row.get("user_id") == user_id for row in self._pending)
+
+    async def flush(self, force: bool = False) -> bool:
+        """
+        Writes every queued row now. False if the database is unreachable
+        (the rest stays queued), or still backing off from a failure
+        unless `force`.
+        """
+        if not self._pending:  # Rows leave the queue once written, so nothing is in flight either
+            return True
+        # Shielded: a caller cancelled mid-write (stop(), a disconnected request) would leave
+        # rows committed but still queued, to be written twice
+        return await asyncio.shield(self._flush(force))
+
+    async def _flush(self, force: bool) -> bool:
+        async with self._lock:
+            if not force and asyncio.get_running_loop().time() < self._retry_at:
+                return False
+            while self._pending:
+                if not await self._write_front(min(self.batch_size, len(self._pending))):
+                    self._backoff = min(self.MAX_BACKOFF, max(self.interval, self._backoff * 2))
+                    self._retry_at = asyncio.get_running_loop().time() + self._backoff
+                    return False
+            self._backoff = self._retry_at = 0.0
+            return True
+
+    async def _write_front(self, count: int) -> bool:
+        """
+        Writes the first `count` queued rows and takes them off the queue.
+        A batch the database rejects is bisected; a single rejected row is
+        dropped. False on any other error, with the unwritten rows still
+        queued (add() only appends, so the front rows stay the same).
+        """
+        try:
+            await self._write(self._pending[:count])
+        except (IntegrityError, DataError) as e:
+            if count > 1:
+                return await self._write_front(count // 2) and await self._write_front(count - count // 2)
+            self.rejected += 1
+            print(f" Warning: Database rejected the analysis row for {self._pending[0].get('github_url')}: {e}")
+        except Exception as e:
+            self.failed_flushes += 1
+            print(f" Warning: Could not write {count} analysis rows (kept, retrying): {e}")
+            return False
+        del self._pending[:count]
+        return True
+
+    async def _write(self, batch: list):
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:  # Closing it rolls back a failed write
+            # One INSERT ... VALUES (...), (...): a single round trip, where executemany may send one per row
+            await db.execute(insert(entity.Analysis).values(batch))
+            await db.commit()
+        self.flushes += 1
+        self.written += len(batch)
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(self.interval, self._retry_at - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f" Warning: Analysis write-behind flush failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "max_pending_seen": self.max_depth,
+            "queued": self.queued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "rows_per_flush": round(self.written / self.flushes, 1) if self.flushes else None,
+            "last_flush_ms": self.last_flush_ms,
+            "failed_flushes": self.failed_flushes,
+            "backoff_s": self._backoff,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+            "unwritten_at_stop": self.unwritten_at_stop,
+        }
+
+
+_default_writer = None
+
+
+def get_analysis_writer():
+    """Process-wide AnalysisWriter (None when write-behind is disabled in Config)."""
+    global _default_writer
+    if not Config.ANALYSIS_WRITE_BEHIND_ENABLED:
+        return None
+    if _default_writer is None:
+        _default_writer = AnalysisWriter()
+    return _default_writer
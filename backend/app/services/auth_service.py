@@ -3,8 +3,16 @@ from jose import jwt
 from datetime import datetime, timedelta
 from app.config import Config
 from app.models import UserInfo
+from app.http_client import get_http_client
 
 class AuthService:
+
+    def __init__(self, client: httpx.AsyncClient = None):
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
     
     async def verify_google_token(self, code: str) -> UserInfo:
         token_url = "https://oauth2.googleapis.com/token"
@@ -16,27 +24,26 @@ class AuthService:
             "redirect_uri": Config.GOOGLE_REDIRECT_URI
         }
         
-        async with httpx.AsyncClient() as client:
-           
-            response = await client.post(token_url, data=data)
-            if response.status_code != 200:
-                raise Exception("Failed to verify Google code")
-            
-            google_tokens = response.json()
-            access_token = google_tokens.get("access_token")
-            
+        client = self.client
+
+        response = await client.post(token_url, data=data)
+        if response.status_code != 200:
+            raise Exception("Failed to verify Google code")
+        
+        google_tokens = response.json()
+        access_token = google_tokens.get("access_token")
+
+        user_info_resp = await client.get(
+            "https://www.googleapis.com/oauth2/v2/userinfo",
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+        profile = user_info_resp.json()
         
-            user_info_resp = await client.get(
-                "https://www.googleapis.com/oauth2/v2/userinfo",
-                headers={"Authorization": f"Bearer {access_token}"}
-            )
-            profile = user_info_resp.json()
-            
-            return UserInfo(
-                email=profile.get("email"),
-                name=profile.get("name"),
-                picture=profile.get("picture")
-            )
+        return UserInfo(
+            email=profile.get("email"),
+            name=profile.get("name"),
+            picture=profile.get("picture")
+        )
 
    
     def create_access_token(self, data: dict):
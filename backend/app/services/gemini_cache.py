@@ -0,0 +1,133 @@
+import asyncio
+import copy
+import hashlib
+import time
+
+from sqlalchemy.exc import IntegrityError
+from app import entity
+from app.config import Config
+from app.database import SessionLocal
+from app.services.lru_cache import LRUCache
+
+
+class GeminiResponseCache:
+    """
+    Caches parsed Gemini answers by prompt content.
+
+    Key: sha256 of the model name plus the fully rendered prompt, so an
+    identical request (same file summary, README excerpt, base score, prompt
+    template) is answered without calling Gemini, whatever repo or commit it
+    came from. Entries expire after `ttl` seconds.
+
+    Tiers:
+    1. Hot: in-memory LRU (per process)
+    2. Persistent: gemini_responses rows in the app database, read and
+       written from a worker thread so the event loop never waits on the DB
+
+    Only successful answers are stored; AIService never passes the fallback
+    result in.
+    """
+
+    PURGE_EVERY = 100  # puts between deletes of expired rows
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(model_name.encode())
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8", errors="surrogatepass"))
+        return digest.hexdigest()
+
+    async def get(self, key: str):
+        result = self.memory.get(key)
+        if result is None:
+            row = await asyncio.to_thread(self._load, key)
+            if row is not None:
+                result, expires_at = row
+                self.memory.set(key, result, ttl=expires_at - time.time())
+                self.db_hits += 1
+
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(result)  # Callers may edit the dict they get
+
+    async def put(self, key: str, model_name: str, result: dict):
+        self.memory.set(key, copy.deepcopy(result))
+        self.stored += 1
+        await asyncio.to_thread(self._store, key, model_name, result, self.stored % self.PURGE_EVERY == 0)
+
+    # --- DB tier (blocking, run in a worker thread) ---
+
+    def _load(self, key: str):
+        db = SessionLocal()
+        try:
+            row = (
+                db.query(entity.GeminiResponse)
+                .filter(entity.GeminiResponse.prompt_hash == key)
+                .filter(entity.GeminiResponse.expires_at > time.time())
+                .first()
+            )
+            return (row.response, row.expires_at) if row is not None and row.response else None
+        except Exception as e:
+            print(f" Warning: Gemini cache lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: str, model_name: str, result: dict, purge: bool):
+        db = SessionLocal()
+        try:
+            row = db.query(entity.GeminiResponse).filter(entity.GeminiResponse.prompt_hash == key).first()
+            if row is None:
+                row = entity.GeminiResponse(prompt_hash=key)
+                db.add(row)
+            row.model = model_name
+            row.response = result
+            row.expires_at = time.time() + self.ttl
+            if purge:
+                db.query(entity.GeminiResponse).filter(entity.GeminiResponse.expires_at <= time.time()).delete()
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # Another worker stored the same prompt first
+        except Exception as e:
+            db.rollback()
+            print(f" Warning: Could not store Gemini response: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stored": self.stored,
+            "memory_entries": len(self.memory),
+        }
+
+
+_default_cache = None
+
+
+def get_gemini_cache():
+    """Process-wide Gemini response cache (None when disabled in Config)."""
+    global _default_cache
+    if not Config.GEMINI_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = GeminiResponseCache(
+            max_entries=Config.GEMINI_CACHE_MEMORY_ENTRIES,
+            ttl=Config.GEMINI_CACHE_TTL_HOURS * 3600,
+        )
+    return _default_cache
@@ -0,0 +1,178 @@
+import asyncio
+import time
+from collections import deque
+from app.config import Config
+
+# Priority lanes, highest first
+LANES = ("user", "anonymous")
+
+
+class GeminiExecutor:
+    """
+    Runs Gemini calls with bounded concurrency, a deadline and optional hedging.
+
+    - At most `max_concurrency` calls are in flight; the rest wait in their
+      lane. Waiting "user" calls (logged-in requests) always start before
+      "anonymous" ones, and anonymous calls never take the last
+      `user_reserved` slots, so a burst of anonymous traffic can't lock
+      signed-in users out.
+    - `timeout` bounds the whole call, queueing included. On expiry the
+      caller gets asyncio.TimeoutError (AIService answers with its fallback).
+    - Hedging: once `hedge_min_samples` latencies are known, a call still
+      running after the `hedge_percentile` latency gets a second, identical
+      request if a slot is free and nobody is queued. The first answer wins
+      and the other request is cancelled. Off when hedge_percentile is 0.
+
+    `run()` takes a factory, not a coroutine, because a hedge needs a
+    second coroutine for the same request.
+    """
+
+    def __init__(self, max_concurrency: int, timeout: float = None, user_reserved: int = 0,
+                 hedge_percentile: float = 0, hedge_min_samples: int = 20):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.user_reserved = min(user_reserved, max_concurrency - 1)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.in_flight = 0
+        self._waiters = {lane: deque() for lane in LANES}
+        self.latencies = deque(maxlen=500)  # seconds to the first answer, recent successful calls
+
+        self.calls = {lane: 0 for lane in LANES}
+        self.queued = {lane: 0 for lane in LANES}
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    # --- Slots ---
+
+    def _can_start(self, lane: str) -> bool:
+        if lane == "user":
+            return self.in_flight < self.max_concurrency
+        return not self._waiters["user"] and self.in_flight < self.max_concurrency - self.user_reserved
+
+    async def _acquire(self, lane: str):
+        if not self._waiters[lane] and self._can_start(lane):
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(waiter)
+        self.queued[lane] += 1
+        try:
+            await waiter  # _release hands the slot over (in_flight already counted)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # Got the slot just as we were cancelled
+            elif waiter in self._waiters[lane]:
+                self._waiters[lane].remove(waiter)
+            raise
+
+    def _try_acquire(self, lane: str) -> bool:
+        """A slot only if it's free right now and nobody is waiting for one (hedges never queue)."""
+        if any(self._waiters.values()) or not self._can_start(lane):
+            return False
+        self.in_flight += 1
+        return True
+
+    def _release(self, *_):
+        self.in_flight -= 1
+        for lane in LANES:
+            waiters = self._waiters[lane]
+            while waiters and self._can_start(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_flight += 1
+                    waiter.set_result(None)
+
+    # --- Calls ---
+
+    def hedge_delay(self):
+        """Seconds after which a call is hedged, or None."""
+        if not self.hedge_percentile or len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))]
+
+    def _start_attempt(self, factory) -> asyncio.Task:
+        # Slot already taken; it's released however the task ends (even if cancelled before it starts)
+        async def attempt():
+            return await factory()
+
+        task = asyncio.create_task(attempt())
+        task.add_done_callback(self._release)
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())  # Losers' errors are expected
+        return task
+
+    async def _call(self, factory, lane: str):
+        await self._acquire(lane)
+        start = time.perf_counter()
+        first = self._start_attempt(factory)
+        pending = {first}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                await asyncio.wait(pending, timeout=delay)
+                if not first.done() and self._try_acquire(lane):
+                    self.hedges += 1
+                    pending.add(self._start_attempt(factory))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        self.latencies.append(time.perf_counter() - start)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def run(self, factory, lane: str = "anonymous"):
+        """Awaits `factory()` under the executor's limits and returns its result."""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}")
+        self.calls[lane] += 1
+        try:
+            return await asyncio.wait_for(self._call(factory, lane), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000) if ordered else None
+
+        return {
+            "in_flight": self.in_flight,
+            "waiting": {lane: len(w) for lane, w in self._waiters.items()},
+            "calls": self.calls,
+            "queued": self.queued,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_ms": {"p50": percentile(50), "p95": percentile(95), "p99": percentile(99)},
+        }
+
+
+_default_executor = None
+
+
+def get_gemini_executor():
+    """Process-wide executor shared by every AIService."""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = GeminiExecutor(
+            max_concurrency=Config.GEMINI_MAX_CONCURRENCY,
+            timeout=Config.GEMINI_TIMEOUT,
+            user_reserved=Config.GEMINI_USER_RESERVED_SLOTS,
+            hedge_percentile=Config.GEMINI_HEDGE_PERCENTILE,
+            hedge_min_samples=Config.GEMINI_HEDGE_MIN_SAMPLES,
+        )
+    return _default_executor
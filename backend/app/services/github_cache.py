@@ -0,0 +1,208 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+from app.config import Config
+from app.services.lru_cache import LRUCache
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str = None
+    last_modified: str = None
+    content_type: str = "application/json"
+    link: str = None  # Pagination links of list endpoints (a 304 doesn't repeat them)
+
+    def to_response(self, request: httpx.Request = None) -> httpx.Response:
+        """Rebuilds a normal 200 response from the stored body (used when GitHub answers 304)."""
+        headers = {"Content-Type": self.content_type, "X-GitGrade-Cache": "revalidated"}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        if self.link:
+            headers["Link"] = self.link
+        return httpx.Response(200, content=self.body, headers=headers, request=request)
+
+
+class SQLiteResponseStore:
+    """
+    On-disk tier of the GitHub response cache.
+    Keeps the total stored body size under `max_bytes` by evicting the
+    least recently used rows. All calls are blocking; GitHubResponseCache
+    runs them in a worker thread.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total_bytes = 0
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(responses)")]
+            if columns and "link" not in columns:
+                # Written before Link headers were kept: its list pages would come back without
+                # their pagination, so start over
+                self._conn.execute("DROP TABLE responses")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    link TEXT,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used)")
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        return self._conn
+
+    def get(self, key: str):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, content_type, link FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return CachedResponse(body=row[0], etag=row[1], last_modified=row[2], content_type=row[3],
+                                  link=row[4])
+
+    def set(self, key: str, entry: CachedResponse):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, last_modified, content_type, link, body, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, entry.etag, entry.last_modified, entry.content_type, entry.link, entry.body, size,
+                 time.time()),
+            )
+            self._total_bytes += size
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        while self._total_bytes > self.max_bytes:
+            rows = conn.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT 50").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self) -> dict:
+        return {"path": self.path, "bytes": self._total_bytes, "max_bytes": self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class GitHubResponseCache:
+    """
+    Conditional-request cache for GitHub API responses.
+
+    Bodies are stored together with their ETag / Last-Modified headers. The
+    next request for the same URL sends If-None-Match / If-Modified-Since,
+    and a 304 is answered from the stored body. GitHub does not count 304s
+    against the rate limit.
+
+    Two tiers: a size-bounded in-memory LRU, and a SQLite file so the cache
+    survives restarts.
+    """
+
+    def __init__(self, memory_bytes: int, disk_path: str = None, disk_bytes: int = 0):
+        self.memory = LRUCache(max_bytes=memory_bytes)
+        self.disk = SQLiteResponseStore(disk_path, disk_bytes) if disk_path and disk_bytes else None
+        self.revalidated = 0
+        self.stored = 0
+
+    @classmethod
+    def from_config(cls):
+        mb = 1024 * 1024
+        return cls(
+            memory_bytes=Config.GITHUB_CACHE_MEMORY_MB * mb,
+            disk_path=Config.GITHUB_CACHE_PATH,
+            disk_bytes=Config.GITHUB_CACHE_DISK_MB * mb,
+        )
+
+    async def get(self, key: str):
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.memory.set(key, entry, size=len(entry.body))
+        return entry
+
+    async def set(self, key: str, response: httpx.Response):
+        await self.store(key, response.content, response.headers)
+
+    async def store(self, key: str, body: bytes, headers):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return  # Nothing to revalidate against, so no point storing it
+
+        entry = CachedResponse(
+            body=body,
+            etag=etag,
+            last_modified=last_modified,
+            content_type=headers.get("Content-Type", "application/json"),
+            link=headers.get("Link"),
+        )
+        self.memory.set(key, entry, size=len(entry.body))
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, entry)
+        self.stored += 1
+
+    def stats(self) -> dict:
+        return {
+            "revalidated_304": self.revalidated,
+            "stored": self.stored,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+_default_cache = None
+
+
+def get_github_cache():
+    """Process-wide cache shared by every GitHubService (None when disabled in Config)."""
+    global _default_cache
+    if not Config.GITHUB_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = GitHubResponseCache.from_config()
+    return _default_cache
@@ -0,0 +1,171 @@
+import time
+from app.config import Config
+from app.services.github_scheduler import GitHubError
+from app.services.repo_snapshot import RepoSnapshot
+
+# README names tried (in order) since GraphQL has no case-insensitive /readme lookup
+README_CANDIDATES = ["README.md", "readme.md", "Readme.md", "README.rst", "README.txt", "README"]
+
+
+def _tree_fields(depth: int) -> str:
+    """Nested TreeEntry selection, `depth` directory levels deep."""
+    if depth <= 1:
+        return "name type"
+    return f"name type object {{ ... on Tree {{ entries {{ {_tree_fields(depth - 1)} }} }} }}"
+
+
+def build_snapshot_query(tree_depth: int) -> str:
+    readme_fields = "\n".join(
+        f'readme{i}: object(expression: "HEAD:{name}") {{ ... on Blob {{ text isTruncated }} }}'
+        for i, name in enumerate(README_CANDIDATES)
+    )
+    return f"""
+    query RepoSnapshot($owner: String!, $name: String!) {{
+      repository(owner: $owner, name: $name) {{
+        name
+        owner {{ login }}
+        description
+        stargazerCount
+        forkCount
+        issues(states: OPEN) {{ totalCount }}
+        pullRequests(states: OPEN) {{ totalCount }}
+        primaryLanguage {{ name }}
+        licenseInfo {{ key name spdxId }}
+        pushedAt
+        defaultBranchRef {{ name target {{ oid }} }}
+        {readme_fields}
+        tree: object(expression: "HEAD:") {{
+          ... on Tree {{ entries {{ {_tree_fields(tree_depth)} }} }}
+        }}
+      }}
+    }}
+    """
+
+
+class GitHubGraphQLFetcher:
+    """
+    Alternative fetch backend: metadata, README text and the top levels of
+    the file tree in ONE GraphQL v4 query (instead of three REST calls plus
+    a base64 decode).
+
+    Returns the same {"metadata", "files", "readme"} shape as the REST path,
+    with metadata mapped to REST field names so ScoringService and the router
+    don't care which backend ran. If the tree is deeper than the query
+    reaches, the file list is fetched with the REST tree walker instead.
+    """
+
+    def __init__(self, github_service, tree_depth: int = None):
+        self.github = github_service
+        self.tree_depth = tree_depth or Config.GITHUB_GRAPHQL_TREE_DEPTH
+        self.query = build_snapshot_query(self.tree_depth)
+
+    @property
+    def url(self) -> str:
+        # BASE_URL is ".../repos"; the GraphQL endpoint lives next to it
+        return self.github.BASE_URL.rsplit("/repos", 1)[0] + "/graphql"
+
+    async def fetch_repo_data(self, owner: str, repo_name: str):
+        timings = {}
+        started = time.perf_counter()
+
+        resp = await self.github._timed("graphql", self.github._post_json(
+            self.url, {"query": self.query, "variables": {"owner": owner, "name": repo_name}}
+        ), timings)
+
+        if resp.status_code == 401:
+            raise GitHubError("GitHub API Token is invalid or expired.")
+        if resp.status_code != 200:
+            raise GitHubError(f"GitHub GraphQL request failed with status {resp.status_code}")
+
+        payload = resp.json()
+        repo = (payload.get("data") or {}).get("repository")
+        if repo is None:
+            errors = payload.get("errors") or []
+            if any(e.get("type") == "NOT_FOUND" for e in errors):
+                raise GitHubError("Repository not found. Check the URL.", 404)
+            raise GitHubError(f"GitHub GraphQL error: {errors[0].get('message') if errors else 'empty response'}")
+
+        files, complete = self._flatten_tree(repo.get("tree"))
+        tree_stats = {
+            "entries": len(files),
+            "requests": 0,
+            "capped": len(files) >= Config.TREE_MAX_ENTRIES,
+            "source": "graphql",
+        }
+
+        if not complete:
+            # Deeper than the query reaches: get the full list from the REST walker
+            print(f"GraphQL tree for {owner}/{repo_name} is deeper than {self.tree_depth} levels. Using REST tree walk.")
+            files, tree_stats = await self.github._timed(
+                "tree_rest", self.github._fetch_tree(owner, repo_name, "HEAD"), timings
+            )
+            tree_stats = {**tree_stats, "source": "rest"}
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"GitHub GraphQL fetch timings for {owner}/{repo_name} (ms): {timings}")
+
+        return {
+            "metadata": self._to_rest_metadata(repo),
+            "files": files,
+            "readme": self._readme_text(repo),
+            "tree_stats": tree_stats,
+            "timings": timings
+        }
+
+    def _flatten_tree(self, tree):
+        """
+        Returns (RepoSnapshot, complete?). Paths are indexed in the same
+        depth-first order as the REST recursive listing. Incomplete means
+        some directory was not expanded by the query.
+        """
+        files = RepoSnapshot()
+        complete = True
+
+        def visit(prefix, entries):
+            nonlocal complete
+            for entry in entries:
+                path = prefix + entry["name"]
+                if entry["type"] == "blob":
+                    if len(files) < Config.TREE_MAX_ENTRIES:
+                        files.add(path)
+                elif entry["type"] == "tree":
+                    sub = entry.get("object")
+                    if sub is None or "entries" not in sub:
+                        complete = False
+                    else:
+                        visit(path + "/", sub["entries"] or [])
+
+        visit("", (tree or {}).get("entries") or [])
+        return files, complete
+
+    def _readme_text(self, repo) -> str:
+        for i in range(len(README_CANDIDATES)):
+            blob = repo.get(f"readme{i}")
+            if blob and blob.get("text"):
+                return blob["text"]
+        return ""
+
+    def _to_rest_metadata(self, repo) -> dict:
+        """Maps GraphQL field names onto the REST /repos/{owner}/{repo} shape."""
+        license_info = repo.get("licenseInfo")
+        language = repo.get("primaryLanguage")
+        default_branch = repo.get("defaultBranchRef") or {}
+
+        return {
+            "name": repo.get("name"),
+            "owner": {"login": (repo.get("owner") or {}).get("login")},
+            "description": repo.get("description"),
+            "stargazers_count": repo.get("stargazerCount", 0),
+            "forks_count": repo.get("forkCount", 0),
+            # REST counts open PRs as issues too
+            "open_issues_count": (repo.get("issues") or {}).get("totalCount", 0)
+                                 + (repo.get("pullRequests") or {}).get("totalCount", 0),
+            "language": language.get("name") if language else None,
+            "license": {
+                "key": license_info.get("key"),
+                "name": license_info.get("name"),
+                "spdx_id": license_info.get("spdxId"),
+            } if license_info else None,
+            "pushed_at": repo.get("pushedAt"),
+            "default_branch": default_branch.get("name", "main"),
+        }
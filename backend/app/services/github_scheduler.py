@@ -0,0 +1,173 @@
+import asyncio
+import time
+from app.config import Config
+
+
+class RateLimitExceeded(Exception):
+    """Every GitHub token is (nearly) out of quota and won't reset soon enough."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(1, int(retry_after))
+        super().__init__(f"GitHub API rate limit reached. Try again in {self.retry_after}s.")
+
+
+class GitHubError(Exception):
+    """
+    GitHub refused or failed a call. `status_code` is how our API reports
+    it: 404 for a repository or owner that doesn't exist, 502 otherwise.
+    """
+
+    def __init__(self, message: str, status_code: int = 502):
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class TokenBudget:
+    """What we currently know about one token's rate limit window."""
+
+    def __init__(self, token: str = None):
+        self.token = token
+        # GitHub gives 5,000 req/h per token and 60 req/h without one.
+        # Assumed until the first response tells us the real numbers.
+        self.limit = 5000 if token else 60
+        self.remaining = self.limit
+        self.reset_at = time.time() + 3600
+        self._estimated = True  # Until GitHub reports the real window
+        self.in_flight = 0
+        self.requests = 0
+
+    @property
+    def label(self) -> str:
+        return f"...{self.token[-4:]}" if self.token else "anonymous"
+
+    @property
+    def available(self) -> int:
+        return self.remaining - self.in_flight
+
+    def auth_headers(self) -> dict:
+        return {"Authorization": f"token {self.token}"} if self.token else {}
+
+    def refill_if_reset(self, now: float):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + 3600
+            self._estimated = True
+
+    def update(self, headers):
+        if "X-RateLimit-Remaining" not in headers or "X-RateLimit-Reset" not in headers:
+            return
+        # This budget is the REST ("core") limit. GraphQL and search report their own
+        # resources (points, separate reset) in the same headers.
+        if headers.get("X-RateLimit-Resource", "core") != "core":
+            return
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_at = float(headers["X-RateLimit-Reset"])
+            self.limit = int(headers.get("X-RateLimit-Limit", self.limit))
+        except ValueError:
+            return
+
+        if reset_at == self.reset_at:
+            # Same window: responses can arrive out of order, and the budget only goes down
+            self.remaining = min(self.remaining, remaining)
+        elif reset_at > self.reset_at or self._estimated:
+            self.remaining = remaining
+            self.reset_at = reset_at
+        self._estimated = False
+
+
+class GitHubRateLimiter:
+    """
+    Spreads GitHub requests over a pool of tokens using the
+    X-RateLimit-Remaining / X-RateLimit-Reset headers of every response.
+
+    Each request takes the token with the most budget left. Once every
+    token is down to `reserve` calls, new work is queued until a window
+    resets, or shed with RateLimitExceeded if that is more than
+    `max_wait` seconds away. This way we stop before GitHub starts
+    rejecting calls.
+    """
+
+    def __init__(self, tokens: list, reserve: int, max_wait: float):
+        self.budgets = [TokenBudget(t) for t in tokens] or [TokenBudget(None)]
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.queued = 0
+        self.shed = 0
+        self._cond = asyncio.Condition()
+
+    def _pick(self):
+        now = time.time()
+        best = None
+        for budget in self.budgets:
+            budget.refill_if_reset(now)
+            reserve = min(self.reserve, budget.limit // 10)
+            if budget.available > reserve and (best is None or budget.available > best.available):
+                best = budget
+        return best
+
+    async def acquire(self) -> TokenBudget:
+        async with self._cond:
+            deadline = time.time() + self.max_wait
+            waited = False
+            while True:
+                budget = self._pick()
+                if budget:
+                    budget.in_flight += 1
+                    budget.requests += 1
+                    return budget
+
+                now = time.time()
+                next_reset = min(b.reset_at for b in self.budgets)
+                if next_reset > deadline:
+                    self.shed += 1
+                    raise RateLimitExceeded(next_reset - now)
+
+                if not waited:
+                    waited = True
+                    self.queued += 1
+                try:
+                    # Woken early when an in-flight call finishes; otherwise at the next reset
+                    await asyncio.wait_for(self._cond.wait(), timeout=max(0.05, next_reset - now))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, budget: TokenBudget, headers=None):
+        async with self._cond:
+            budget.in_flight -= 1
+            if headers is not None:
+                budget.update(headers)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            "queued": self.queued,
+            "shed": self.shed,
+            "tokens": [
+                {
+                    "token": b.label,
+                    "limit": b.limit,
+                    "remaining": b.remaining,
+                    "in_flight": b.in_flight,
+                    "resets_in_s": max(0, int(b.reset_at - now)),
+                    "requests": b.requests,
+                }
+                for b in self.budgets
+            ],
+        }
+
+
+_default_limiter = None
+
+
+def get_github_rate_limiter():
+    """Process-wide limiter shared by every GitHubService."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = GitHubRateLimiter(
+            Config.GITHUB_TOKENS,
+            reserve=Config.GITHUB_RATE_LIMIT_RESERVE,
+            max_wait=Config.GITHUB_RATE_LIMIT_MAX_WAIT,
+        )
+    return _default_limiter
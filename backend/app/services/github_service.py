@@ -1,68 +1,373 @@
+import asyncio
+import time
 import httpx
 import base64
+from contextlib import aclosing
+from urllib.parse import quote
 from app.config import Config
+from app.http_client import get_http_client
+from app.services.github_cache import GitHubResponseCache, get_github_cache
+from app.services.github_scheduler import GitHubError, GitHubRateLimiter, RateLimitExceeded, get_github_rate_limiter
+from app.services.github_graphql import GitHubGraphQLFetcher
+from app.services.repo_snapshot import RepoSnapshot
+from app.services.tree_walker import TreeWalker
+
+_USE_DEFAULT_CACHE = object()
 
 class GitHubService:
-    BASE_URL = "https://api.github.com/repos"
+    BASE_URL = f"{Config.GITHUB_API_URL}/repos"
+
+    # The compare API lists at most this many changed files
+    COMPARE_MAX_FILES = 300
+
+    # Streamed bodies larger than this are not kept in the ETag cache
+    MAX_CACHED_STREAM_BYTES = Config.GITHUB_CACHE_MAX_ENTRY_MB * 1024 * 1024
+
+    def __init__(self, client: httpx.AsyncClient = None, base_url: str = None, cache=_USE_DEFAULT_CACHE,
+                 rate_limiter: GitHubRateLimiter = None, fetch_mode: str = None):
+        # The pooled app-wide client is used unless one is injected explicitly
+        self._client = client
+        if base_url:
+            self.BASE_URL = base_url
+        # Pass cache=None to talk to GitHub without the ETag cache
+        self.cache: GitHubResponseCache = get_github_cache() if cache is _USE_DEFAULT_CACHE else cache
+        self.rate_limiter = rate_limiter or get_github_rate_limiter()
+        self.fetch_mode = fetch_mode or Config.GITHUB_FETCH_MODE
+        self.graphql = GitHubGraphQLFetcher(self)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+
+    async def _conditional_headers(self, url: str, headers: dict = None):
+        # Token auth is added per request by the rate limiter, so only Accept comes from Config
+        headers = {"Accept": Config.GITHUB_HEADERS.get("Accept", "application/vnd.github+json"), **(headers or {})}
+        cached = await self.cache.get(url) if self.cache else None
+        if cached:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers, cached
+
+    def _is_quota_error(self, resp: httpx.Response) -> bool:
+        return resp.status_code in (403, 429) and resp.headers.get("X-RateLimit-Remaining") == "0"
+
+    async def _send(self, url: str, headers: dict, stream: bool = False) -> httpx.Response:
+        """
+        Sends one GET through the rate limiter. If the chosen token turns out
+        to be exhausted, the call is retried once per remaining token. With
+        `stream`, the body of the response returned is not read yet: the
+        caller reads it and closes the response.
+        """
+        resp = None
+        for _ in range(len(self.rate_limiter.budgets)):
+            if resp is not None:
+                await resp.aclose()  # The exhausted token's answer
+            budget = await self.rate_limiter.acquire()
+            resp = None
+            try:
+                request = self.client.build_request("GET", url, headers={**headers, **budget.auth_headers()})
+                resp = await self.client.send(request, stream=stream)
+            finally:
+                await self.rate_limiter.release(budget, resp.headers if resp is not None else None)
+            if not self._is_quota_error(resp):
+                return resp
+        return resp
+
+    async def _post_json(self, url: str, payload: dict) -> httpx.Response:
+        """
+        POST (used for GraphQL) through the rate limiter. Never cached. The
+        response's X-RateLimit-* headers are GraphQL's own limit, which
+        TokenBudget.update ignores.
+        """
+        budget = await self.rate_limiter.acquire()
+        resp = None
+        try:
+            resp = await self.client.post(url, json=payload, headers=budget.auth_headers())
+        finally:
+            await self.rate_limiter.release(budget, resp.headers if resp is not None else None)
+        return resp
+
+    async def _get(self, url: str, headers: dict = None) -> httpx.Response:
+        """
+        GET against the GitHub API through the ETag cache.
+        If we have seen this URL before, the request is made conditional and
+        a 304 is turned back into a normal 200 using the stored body.
+        """
+        headers, cached = await self._conditional_headers(url, headers)
+
+        resp = await self._send(url, headers)
+
+        if resp.status_code == 304 and cached:
+            self.cache.revalidated += 1
+            return cached.to_response(resp.request)
+        if resp.status_code == 200 and self.cache:
+            await self.cache.set(url, resp)
+        return resp
+
+    async def _stream_bytes(self, url: str, headers: dict = None):
+        """
+        Like _get, but yields the body in chunks as it downloads (used for
+        large tree listings). The body is only kept for the ETag cache if it
+        stays under MAX_CACHED_STREAM_BYTES.
+        """
+        headers, cached = await self._conditional_headers(url, headers)
+
+        resp = await self._send(url, headers, stream=True)
+        try:
+            async with aclosing(self._iter_stream(url, resp, cached)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await resp.aclose()
+
+    async def _iter_stream(self, url: str, resp: httpx.Response, cached):
+        if resp.status_code == 304 and cached:
+            self.cache.revalidated += 1
+            for i in range(0, len(cached.body), 65536):
+                yield cached.body[i:i + 65536]
+            return
+
+        if resp.status_code != 200:
+            raise GitHubError(f"GitHub returned {resp.status_code} for {url}")
+
+        body = bytearray() if self.cache else None
+        async for chunk in resp.aiter_bytes():
+            if body is not None:
+                body += chunk
+                if len(body) > self.MAX_CACHED_STREAM_BYTES:
+                    body = None
+            yield chunk
+
+        if body is not None:
+            await self.cache.store(url, bytes(body), resp.headers)
+
+    async def _fetch_tree(self, owner: str, repo_name: str, ref: str):
+        """Indexes the (capped) file list from TreeWalker. Returns (RepoSnapshot, walk stats)."""
+        walker = TreeWalker(self)
+        files = RepoSnapshot()
+        async with aclosing(walker.walk(owner, repo_name, ref)) as paths:
+            async for path in paths:
+                files.add(path)
+
+        if walker.stats["capped"]:
+            print(f"Warning: File list for {owner}/{repo_name} capped at {len(files)} entries")
+        if walker.stats["failed_listings"]:
+            print(f"Warning: File list for {owner}/{repo_name} is incomplete "
+                  f"({walker.stats['failed_listings']} subtrees could not be listed)")
+        return files, walker.stats
+
+    async def fetch_head_sha(self, owner: str, repo_name: str):
+        """
+        Returns the commit SHA of the default branch HEAD, or None if it
+        cannot be resolved. Cheap: the 'sha' media type returns just 40 bytes,
+        and repeat calls are usually a free 304.
+        """
+        resp = await self._get(
+            f"{self.BASE_URL}/{owner}/{repo_name}/commits/HEAD",
+            headers={"Accept": "application/vnd.github.sha"}
+        )
+        if resp.status_code != 200:
+            return None
+        sha = resp.text.strip()
+        return sha if len(sha) == 40 else None
+
+    def _metadata_from(self, resp: httpx.Response) -> dict:
+        if resp.status_code == 404:
+            raise GitHubError("Repository not found. Check the URL.", 404)
+        if resp.status_code == 401:
+            raise GitHubError("GitHub API Token is invalid or expired.")
+        return resp.json()
+
+    def _readme_from(self, resp: httpx.Response) -> str:
+        if resp.status_code != 200:
+            return ""
+        content_b64 = resp.json()['content']
+        return base64.b64decode(content_b64).decode('utf-8', errors='ignore')
+
+    async def fetch_file(self, owner: str, repo_name: str, path: str, ref: str = "HEAD"):
+        """
+        Text of one file at `ref` from the contents API (ETag-cached like
+        every GET), or None if it doesn't exist there or is too large for it.
+        """
+        resp = await self._get(f"{self.BASE_URL}/{owner}/{repo_name}/contents/{quote(path)}?ref={quote(ref)}")
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        if not isinstance(data, dict) or data.get("encoding") != "base64":
+            return None  # A directory, or a file over the API's 1 MB inline limit
+        return base64.b64decode(data["content"]).decode("utf-8", errors="ignore")
+
+    async def fetch_repo_summary(self, owner: str, repo_name: str):
+        """Metadata and README only (no file tree). Returns {"metadata", "readme"}."""
+        repo_url = f"{self.BASE_URL}/{owner}/{repo_name}"
+        metadata_resp, readme_resp = await asyncio.gather(
+            self._get(repo_url), self._get(f"{repo_url}/readme")
+        )
+        return {"metadata": self._metadata_from(metadata_resp), "readme": self._readme_from(readme_resp)}
+
+    async def list_repos(self, owner: str, limit: int, include_forks: bool = False, include_archived: bool = False):
+        """
+        Public repositories of a user or organization, most recently pushed
+        first, at most `limit` (after leaving out forks and archived repos
+        unless asked). Each is the listing's repo object (name, full_name,
+        stargazers_count, ...). Pages after the first are fetched together,
+        once the first one's Link header says how many there are.
+        """
+        per_page = 100
+        url = f"{self.BASE_URL.rsplit('/repos', 1)[0]}/users/{owner}/repos?type=owner&sort=pushed&per_page={per_page}"
+        first = await self._get(f"{url}&page=1")
+        if first.status_code == 404:
+            raise GitHubError("GitHub user or organization not found.", 404)
+        if first.status_code != 200:
+            raise GitHubError(f"GitHub returned {first.status_code} listing the repositories of {owner}")
+
+        last_page = 1
+        last_url = first.links.get("last", {}).get("url")
+        if last_url:
+            last_page = int(httpx.URL(last_url).params.get("page", 1))
+        # Forks and archived repos are left out after fetching, so read a page ahead of the limit
+        pages = min(last_page, -(-limit // per_page) + (0 if include_forks and include_archived else 1))
+        responses = [first] + list(await asyncio.gather(*(self._get(f"{url}&page={n}") for n in range(2, pages + 1))))
+
+        repos = []
+        for resp in responses:
+            if resp.status_code != 200:
+                print(f"Warning: A page of {owner}'s repositories failed with status {resp.status_code}")
+                continue
+            repos.extend(
+                repo for repo in resp.json()
+                if (include_forks or not repo.get("fork")) and (include_archived or not repo.get("archived"))
+            )
+        return repos[:limit]
+
+    async def fetch_changed_files(self, owner: str, repo_name: str, base_sha: str, head_sha: str):
+        """
+        Paths added and removed between two commits, from the compare API.
+        Returns (added, removed), or None when the diff is not a complete
+        tree delta: history was rewritten (head does not descend from base,
+        so GitHub diffs against the merge base) or GitHub's file list cap
+        was reached.
+        """
+        resp = await self._get(f"{self.BASE_URL}/{owner}/{repo_name}/compare/{base_sha}...{head_sha}")
+        if resp.status_code != 200:
+            print(f"Warning: Compare {base_sha[:7]}...{head_sha[:7]} failed with status {resp.status_code}")
+            return None
+
+        data = resp.json()
+        if data.get("status") == "identical":
+            return [], []
+        if data.get("status") != "ahead":
+            return None
+        changes = data.get("files") or []
+        if len(changes) >= self.COMPARE_MAX_FILES:
+            return None
+
+        added, removed = [], []
+        for change in changes:
+            status = change.get("status")
+            if status in ("added", "copied"):
+                added.append(change["filename"])
+            elif status == "removed":
+                removed.append(change["filename"])
+            elif status == "renamed":
+                removed.append(change["previous_filename"])
+                added.append(change["filename"])
+            # modified / changed / unchanged: same path, nothing to update
+        return added, removed
+
+    async def _timed(self, name: str, coro, timings: dict):
+        # Records how long each GitHub call took (ms), for the per-analysis timing log
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            timings[name] = round((time.perf_counter() - start) * 1000, 1)
 
     async def fetch_repo_data(self, owner: str, repo_name: str):
+        """
+        Returns {"metadata", "files", "readme", ...} using the configured
+        backend (GITHUB_FETCH_MODE). GraphQL needs a token, so without one we
+        always use REST.
+        """
+        if self.fetch_mode == "graphql" and any(b.token for b in self.rate_limiter.budgets):
+            return await self.graphql.fetch_repo_data(owner, repo_name)
+        return await self._fetch_repo_data_rest(owner, repo_name)
+
+    async def _fetch_repo_data_rest(self, owner: str, repo_name: str):
         """
         Fetches:
         1. Metadata (stars, forks, description)
         2. FULL Recursive File Tree (The Fix for Shallow Vision)
         3. README.md content
+
+        All three requests are started at once. The tree call does not wait
+        for 'default_branch' from the metadata: it speculatively asks for
+        HEAD (which GitHub resolves to the default branch) and is only
+        retried with the real branch name if that guess fails.
         """
-        async with httpx.AsyncClient() as client:
-            
+        repo_url = f"{self.BASE_URL}/{owner}/{repo_name}"
+        timings = {}
+        started = time.perf_counter()
+
+        metadata_task = asyncio.create_task(self._timed(
+            "metadata", self._get(repo_url), timings
+        ))
+        tree_task = asyncio.create_task(self._timed(
+            "tree", self._fetch_tree(owner, repo_name, "HEAD"), timings
+        ))
+        readme_task = asyncio.create_task(self._timed(
+            "readme", self._get(f"{repo_url}/readme"), timings
+        ))
+
+        try:
             # --- Request 1: Get Basic Metadata ---
-            repo_resp = await client.get(
-                f"{self.BASE_URL}/{owner}/{repo_name}",
-                headers=Config.GITHUB_HEADERS
-            )
-            
-            if repo_resp.status_code == 404:
-                raise Exception("Repository not found. Check the URL.")
-            if repo_resp.status_code == 401:
-                raise Exception("GitHub API Token is invalid or expired.")
-            
-            repo_data = repo_resp.json()
+            repo_data = self._metadata_from(await metadata_task)
 
             # --- Request 2: Get FULL Recursive File Structure (The Critical Fix) ---
-            # Step A: Find the default branch (usually 'main' or 'master')
-            default_branch = repo_data.get("default_branch", "main")
-            
-            # Step B: Fetch the Git Tree recursively
-            tree_resp = await client.get(
-                f"{self.BASE_URL}/{owner}/{repo_name}/git/trees/{default_branch}?recursive=1",
-                headers=Config.GITHUB_HEADERS
-            )
-            
-            files = []
-            if tree_resp.status_code == 200:
-                tree_data = tree_resp.json()
-                # Filter: Get 'path' only for items that are files (type='blob')
-                # We skip folders (type='tree') because we just want the file paths
-                files = [item['path'] for item in tree_data.get('tree', []) if item['type'] == 'blob']
-            else:
-                # Fallback: If recursive fetch fails (rare), return empty list to prevent crash
-                print(f"Warning: Recursive tree fetch failed with status {tree_resp.status_code}")
-                files = []
+            # Only file paths (type='blob') are kept; folders are walked, not listed
+            try:
+                files, tree_stats = await tree_task
+            except RateLimitExceeded:
+                raise
+            except Exception as e:
+                # The speculative HEAD lookup missed: retry with the actual default branch
+                print(f"Warning: Tree fetch for HEAD failed ({e}). Retrying with default branch.")
+                default_branch = repo_data.get("default_branch", "main")
+                try:
+                    files, tree_stats = await self._timed(
+                        "tree_retry",
+                        self._fetch_tree(owner, repo_name, default_branch),
+                        timings
+                    )
+                except RateLimitExceeded:
+                    raise
+                except Exception as e:
+                    # Fallback: If recursive fetch fails (rare), return empty list to prevent crash.
+                    # Counted as a failed listing, so the result isn't cached as this commit's
+                    print(f"Warning: Recursive tree fetch failed: {e}")
+                    files, tree_stats = RepoSnapshot(), {"failed_listings": 1}
 
             # --- Request 3: Get README Content ---
-            readme_content = ""
-            readme_resp = await client.get(
-                f"{self.BASE_URL}/{owner}/{repo_name}/readme",
-                headers=Config.GITHUB_HEADERS
-            )
-            
-            if readme_resp.status_code == 200:
-                data = readme_resp.json()
-                content_b64 = data['content']
-                readme_content = base64.b64decode(content_b64).decode('utf-8', errors='ignore')
-
-            # Return the data
-            return {
-                "metadata": repo_data,
-                "files": files,       # Now contains ["src/App.tsx", "backend/main.py", etc.]
-                "readme": readme_content
-            }
\ No newline at end of file
+            readme_content = self._readme_from(await readme_task)
+
+        finally:
+            # If we bailed out early (404, bad token, network error) drop the in-flight calls
+            tasks = (metadata_task, tree_task, readme_task)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"GitHub fetch timings for {owner}/{repo_name} (ms): {timings}")
+
+        # Return the data
+        return {
+            "metadata": repo_data,
+            "files": files,       # RepoSnapshot of ["src/App.tsx", "backend/main.py", etc.]
+            "readme": readme_content,
+            "tree_stats": tree_stats,
+            "timings": timings
+        }
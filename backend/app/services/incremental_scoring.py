@@ -0,0 +1,265 @@
+import asyncio
+from bisect import insort
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import entity
+from app.config import Config
+from app.services.ai_service import AIService
+from app.services.github_scheduler import RateLimitExceeded
+from app.services.github_service import GitHubService
+from app.services.scoring_service import ScoringService
+
+
+class PathSample:
+    """
+    The first `limit` paths of a tree that pass a filter, in tree order
+    (GitHub lists trees in sorted path order) or by a `key`, kept current
+    from lists of added and removed paths. `complete` means no further path
+    in the tree passes the filter. The filter and key aren't stored: pass
+    the ones the sample was built with to apply().
+    """
+
+    def __init__(self, paths: list, complete: bool, limit: int):
+        self.paths = paths
+        self.complete = complete
+        self.limit = limit
+
+    @classmethod
+    def build(cls, files, limit: int, keep=None):
+        paths = []
+        for path in files:
+            if keep is None or keep(path):
+                if len(paths) == limit:
+                    return cls(paths, False, limit)
+                paths.append(path)
+        return cls(paths, True, limit)
+
+    def apply(self, added=(), removed=(), keep=None, key=None):
+        removed = set(removed)
+        paths = [p for p in self.paths if p not in removed]
+        order = key or (lambda p: p)
+        for path in added:
+            if keep is not None and not keep(path):
+                continue
+            if not self.complete and (not paths or order(path) > order(paths[-1])):
+                continue  # Past the part of the tree we know about
+            if path not in paths:
+                insort(paths, path, key=key)
+
+        complete = self.complete
+        if len(paths) > self.limit:
+            paths, complete = paths[:self.limit], False
+        return PathSample(paths, complete, self.limit)
+
+    def first(self, n: int):
+        """The first n paths, or None if the sample no longer knows them all."""
+        if len(self.paths) < n and not self.complete:
+            return None
+        return self.paths[:n]
+
+    def to_json(self) -> dict:
+        return {"paths": self.paths, "complete": self.complete, "limit": self.limit}
+
+    @classmethod
+    def from_json(cls, data: dict):
+        return cls(list(data["paths"]), data["complete"], data["limit"])
+
+
+class IncrementalScorer:
+    """
+    Re-analyses a repository from the commit diff instead of the whole tree.
+
+    After every full tree download the router stores a RepoState row with:
+    - ScoringService's per-rule counters (pattern occurrences, file counts)
+    - the counters behind the prompt's monorepo / .gitignore flags
+    - the first paths of the tree, for `file_structure`
+    - the prompt's best-ranked files and per-directory file counts (PromptBuilder)
+
+    When the same repo is analysed at a newer commit, the compare API gives
+    the added / removed / renamed paths since the stored commit. Only those
+    paths update the counters and samples, and the score is computed from
+    the counters. The tree is downloaded again whenever the diff can't be
+    trusted (rewritten history, more changed files than GitHub lists, a
+    sample that ran out of paths).
+    """
+
+    FILE_STRUCTURE_LIMIT = 50
+    # Samples keep this many times what is shown, so removals rarely exhaust them
+    SAMPLE_SLACK = 2
+
+    def __init__(self, github_service: GitHubService = None, scoring_service: ScoringService = None,
+                 ai_service: AIService = None):
+        self.github = github_service or GitHubService()
+        self.scoring = scoring_service or ScoringService()
+        self.ai = ai_service or AIService()
+        self.incremental = 0
+        self.fallbacks = 0
+        self.paths_applied = 0
+
+    @staticmethod
+    def repo_key(owner: str, repo_name: str) -> str:
+        return f"{owner}/{repo_name}".lower()
+
+    # --- State ---
+
+    def build_state(self, files, tree_stats: dict):
+        """Counters and samples for a freshly downloaded tree (None if the listing was incomplete)."""
+        if not tree_stats or any(
+            tree_stats.get(k) for k in ("capped", "skipped_too_deep", "truncated_by_github", "failed_listings")
+        ):
+            return None
+        limit = self.ai.prompt_builder.CANDIDATE_LIMIT * self.SAMPLE_SLACK
+        candidates, complete, rollups = self.ai.prompt_builder.scan(files, limit)
+        return {
+            "scoring": self.scoring.feature_counts(files),
+            "prompt_flags": self.ai.file_flags.count(files),
+            "file_structure": PathSample.build(
+                files, self.FILE_STRUCTURE_LIMIT * self.SAMPLE_SLACK
+            ).to_json(),
+            "prompt_files": PathSample(candidates, complete, limit).to_json(),
+            "prompt_rollups": rollups,
+        }
+
+    def apply_changes(self, state: dict, added: list, removed: list):
+        """New state after a diff, or None if the stored state doesn't match it."""
+        scoring = self.scoring.path_features.apply_changes(state["scoring"], added, removed)
+        flags = self.ai.file_flags.apply_changes(state["prompt_flags"], added, removed)
+        for counts in (scoring, flags):
+            if counts["total_files"] < 0 or counts["root_files"] < 0 or min(counts["patterns"].values(), default=0) < 0:
+                return None  # Removed paths we never counted (e.g. submodules)
+
+        builder = self.ai.prompt_builder
+        rollups = builder.apply_changes(
+            state["prompt_rollups"], builder.rollup_counts(added), builder.rollup_counts(removed)
+        )
+        if any(n < 0 for by_ext in rollups.values() for n in by_ext.values()):
+            return None
+
+        file_structure = PathSample.from_json(state["file_structure"]).apply(added, removed)
+        prompt_files = PathSample.from_json(state["prompt_files"]).apply(
+            added, removed, builder.is_candidate, builder.rank_key
+        )
+        if (file_structure.first(self.FILE_STRUCTURE_LIMIT) is None
+                or prompt_files.first(builder.CANDIDATE_LIMIT) is None):
+            return None
+
+        return {
+            "scoring": scoring,
+            "prompt_flags": flags,
+            "file_structure": file_structure.to_json(),
+            "prompt_files": prompt_files.to_json(),
+            "prompt_rollups": rollups,
+        }
+
+    def file_structure(self, state: dict) -> list:
+        return PathSample.from_json(state["file_structure"]).first(self.FILE_STRUCTURE_LIMIT)
+
+    def file_context(self, state: dict):
+        """The (is_monorepo, has_gitignore, files_digest) prompt input, without the tree."""
+        flags = self.ai.file_flags.features_from_counts(state["prompt_flags"])
+        digest = {
+            "total_files": state["prompt_flags"]["total_files"],
+            "candidates": PathSample.from_json(state["prompt_files"]).first(self.ai.prompt_builder.CANDIDATE_LIMIT),
+            "rollups": state["prompt_rollups"],
+        }
+        return self.ai.file_context(flags, digest)
+
+    # --- Persistence ---
+
+    async def load(self, db: AsyncSession, owner: str, repo_name: str):
+        """Stored RepoState usable with the current rules, or None."""
+        try:
+            row = (await db.execute(
+                select(entity.RepoState).where(entity.RepoState.repo_key == self.repo_key(owner, repo_name))
+            )).scalars().first()
+        except Exception as e:
+            print(f" Warning: Repo state lookup failed: {e}")
+            await db.rollback()
+            return None
+
+        if row is None or row.scoring_version != ScoringService.VERSION or not row.feature_state:
+            return None
+        state = row.feature_state
+        if not (self.scoring.path_features.accepts(state.get("scoring"))
+                and self.ai.file_flags.accepts(state.get("prompt_flags"))
+                and "prompt_rollups" in state):  # Stored before the prompt file ranking
+            return None
+        return row
+
+    async def save(self, db: AsyncSession, owner: str, repo_name: str, head_sha: str, state: dict):
+        try:
+            key = self.repo_key(owner, repo_name)
+            row = (await db.execute(
+                select(entity.RepoState).where(entity.RepoState.repo_key == key)
+            )).scalars().first()
+            if row is None:
+                row = entity.RepoState(repo_key=key)
+                db.add(row)
+            row.commit_sha = head_sha
+            row.scoring_version = ScoringService.VERSION
+            row.feature_state = state
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            print(f" Warning: Could not save repo state: {e}")
+
+    # --- Fetching ---
+
+    async def fetch_repo_data(self, owner: str, repo_name: str, row, head_sha: str):
+        """
+        Metadata, README and the updated state for `head_sha`, from the
+        stored state at `row.commit_sha` plus the diff between the two.
+        Returns {"metadata", "readme", "state", "changes"}, or None when the
+        caller has to download the tree.
+        """
+        summary_task = asyncio.create_task(self.github.fetch_repo_summary(owner, repo_name))
+        try:
+            if row.commit_sha == head_sha:
+                changes = ([], [])  # Same tree; only the prompt or cache entry changed
+            else:
+                try:
+                    changes = await self.github.fetch_changed_files(owner, repo_name, row.commit_sha, head_sha)
+                except RateLimitExceeded:
+                    raise
+                except Exception as e:
+                    print(f" Warning: Could not compare commits for {owner}/{repo_name}: {e}")
+                    changes = None
+
+            state = self.apply_changes(row.feature_state, *changes) if changes is not None else None
+            if state is None:
+                self.fallbacks += 1
+                print(f"Incremental rescoring not possible for {owner}/{repo_name}. Downloading the tree.")
+                return None
+
+            summary = await summary_task
+        finally:
+            if not summary_task.done():
+                summary_task.cancel()
+                await asyncio.gather(summary_task, return_exceptions=True)
+
+        added, removed = changes
+        self.incremental += 1
+        self.paths_applied += len(added) + len(removed)
+        print(f"Incremental rescoring for {owner}/{repo_name}: +{len(added)} / -{len(removed)} paths "
+              f"since {row.commit_sha[:7]}")
+        return {**summary, "state": state, "changes": {"added": len(added), "removed": len(removed)}}
+
+    def stats(self) -> dict:
+        return {
+            "incremental": self.incremental,
+            "fallbacks": self.fallbacks,
+            "paths_applied": self.paths_applied,
+        }
+
+
+_default_scorer = None
+
+
+def get_incremental_scorer():
+    """Process-wide incremental scorer (None when disabled in Config)."""
+    global _default_scorer
+    if not Config.INCREMENTAL_SCORING_ENABLED:
+        return None
+    if _default_scorer is None:
+        _default_scorer = IncrementalScorer()
+    return _default_scorer
@@ -0,0 +1,353 @@
+import asyncio
+import os
+import time
+import uuid
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import entity
+from app.config import Config
+from app.database import AsyncSessionLocal
+from app.services.github_scheduler import RateLimitExceeded
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+LANE_PRIORITY = {"user": 0, "anonymous": 1}
+NO_SYNC = {"synchronize_session": False}  # Our UPDATE/DELETEs: no loaded objects to update
+
+
+class QueueFull(Exception):
+    """Too many jobs are waiting already."""
+
+    def __init__(self, queued: int):
+        self.queued = queued
+        super().__init__(f"The analysis queue is full ({queued} jobs waiting). Try again later.")
+
+
+class JobQueue:
+    """
+    Durable queue of analysis jobs, stored in the analysis_jobs table, so
+    queued and unfinished jobs survive restarts and are shared by every
+    process using the same database.
+
+    Claiming is safe with any number of workers and processes: candidates
+    are read with FOR UPDATE SKIP LOCKED (Postgres; SQLite has no row
+    locks and ignores it), and a job is only taken by an UPDATE that still
+    sees the status and lease it was read with, so two workers never get
+    the same job. Signed-in users' jobs go first, then the oldest.
+
+    A claimed job is leased for JOB_LEASE_SECONDS, renewed while it runs.
+    If its worker dies the lease runs out and the job is claimed again,
+    up to JOB_MAX_ATTEMPTS runs in total. Jobs that hit GitHub's rate
+    limit are requeued for when it resets, within the same attempt limit.
+    """
+
+    CLAIM_CANDIDATES = 8  # Rows read per claim (more than one, so a race lost doesn't mean an idle poll)
+
+    def __init__(self, lease_seconds: float = None, max_attempts: int = None, max_queued: int = None):
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+        self.max_queued = max_queued or Config.JOB_MAX_QUEUED
+        self.wakeup = None  # asyncio.Event of this process's worker pool, set on enqueue
+        self.enqueued = 0
+        self.claimed = 0
+        self.reclaimed = 0  # Claimed again after a lease ran out
+        self.retried = 0
+        self.completed = 0
+        self.failed = 0
+
+    # --- Producers ---
+
+    async def enqueue(self, db: AsyncSession, github_url: str, mode: str = "full", lane: str = "anonymous",
+                      user_id: int = None) -> entity.AnalysisJob:
+        """Adds a job and returns it. Raises QueueFull beyond JOB_MAX_QUEUED waiting jobs."""
+        queued = await db.scalar(
+            select(func.count(entity.AnalysisJob.id)).where(entity.AnalysisJob.status == QUEUED)
+        )
+        if queued >= self.max_queued:
+            raise QueueFull(queued)
+        job = entity.AnalysisJob(
+            id=uuid.uuid4().hex,
+            status=QUEUED,
+            priority=LANE_PRIORITY.get(lane, 1),
+            available_at=time.time(),
+            github_url=github_url,
+            mode=mode,
+            lane=lane,
+            user_id=user_id,
+            attempts=0,
+        )
+        db.add(job)
+        await db.commit()
+        self.enqueued += 1
+        if self.wakeup is not None:
+            self.wakeup.set()
+        return job
+
+    async def get(self, db: AsyncSession, job_id: str):
+        return await db.get(entity.AnalysisJob, job_id)
+
+    async def position(self, db: AsyncSession, job: entity.AnalysisJob) -> int:
+        """Queued jobs that will be claimed before `job`."""
+        Job = entity.AnalysisJob
+        return await db.scalar(select(func.count(Job.id)).where(
+            Job.status == QUEUED,
+            or_(Job.priority < job.priority,
+                and_(Job.priority == job.priority, Job.available_at < job.available_at)),
+        ))
+
+    # --- Workers ---
+
+    async def claim(self, db: AsyncSession, worker_id: str):
+        """
+        Takes the next available job for `worker_id` and returns it as a dict
+        ({"id", "github_url", "mode", "lane", "user_id", "attempts"}), or None.
+        """
+        Job = entity.AnalysisJob
+        now = time.time()
+        candidates = (await db.execute(
+            select(Job.id, Job.status, Job.locked_until, Job.attempts)
+            .where(or_(
+                and_(Job.status == QUEUED, Job.available_at <= now),
+                and_(Job.status == RUNNING, Job.locked_until < now),  # Its worker is gone
+            ))
+            .order_by(Job.priority, Job.available_at)
+            .limit(self.CLAIM_CANDIDATES)
+            .with_for_update(skip_locked=True)
+        )).all()
+        for job_id, status, locked_until, attempts in candidates:
+            unchanged = (Job.id == job_id, Job.status == status,
+                         Job.locked_until.is_(None) if locked_until is None else Job.locked_until == locked_until)
+            if status == RUNNING and attempts >= self.max_attempts:
+                if (await db.execute(update(Job).where(*unchanged).values({
+                    Job.status: FAILED, Job.error: "The analysis was interrupted too many times.",
+                    Job.locked_by: None, Job.locked_until: None, Job.finished_at: func.now(),
+                }), execution_options=NO_SYNC)).rowcount:
+                    self.failed += 1
+                continue
+            taken = (await db.execute(update(Job).where(*unchanged).values({
+                Job.status: RUNNING,
+                Job.locked_by: worker_id,
+                Job.locked_until: now + self.lease_seconds,
+                Job.attempts: Job.attempts + 1,
+                Job.started_at: func.now(),
+            }), execution_options=NO_SYNC)).rowcount
+            if taken:
+                await db.commit()
+                self.claimed += 1
+                self.reclaimed += status == RUNNING
+                job = await db.get(Job, job_id)
+                return {"id": job.id, "github_url": job.github_url, "mode": job.mode, "lane": job.lane,
+                        "user_id": job.user_id, "attempts": job.attempts}
+        await db.commit()
+        return None
+
+    async def _finish(self, db: AsyncSession, job_id: str, worker_id: str, values: dict) -> bool:
+        """Updates a job this worker still holds; False if its lease was lost meanwhile."""
+        Job = entity.AnalysisJob
+        updated = (await db.execute(
+            update(Job).where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id).values(values),
+            execution_options=NO_SYNC,
+        )).rowcount
+        await db.commit()
+        return bool(updated)
+
+    async def renew(self, db: AsyncSession, job_id: str, worker_id: str) -> bool:
+        return await self._finish(db, job_id, worker_id,
+                                  {entity.AnalysisJob.locked_until: time.time() + self.lease_seconds})
+
+    async def complete(self, db: AsyncSession, job_id: str, worker_id: str, result: dict):
+        Job = entity.AnalysisJob
+        if await self._finish(db, job_id, worker_id, {
+            Job.status: DONE, Job.result: result, Job.error: None,
+            Job.locked_by: None, Job.locked_until: None, Job.finished_at: func.now(),
+        }):
+            self.completed += 1
+
+    async def fail(self, db: AsyncSession, job_id: str, worker_id: str, error: str):
+        Job = entity.AnalysisJob
+        if await self._finish(db, job_id, worker_id, {
+            Job.status: FAILED, Job.error: error,
+            Job.locked_by: None, Job.locked_until: None, Job.finished_at: func.now(),
+        }):
+            self.failed += 1
+
+    async def release(self, db: AsyncSession, job_id: str, worker_id: str, delay: float = 0, error: str = None,
+                      attempt_used: bool = False):
+        """
+        Puts a running job back in the queue, available after `delay`
+        seconds. Unless `attempt_used`, the run doesn't count (shutdown).
+        """
+        Job = entity.AnalysisJob
+        values = {Job.status: QUEUED, Job.available_at: time.time() + delay, Job.error: error,
+                  Job.locked_by: None, Job.locked_until: None}
+        if not attempt_used:
+            values[Job.attempts] = Job.attempts - 1
+        if await self._finish(db, job_id, worker_id, values) and attempt_used:
+            self.retried += 1
+
+    async def purge(self, db: AsyncSession, older_than_hours: float) -> int:
+        """Deletes finished jobs enqueued more than `older_than_hours` ago; returns how many."""
+        Job = entity.AnalysisJob
+        cutoff = time.time() - older_than_hours * 3600
+        deleted = (await db.execute(
+            delete(Job).where(Job.status.in_((DONE, FAILED)), Job.available_at < cutoff), execution_options=NO_SYNC
+        )).rowcount
+        await db.commit()
+        return deleted
+
+    async def counts(self, db: AsyncSession) -> dict:
+        Job = entity.AnalysisJob
+        rows = (await db.execute(select(Job.status, func.count(Job.id)).group_by(Job.status))).all()
+        return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+    async def stats(self) -> dict:
+        async with AsyncSessionLocal() as db:
+            try:
+                counts = await self.counts(db)
+            except Exception as e:
+                print(f" Warning: Could not count jobs: {e}")
+                counts = None
+        return {
+            "jobs": counts,
+            "enqueued": self.enqueued,
+            "claimed": self.claimed,
+            "reclaimed": self.reclaimed,
+            "retried": self.retried,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+class JobWorkerPool:
+    """
+    `workers` asyncio tasks taking jobs from a JobQueue and running
+    `handler(job)` (a coroutine returning the job's JSON result) for each.
+
+    Idle workers poll every JOB_POLL_INTERVAL seconds, or wake at once when
+    this process enqueues. While a job runs its lease is renewed every
+    third of JOB_LEASE_SECONDS. A handler error fails the job, except
+    GitHub's rate limit, which requeues it for the reset. On stop() the
+    running handlers are cancelled and their jobs put back in the queue
+    without using up an attempt; a worker in the middle of a database call
+    finishes it first, so no claim or result is lost halfway. If recording
+    a job's outcome fails, the worker logs it and carries on; the job is
+    claimed again once its lease runs out.
+    """
+
+    def __init__(self, queue: JobQueue, handler, workers: int = None, poll_interval: float = None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers or Config.JOB_WORKERS
+        self.poll_interval = poll_interval or Config.JOB_POLL_INTERVAL
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks = []
+        self._handlers = set()  # Handler tasks of the running jobs
+        self._stopping = False
+        self._purged_at = 0
+
+    def start(self):
+        self.queue.wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._work(f"{self.name}-{n}")) for n in range(self.workers)]
+        print(f"Started {self.workers} analysis job workers")
+        return self
+
+    async def stop(self):
+        self._stopping = True
+        self.queue.wakeup.set()
+        for handler in self._handlers:
+            handler.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _with_session(self, fn, *args, **kwargs):
+        async with AsyncSessionLocal() as db:
+            try:
+                return await fn(db, *args, **kwargs)
+            except Exception:
+                await db.rollback()
+                raise
+
+    async def _work(self, worker_id: str):
+        while not self._stopping:
+            self.queue.wakeup.clear()
+            try:
+                job = await self._with_session(self.queue.claim, worker_id)
+            except Exception as e:
+                print(f" Warning: Job claim failed: {e}")
+                job = None
+            if job is None:
+                await self._purge_now_and_then()
+                try:
+                    await asyncio.wait_for(self.queue.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job, worker_id)
+            except Exception as e:
+                # Recording the outcome failed: the lease runs out and the job is claimed again
+                print(f" Warning: Could not finish job {job['id']}: {e}")
+
+    async def _run(self, job: dict, worker_id: str):
+        if self._stopping:  # Claimed while stop() began
+            await self._with_session(self.queue.release, job["id"], worker_id)
+            return
+        handler = asyncio.create_task(self.handler(job))
+        self._handlers.add(handler)
+        renewal = asyncio.create_task(self._keep_lease(job["id"], worker_id))
+        try:
+            result = await handler
+        except asyncio.CancelledError:
+            await self._with_session(self.queue.release, job["id"], worker_id)
+            if asyncio.current_task().cancelling():  # This worker was cancelled, not only its handler
+                raise
+        except RateLimitExceeded as e:
+            if job["attempts"] < self.queue.max_attempts:
+                print(f"Job {job['id']}: {e} Requeued.")
+                await self._with_session(self.queue.release, job["id"], worker_id, delay=e.retry_after,
+                                         error=str(e), attempt_used=True)
+            else:
+                await self._with_session(self.queue.fail, job["id"], worker_id, str(e))
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            await self._with_session(self.queue.fail, job["id"], worker_id, f"Analysis failed: {e}")
+        else:
+            await self._with_session(self.queue.complete, job["id"], worker_id, result)
+        finally:
+            self._handlers.discard(handler)
+            renewal.cancel()
+
+    async def _keep_lease(self, job_id: str, worker_id: str):
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                if not await self._with_session(self.queue.renew, job_id, worker_id):
+                    print(f" Warning: Lost the lease on job {job_id}")
+                    return
+            except Exception as e:
+                print(f" Warning: Could not renew the lease on job {job_id}: {e}")
+
+    async def _purge_now_and_then(self):
+        """Drops old finished jobs, at most once an hour per pool."""
+        if time.time() - self._purged_at < 3600:
+            return
+        self._purged_at = time.time()
+        try:
+            deleted = await self._with_session(self.queue.purge, Config.JOB_RETENTION_HOURS)
+            if deleted:
+                print(f"Purged {deleted} finished analysis jobs")
+        except Exception as e:
+            print(f" Warning: Job purge failed: {e}")
+
+
+_default_queue = None
+
+
+def get_job_queue():
+    """Process-wide job queue (None when disabled in Config)."""
+    global _default_queue
+    if not Config.JOBS_ENABLED:
+        return None
+    if _default_queue is None:
+        _default_queue = JobQueue()
+    return _default_queue
@@ -0,0 +1,82 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small in-memory LRU used as the hot tier of our caches.
+    Bounded by entry count and/or total size (bytes), with an optional TTL.
+    Not thread-safe: it is only touched from the event loop.
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None, ttl: float = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, size, expires_at = item
+        if expires_at is not None and expires_at < time.time():
+            self.pop(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, size: int = 1, ttl: float = None):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Never let one huge value flush the whole cache
+
+        self.pop(key)
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl else None
+        self._data[key] = (value, size, expires_at)
+        self._bytes += size
+        self._evict()
+
+    def pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self._bytes -= item[1]
+            return item[0]
+        return None
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def _evict(self):
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, (_, size, _) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
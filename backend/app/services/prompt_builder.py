@@ -0,0 +1,393 @@
+import heapq
+import re
+from collections import deque
+from functools import lru_cache
+from statistics import median
+from app.config import Config
+from app.services.repo_snapshot import RepoSnapshot
+
+# One match per estimated token: greedy chunks of up to 4 letters or 3
+# digits (so a run of n letters counts ceil(n / 4)), or one other visible character
+_TOKEN_PIECES = re.compile(r"[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Offline estimate of Gemini's token count: letter runs cost one token per
+    4 characters, digit runs one per 3, every other visible character one.
+    Errs high on file paths, which are mostly short words and punctuation.
+    Gemini reports the real count with each response (AIService logs both).
+    """
+    return len(_TOKEN_PIECES.findall(text))
+
+
+class PromptBuilder:
+    """
+    The file section of the Gemini prompt, within a token budget.
+
+    Paths are ranked by how much they say about the project:
+    0. build / dependency manifests (package.json, pyproject.toml, go.mod, ...)
+    1. CI and deployment config (.github/workflows/, Dockerfile, ...)
+    2. entry points (main.py, App.tsx, server.ts, ...)
+    3. framework and tool config (vite.config.ts, tsconfig.json, ...)
+    4. other files in the root
+    5. other files one level down, as representatives of the top directories
+    Shallower paths first within a rank; vendored and generated directories
+    (node_modules/, dist/, ...) never rank.
+
+    The best-ranked paths are listed one per line and every other file is
+    counted in a directory rollup such as "src/components/ (142 files:
+    120 .tsx, 22 .css)". Rollups group by the first two directories, or by
+    the first one when those don't fit.
+
+    Work is split so incremental rescoring can skip the tree download:
+    `digest()` reduces a tree to the top candidates plus file counts per
+    rollup directory and extension (both additive, see `apply_changes`), and
+    `render()` turns a digest into text within a budget.
+    """
+
+    CANDIDATE_LIMIT = 80
+    ROLLUP_DEPTH = 2
+    CANDIDATE_SHARE = 0.6  # Of the file budget, before rollups take the rest
+    ROLLUP_EXTENSIONS = 2  # Extensions named per rollup line
+
+    MANIFESTS = {
+        "package.json", "requirements.txt", "pyproject.toml", "setup.py", "setup.cfg", "Pipfile",
+        "environment.yml", "pom.xml", "build.gradle", "build.gradle.kts", "settings.gradle",
+        "settings.gradle.kts", "go.mod", "Cargo.toml", "Gemfile", "composer.json", "pubspec.yaml",
+        "mix.exs", "Package.swift", "CMakeLists.txt", "Makefile", "deno.json",
+    }
+    MANIFEST_SUFFIXES = (".csproj", ".fsproj", ".sln", ".cabal", ".gemspec")
+    DEPLOY_FILES = {
+        "Dockerfile", "docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml",
+        ".gitlab-ci.yml", ".travis.yml", "Jenkinsfile", "azure-pipelines.yml", "bitbucket-pipelines.yml",
+        "Procfile", "render.yaml", "vercel.json", "netlify.toml", "fly.toml", "app.yaml", "serverless.yml",
+        "Chart.yaml", "skaffold.yaml",
+    }
+    DEPLOY_DIRS = (".github/workflows/", ".circleci/", "k8s/", "helm/", "terraform/")
+    ENTRY_STEMS = {
+        "main", "app", "App", "index", "server", "manage", "wsgi", "asgi", "__main__", "cli",
+        "Program", "Application", "lib",
+    }
+    CODE_EXTENSIONS = {
+        ".py", ".js", ".jsx", ".ts", ".tsx", ".mjs", ".go", ".rs", ".java", ".kt", ".cs", ".rb",
+        ".php", ".swift", ".dart", ".vue", ".svelte", ".ex", ".scala", ".c", ".cpp",
+    }
+    TOOL_CONFIG_PREFIXES = (
+        "vite.config", "next.config", "nuxt.config", "svelte.config", "astro.config", "tailwind.config",
+        "postcss.config", "webpack.config", "rollup.config", "babel.config", "jest.config", "vitest.config",
+        "playwright.config", "tsconfig", "jsconfig", ".eslintrc", "eslint.config", ".prettierrc",
+        "angular.json", "nx.json", "turbo.json", "lerna.json", "pnpm-workspace", ".pre-commit-config",
+        "tox.ini", "pytest.ini", "mypy.ini", "alembic.ini", ".babelrc",
+    )
+    NOISE_DIRS = {
+        "node_modules", "vendor", "dist", "build", "third_party", "site-packages", ".venv", "venv",
+        "__pycache__", ".next", "coverage", "target", "bower_components", "Pods",
+    }
+
+    @classmethod
+    def _name_patterns(cls):
+        """
+        Regexes for RepoSnapshot.files_named() that find every name _rank_in
+        can rank 0-3 by the name alone. Exact names and prefixes are merged
+        into a trie, so each name costs a few character tests instead of one
+        test per alternative.
+        """
+        exact = cls.MANIFESTS | cls.DEPLOY_FILES | {
+            stem + ext for stem in cls.ENTRY_STEMS for ext in cls.CODE_EXTENSIONS
+        }
+        trie = {}
+        for word, end in [(w, "$") for w in exact] + [(w, "*") for w in cls.TOOL_CONFIG_PREFIXES + ("Dockerfile",)]:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = "*" if "*" in (end, node.get("")) else end
+
+        def emit(node):
+            if node.get("") == "*":
+                return ""  # A prefix: whatever follows
+            alternatives = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+            if node.get("") == "$":
+                alternatives.append("(?=\n)")
+            return alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+
+        suffixes = "(?:" + "|".join(map(re.escape, cls.MANIFEST_SUFFIXES)) + ")(?=\n)"
+        return re.compile("\n" + emit(trie)), re.compile(suffixes)
+
+    def __init__(self, token_budget: int = None):
+        self.token_budget = token_budget or Config.GEMINI_PROMPT_TOKEN_BUDGET
+        # Trees come in path order, so a small cache sees each directory's files together
+        self._directory = lru_cache(maxsize=4096)(self._directory_info)
+        self._name_regexes = self._name_patterns()
+
+        self.prompts = 0
+        self.estimated_tokens = deque(maxlen=500)  # Recent prompts
+        self.reported_tokens = deque(maxlen=500)   # Gemini's own count for them, when it sends one
+        self.files_listed = 0
+        self.files_rolled_up = 0
+
+    # --- Ranking ---
+
+    def _directory_info(self, directory: str):
+        """(noise, deploy dir, rollup prefix, depth) of "" or "a/b/"."""
+        parts = directory.split("/")[:-1]
+        return (
+            any(part in self.NOISE_DIRS for part in parts),
+            directory.startswith(self.DEPLOY_DIRS),
+            "/".join(parts[:self.ROLLUP_DEPTH]) + "/" if parts else "",
+            len(parts),
+        )
+
+    def _rank_in(self, directory: str, name: str):
+        """Rank class of `name` inside `directory` ("" or ending in '/'), or None."""
+        noise, deploy_dir, _, depth = self._directory(directory)
+        if noise:
+            return None
+        if name in self.MANIFESTS or name.endswith(self.MANIFEST_SUFFIXES):
+            return 0
+        if deploy_dir or name in self.DEPLOY_FILES or name.startswith("Dockerfile"):
+            return 1
+        dot = name.rfind(".")
+        if dot > 0 and name[:dot] in self.ENTRY_STEMS and name[dot:] in self.CODE_EXTENSIONS:
+            return 2
+        if name.startswith(self.TOOL_CONFIG_PREFIXES):
+            return 3
+        if depth <= 1:
+            return 4 + depth
+        return None
+
+    def rank_key(self, path: str):
+        """Sort key of a candidate path (lower is more informative), or None if it isn't one."""
+        slash = path.rfind("/") + 1
+        rank = self._rank_in(path[:slash], path[slash:])
+        return None if rank is None else (rank, path.count("/"), path)
+
+    def is_candidate(self, path: str) -> bool:
+        return self.rank_key(path) is not None
+
+    def _rollup_in(self, directory: str, name: str):
+        dot = name.rfind(".")
+        return self._directory(directory)[2], name[dot:].lower() if dot > 0 else ""
+
+    def _rollup_of(self, path: str):
+        slash = path.rfind("/") + 1
+        return self._rollup_in(path[:slash], path[slash:])
+
+    # --- Digest ---
+
+    def rollup_counts(self, files) -> dict:
+        """{"src/components/": {".tsx": 120, ...}} for every file, by rollup directory and extension."""
+        counts = {}
+        for path in files:
+            prefix, ext = self._rollup_of(path)
+            by_ext = counts.setdefault(prefix, {})
+            by_ext[ext] = by_ext.get(ext, 0) + 1
+        return counts
+
+    def digest(self, files) -> dict:
+        """
+        What render() needs from a tree: {"total_files", "candidates" (best
+        CANDIDATE_LIMIT paths, best first), "rollups" (see rollup_counts)}.
+        `files` is a RepoSnapshot or a list of paths.
+        """
+        candidates, _, rollups = self.scan(files, self.CANDIDATE_LIMIT)
+        return {"total_files": len(files), "candidates": candidates, "rollups": rollups}
+
+    def scan(self, files, limit: int):
+        """
+        One pass over a tree: (best `limit` candidates, whether those are all
+        of them, rollup_counts).
+        """
+        snapshot = RepoSnapshot.from_paths(files)
+
+        rollups = snapshot.extension_counts(self.ROLLUP_DEPTH)
+
+        # Candidates: files with a telling name, anything in a deployment directory...
+        indexes = set()
+        for regex in self._name_regexes:
+            indexes.update(snapshot.files_named(regex))
+        indexes.update(snapshot.files_in_directories(
+            [d for d, _ in snapshot.directories() if d.startswith(self.DEPLOY_DIRS)]
+        ))
+        keys = []
+        for i in indexes:
+            self._add_key(keys, *snapshot.path_parts(i))
+
+        # ...and the files in the root and top directories. Those rank by
+        # depth, then path, i.e. in tree order: the first `limit` of each will do.
+        truncated = False
+        for depth in (0, 1):
+            shallow = [d for d, dir_depth in snapshot.directories() if dir_depth == depth]
+            found = 0
+            for i in snapshot.files_in_directories(shallow):
+                if i not in indexes and self._add_key(keys, *snapshot.path_parts(i)):
+                    found += 1
+                    if found == limit:
+                        truncated = True
+                        break
+
+        candidates = [key[2] for key in heapq.nsmallest(limit, keys)]
+        return candidates, not truncated and len(keys) <= limit, rollups
+
+    def _add_key(self, keys: list, directory: str, name: str) -> bool:
+        rank = self._rank_in(directory, name)
+        if rank is None:
+            return False
+        path = directory + name
+        keys.append((rank, path.count("/"), path))
+        return True
+
+    @staticmethod
+    def apply_changes(rollups: dict, added_counts: dict, removed_counts: dict) -> dict:
+        """Rollup counts after a diff, from rollup_counts() of the added and removed paths."""
+        updated = {prefix: dict(by_ext) for prefix, by_ext in rollups.items()}
+        for counts, sign in ((added_counts, 1), (removed_counts, -1)):
+            for prefix, by_ext in counts.items():
+                target = updated.setdefault(prefix, {})
+                for ext, n in by_ext.items():
+                    target[ext] = target.get(ext, 0) + sign * n
+                    if target[ext] == 0:
+                        del target[ext]
+                if not target:
+                    del updated[prefix]
+        return updated
+
+    # --- Rendering ---
+
+    @staticmethod
+    def _lines_tokens(lines) -> int:
+        return sum(estimate_tokens(line) + 1 for line in lines)  # +1 for the newline
+
+    def _rollup_rows(self, digest: dict, listed, depth: int) -> list:
+        """(files, directory, extension counts) for the files not listed, grouped `depth` levels deep, biggest first."""
+        def group_of(prefix):  # Prefixes are "" or "a/" or "a/b/"
+            if depth >= self.ROLLUP_DEPTH or prefix.count("/") <= depth:
+                return prefix
+            return "/".join(prefix.split("/")[:depth]) + "/"
+
+        groups = {}
+        for prefix, by_ext in digest["rollups"].items():
+            group = group_of(prefix)
+            target = groups.get(group)
+            if target is None:
+                groups[group] = dict(by_ext)
+            else:
+                for ext, n in by_ext.items():
+                    target[ext] = target.get(ext, 0) + n
+        for path in listed:
+            prefix, ext = self._rollup_of(path)
+            target = groups[group_of(prefix)]
+            target[ext] = target.get(ext, 0) - 1
+
+        rows = sorted(((sum(c.values()), group, c) for group, c in groups.items()), key=lambda r: (-r[0], r[1]))
+        return [row for row in rows if row[0] > 0]
+
+    def _rollup_line(self, total: int, group: str, by_ext: dict, indent: str = "") -> str:
+        top = sorted(by_ext.items(), key=lambda item: (-item[1], item[0]))[:self.ROLLUP_EXTENSIONS]
+        kinds = ", ".join(f"{n} {ext or 'no extension'}" for ext, n in top if n > 0)
+        return f"{indent}{group or './'} ({total} file{'s' if total != 1 else ''}: {kinds})"
+
+    def _rollup_lines(self, rows: list, budget: int, indent: str = ""):
+        """(lines, complete): a line per row while they fit in `budget` tokens, then one for the rest."""
+        lines, used = [], 0
+        for total, group, by_ext in rows:
+            line = self._rollup_line(total, group, by_ext, indent)
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+
+        hidden = rows[len(lines):]
+        if hidden:
+            lines.append(f"{indent}(+{len(hidden)} more directories, {sum(r[0] for r in hidden)} files)")
+        return lines, len(hidden) == 0
+
+    def render(self, digest: dict, budget: int) -> str:
+        """The file section of the prompt for `digest`, at most `budget` tokens (estimated)."""
+        total = digest["total_files"]
+        candidates = digest["candidates"]
+        header = f"{total} files. Most informative first, then the remaining files by directory:"
+        budget -= estimate_tokens(header) + 1
+
+        # Best candidates up to their share, rollups in the rest, then more candidates if room is left
+        costs = [estimate_tokens(path) + 1 for path in candidates]
+        listed, used = 0, 0
+        while listed < len(candidates) and used + costs[listed] <= budget * self.CANDIDATE_SHARE:
+            used += costs[listed]
+            listed += 1
+
+        rollups, complete = self._fit_rollups(digest, candidates[:listed], budget - used)
+        while complete and listed < len(candidates) and used + costs[listed] + self._lines_tokens(rollups) <= budget:
+            used += costs[listed]
+            listed += 1
+            rollups, complete = self._fit_rollups(digest, candidates[:listed], budget - used)
+
+        self.files_listed += listed
+        self.files_rolled_up += total - listed
+        return "\n".join([header] + candidates[:listed] + rollups)
+
+    def _fit_rollups(self, digest: dict, listed, budget: int):
+        """
+        (lines, complete): two-level rollups when they all fit. Otherwise
+        (complete=False) one level, with the biggest top-level directories
+        broken down a level further as far as the budget goes.
+        """
+        keep = max(budget - 16, 0)  # Room for the "(+N more directories ...)" line
+        deep = self._rollup_rows(digest, listed, self.ROLLUP_DEPTH)
+        lines, complete = self._rollup_lines(deep, keep)
+        if complete:
+            return lines, True
+
+        top = self._rollup_rows(digest, listed, 1)
+        lines, complete = self._rollup_lines(top, keep)
+        if not complete:
+            return lines, False
+
+        children = {}
+        for row in deep:
+            group = row[1]
+            children.setdefault(group.split("/", 1)[0] + "/" if group else "", []).append(row)
+        room = keep - self._lines_tokens(lines)
+        lines = []
+        for row in top:
+            lines.append(self._rollup_line(*row))
+            subdirs = [child for child in children.get(row[1], []) if child[1] != row[1]]
+            if len(subdirs) > 1 and room > 16:
+                sublines, _ = self._rollup_lines(subdirs, room - 16, indent="  ")
+                lines += sublines
+                room -= self._lines_tokens(sublines)
+        return lines, False
+
+    # --- Accounting ---
+
+    def record(self, estimated: int, reported: int = None):
+        """Token count of one prompt sent to Gemini (`reported` is Gemini's own count)."""
+        self.prompts += 1
+        self.estimated_tokens.append(estimated)
+        if reported:
+            self.reported_tokens.append(reported)
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "prompts": self.prompts,
+            "estimated_tokens": {
+                "median": median(self.estimated_tokens) if self.estimated_tokens else None,
+                "max": max(self.estimated_tokens, default=None),
+            },
+            "reported_tokens_median": median(self.reported_tokens) if self.reported_tokens else None,
+            "files_listed": self.files_listed,
+            "files_rolled_up": self.files_rolled_up,
+        }
+
+
+_default_builder = None
+
+
+def get_prompt_builder():
+    """Process-wide PromptBuilder (its counters feed /api/metrics/)."""
+    global _default_builder
+    if _default_builder is None:
+        _default_builder = PromptBuilder()
+    return _default_builder
@@ -0,0 +1,256 @@
+import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Sequence
+
+import numpy as np
+
+
+class RepoSnapshot(Sequence):
+    """
+    Compact index of a repository's file paths, built once per analysis in
+    GitHubService.fetch_repo_data and shared by ScoringService, AIService and
+    the router.
+
+    Behaves like the plain list of paths it replaces (len, indexing, slicing,
+    iteration in tree order), but stores them array-backed:
+    - every directory once, with a link to its parent directory
+    - file names back to back in one newline-separated text, addressed by offset
+    - per file only two ints: directory id and name offset
+
+    Precomputed while paths are added: files per directory, file extensions
+    per directory, directory depth.
+    """
+
+    NAMES_PER_CHUNK = 4096
+
+    def __init__(self, paths=()):
+        self._dir_lookup = {"": 0}         # "a/b/" -> dir id (root is "")
+        self._dir_paths = [""]             # dir id -> "a/b/"
+        self._dir_parents = array("i", [-1])
+        self._dir_depths = array("H", [0])
+        self._dir_file_counts = array("I", [0])
+
+        self._file_dirs = array("I")
+        self._name_offsets = array("I", [0])
+        self._name_chunks = []             # Joined blocks of file names
+        self._pending_names = []
+        self._names = None                 # Frozen text of all names, built on first read
+        self._search_text = None
+
+        self._dir_extensions = Counter()   # (dir id, ".ext") -> files
+
+        for path in paths:
+            self.add(path)
+
+    @classmethod
+    def from_paths(cls, paths):
+        return paths if isinstance(paths, cls) else cls(paths)
+
+    # --- Building ---
+
+    def add(self, path: str):
+        if self._names is not None:
+            raise ValueError("RepoSnapshot is read-only once it has been read")
+
+        slash = path.rfind("/") + 1
+        dir_id = self._dir_id(path[:slash])
+        name = path[slash:]
+        self._dir_file_counts[dir_id] += 1
+        self._file_dirs.append(dir_id)
+
+        self._pending_names.append(name)
+        if len(self._pending_names) >= self.NAMES_PER_CHUNK:
+            self._flush_names()
+        self._name_offsets.append(self._name_offsets[-1] + len(name) + 1)
+
+        dot = name.rfind(".")
+        self._dir_extensions[dir_id, name[dot:].lower() if dot > 0 else ""] += 1
+
+    def _dir_id(self, directory: str) -> int:
+        """`directory` is "" or ends with '/'."""
+        dir_id = self._dir_lookup.get(directory)
+        if dir_id is not None:
+            return dir_id
+
+        parent_id = self._dir_id(directory[:directory.rfind("/", 0, -1) + 1])
+        directory = sys.intern(directory)
+        dir_id = len(self._dir_paths)
+        self._dir_lookup[directory] = dir_id
+        self._dir_paths.append(directory)
+        self._dir_parents.append(parent_id)
+        self._dir_depths.append(self._dir_depths[parent_id] + 1)
+        self._dir_file_counts.append(0)
+        return dir_id
+
+    def _flush_names(self):
+        self._pending_names.append("")  # Trailing newline
+        self._name_chunks.append("\n".join(self._pending_names))
+        self._pending_names = []
+
+    def _frozen_names(self) -> str:
+        if self._names is None:
+            if self._pending_names:
+                self._flush_names()
+            self._names = "".join(self._name_chunks)
+            self._name_chunks = None
+        return self._names
+
+    # --- Sequence interface ---
+
+    def __len__(self) -> int:
+        return len(self._file_dirs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._path(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RepoSnapshot index out of range")
+        return self._path(index)
+
+    def __iter__(self):
+        names = self._frozen_names()
+        dir_paths, offsets = self._dir_paths, self._name_offsets
+        for i, dir_id in enumerate(self._file_dirs):
+            yield dir_paths[dir_id] + names[offsets[i]:offsets[i + 1] - 1]
+
+    def _path(self, i: int) -> str:
+        names = self._frozen_names()
+        name = names[self._name_offsets[i]:self._name_offsets[i + 1] - 1]
+        return self._dir_paths[self._file_dirs[i]] + name
+
+    def __repr__(self) -> str:
+        return f"<RepoSnapshot files={len(self)} directories={len(self._dir_paths)}>"
+
+    # --- Precomputed views ---
+
+    @property
+    def directory_count(self) -> int:
+        return len(self._dir_paths) - 1  # Without the root
+
+    @property
+    def root_file_count(self) -> int:
+        return self._dir_file_counts[0]
+
+    def directory_file_counts(self) -> dict:
+        """{"a/b/": number of files directly in a/b/} for every directory, root is ""."""
+        return dict(zip(self._dir_paths, self._dir_file_counts))
+
+    def subtree_file_counts(self) -> dict:
+        """{"a/b/": number of files anywhere under a/b/}; the root ("") counts every file."""
+        totals = array("I", self._dir_file_counts)
+        # Children always have a higher id than their parent
+        for dir_id in range(len(totals) - 1, 0, -1):
+            totals[self._dir_parents[dir_id]] += totals[dir_id]
+        return dict(zip(self._dir_paths, totals))
+
+    @property
+    def extensions(self) -> Counter:
+        """Files per extension (".py", "" for none) in the whole tree."""
+        totals = Counter()
+        for (_, ext), n in self._dir_extensions.items():
+            totals[ext] += n
+        return totals
+
+    def extension_counts(self, max_depth: int) -> dict:
+        """
+        {"a/b/": {".py": 3, ...}}: files by extension under every directory
+        `max_depth` deep or less, deeper directories counted in their
+        ancestor at `max_depth`. Root ("") files count only for the root.
+        """
+        rollup = list(range(len(self._dir_paths)))
+        depths, parents = self._dir_depths, self._dir_parents
+        # Children always have a higher id than their parent
+        for dir_id in range(1, len(rollup)):
+            if depths[dir_id] > max_depth:
+                rollup[dir_id] = rollup[parents[dir_id]]
+
+        by_dir = {}
+        for (dir_id, ext), n in self._dir_extensions.items():
+            target = rollup[dir_id]
+            by_ext = by_dir.get(target)
+            if by_ext is None:
+                by_ext = by_dir[target] = {}
+            by_ext[ext] = by_ext.get(ext, 0) + n
+        return {self._dir_paths[dir_id]: by_ext for dir_id, by_ext in by_dir.items()}
+
+    def directories(self):
+        """Yields (directory, depth) for every directory, root ("") first."""
+        return zip(self._dir_paths, self._dir_depths)
+
+    def path_parts(self, index: int):
+        """(directory, file name) of one file."""
+        names = self._frozen_names()
+        return self._dir_paths[self._file_dirs[index]], names[self._name_offsets[index]:self._name_offsets[index + 1] - 1]
+
+    def files_in_directories(self, directories) -> list:
+        """Indexes (in tree order) of the files directly in any of `directories`."""
+        dir_ids = [self._dir_lookup[d] for d in directories if d in self._dir_lookup]
+        if not dir_ids or not len(self):
+            return []
+        file_dirs = np.frombuffer(self._file_dirs, dtype=f"u{self._file_dirs.itemsize}")
+        return np.flatnonzero(np.isin(file_dirs, dir_ids)).tolist()
+
+    def files_named(self, pattern) -> list:
+        """
+        Indexes (in tree order) of the files whose name matches `pattern`.
+        The compiled regex runs once over all names as newline-terminated
+        lines with a newline in front ("\nname\nname\n..."), so "\n" + a
+        name + "(?=\n)" matches a whole name. Starting with a literal "\n"
+        also lets the regex engine skip ahead quickly. A match counts for the
+        file whose name holds its last character.
+        """
+        offsets = self._name_offsets
+        text = "\n" + self._frozen_names()
+        return [bisect_right(offsets, m.end() - 2) - 1 for m in pattern.finditer(text)]
+
+    def depth(self, index: int) -> int:
+        """Number of directories above a file (same as path.count('/'))."""
+        return self._dir_depths[self._file_dirs[index]]
+
+    def iter_with_depth(self):
+        """Yields (path, depth) in tree order."""
+        depths, file_dirs = self._dir_depths, self._file_dirs
+        for i, path in enumerate(self):
+            yield path, depths[file_dirs[i]]
+
+    def iter_directory_names(self):
+        """Yields (directory, file name) in tree order, without building each path."""
+        names = self._frozen_names()
+        dir_paths, offsets = self._dir_paths, self._name_offsets
+        for i, dir_id in enumerate(self._file_dirs):
+            yield dir_paths[dir_id], names[offsets[i]:offsets[i + 1] - 1]
+
+    def search_text(self) -> str:
+        """
+        Every directory path (with its trailing '/') and every file name, one
+        per line. Much shorter than all paths joined, because directories
+        appear once. A substring with no '/' except possibly a trailing one
+        occurs here exactly when it occurs in some file path.
+        """
+        if self._search_text is None:
+            self._search_text = "\n".join(self._dir_paths[1:]) + "\n" + self._frozen_names()
+        return self._search_text
+
+    def count_occurrences(self, pattern: str) -> int:
+        """
+        Same as sum(path.count(pattern) for path in self), without rebuilding
+        the paths: occurrences in a directory path count once per file in it.
+        """
+        if "/" in pattern.rstrip("/"):
+            return sum(path.count(pattern) for path in self)
+        total = self._frozen_names().count(pattern)
+        if pattern in self.search_text():
+            for path, files in zip(self._dir_paths, self._dir_file_counts):
+                if files:
+                    total += path.count(pattern) * files
+        return total
+
+    def contains(self, pattern: str) -> bool:
+        """True if any file path contains `pattern` as a substring."""
+        if "/" in pattern.rstrip("/"):
+            return any(pattern in path for path in self)
+        return pattern in self.search_text()
@@ -0,0 +1,99 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from app import entity
+from app.config import Config
+from app.models import AnalysisResult
+from app.services.ai_service import AIService
+from app.services.lru_cache import LRUCache
+from app.services.scoring_service import ScoringService
+
+
+class AnalysisResultCache:
+    """
+    Caches finished AnalysisResults per repository commit.
+
+    Key: (owner, repo, head commit SHA, scoring version, prompt version, and
+    the analysis mode unless "full"), so a new push or a change to the
+    scoring rules / Gemini prompt is always a miss.
+
+    Tiers:
+    1. Hot: small in-memory LRU (per process)
+    2. Persistent: Analysis rows, looked up by `cache_key`; the stored
+       `full_json_result` is the complete AnalysisResult
+    """
+
+    def __init__(self, max_entries: int):
+        self.memory = LRUCache(max_entries=max_entries)
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(owner: str, repo_name: str, head_sha: str, mode: str = "full") -> str:
+        return "|".join([
+            owner.lower(),
+            repo_name.lower(),
+            head_sha,
+            f"score-v{ScoringService.VERSION}",
+            f"prompt-v{AIService.PROMPT_VERSION}",
+        ] + ([f"mode-{mode}"] if mode != "full" else []))
+
+    async def get(self, db: AsyncSession, key: str):
+        result = self.memory.get(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        try:
+            row = (await db.execute(
+                select(entity.Analysis)
+                .options(undefer(entity.Analysis.full_json_result))
+                .where(entity.Analysis.cache_key == key)
+                .order_by(entity.Analysis.id.desc())
+                .limit(1)
+            )).scalars().first()
+        except Exception as e:
+            print(f" Warning: Result cache lookup failed: {e}")
+            await db.rollback()
+            row = None
+        if row is not None and row.full_json_result:
+            try:
+                result = AnalysisResult.model_validate(row.full_json_result)
+            except Exception as e:
+                print(f" Warning: Ignoring unreadable cached analysis {row.id}: {e}")
+            else:
+                self.memory.set(key, result)
+                self.hits += 1
+                self.db_hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: AnalysisResult):
+        # Persistence happens when the Analysis row is written by the router
+        self.memory.set(key, result)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+
+_default_cache = None
+
+
+def get_result_cache():
+    """Process-wide result cache (None when disabled in Config)."""
+    global _default_cache
+    if not Config.RESULT_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = AnalysisResultCache(max_entries=Config.RESULT_CACHE_MEMORY_ENTRIES)
+    return _default_cache
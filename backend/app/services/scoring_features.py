@@ -0,0 +1,103 @@
+from app.services.repo_snapshot import RepoSnapshot
+
+
+class PathFeatureExtractor:
+    """
+    Evaluates every path-based scoring rule over a file list in one go.
+
+    `rules` maps a feature name to the substrings that trigger it; a feature
+    is present when any path contains any of its substrings. The table is
+    compiled once:
+    - a pattern that contains a shorter pattern of the same feature is
+      dropped ('__tests__' can only match where 'test' already does)
+    - the remaining patterns are checked shortest first
+
+    extract() joins the paths once with "\\n". No pattern contains a newline,
+    so a match can never span two paths and "some path contains X" becomes
+    one C-level substring search over that buffer. There are no per-path
+    Python loops apart from counting root files.
+
+    Given a RepoSnapshot, its search_text() (each directory once plus the
+    file names) is searched instead and the root file count is read off the
+    index, unless some pattern has a '/' before its last character.
+    """
+
+    SEPARATOR = "\n"
+
+    def __init__(self, rules: dict):
+        self.rules = {}
+        for name, patterns in rules.items():
+            if any(self.SEPARATOR in p for p in patterns):
+                raise ValueError(f"Pattern for '{name}' must not contain a newline")
+            unique = sorted(set(patterns), key=len)
+            self.rules[name] = tuple(
+                p for i, p in enumerate(unique) if not any(q in p for q in unique[:i])
+            )
+        # Patterns like 'a/b' can span a directory and a file name
+        self._needs_full_paths = any(
+            "/" in p.rstrip("/") for patterns in self.rules.values() for p in patterns
+        )
+
+    def extract(self, files) -> dict:
+        """
+        Returns {"total_files", "root_files", <feature>: bool, ...}.
+        """
+        if isinstance(files, RepoSnapshot) and not self._needs_full_paths:
+            text = files.search_text()
+            root_files = files.root_file_count
+        else:
+            text = self.SEPARATOR.join(files)
+            root_files = sum(1 for f in files if "/" not in f)
+
+        features = {"total_files": len(files), "root_files": root_files}
+        for name, patterns in self.rules.items():
+            features[name] = any(p in text for p in patterns)
+        return features
+
+    # --- Counters (incremental rescoring) ---
+
+    @property
+    def patterns(self) -> list:
+        return sorted({p for patterns in self.rules.values() for p in patterns})
+
+    def count(self, files) -> dict:
+        """
+        Returns {"total_files", "root_files", "patterns": {pattern: occurrences}}.
+        Occurrence counts add up path by path (no pattern can span the
+        separator), so they can be updated from a list of added and removed
+        paths without rescanning the tree.
+        """
+        if isinstance(files, RepoSnapshot):
+            occurrences = {p: files.count_occurrences(p) for p in self.patterns}
+            root_files = files.root_file_count
+        else:
+            text = self.SEPARATOR.join(files)
+            occurrences = {p: text.count(p) for p in self.patterns}
+            root_files = sum(1 for f in files if "/" not in f)
+        return {"total_files": len(files), "root_files": root_files, "patterns": occurrences}
+
+    def apply_changes(self, counts: dict, added=(), removed=()) -> dict:
+        """New counters after `added` / `removed` paths (renames are one of each)."""
+        occurrences = dict(counts["patterns"])
+        total, root = counts["total_files"], counts["root_files"]
+        for sign, paths in ((-1, removed), (1, added)):
+            for path in paths:
+                total += sign
+                if "/" not in path:
+                    root += sign
+                for p in occurrences:
+                    if p in path:
+                        occurrences[p] += sign * path.count(p)
+        return {"total_files": total, "root_files": root, "patterns": occurrences}
+
+    def features_from_counts(self, counts: dict) -> dict:
+        """Same result as extract() on the files the counters describe."""
+        occurrences = counts["patterns"]
+        features = {"total_files": counts["total_files"], "root_files": counts["root_files"]}
+        for name, patterns in self.rules.items():
+            features[name] = any(occurrences[p] > 0 for p in patterns)
+        return features
+
+    def accepts(self, counts: dict) -> bool:
+        """Were these counters made for the current rule table?"""
+        return bool(counts) and set(counts.get("patterns", {})) == set(self.patterns)
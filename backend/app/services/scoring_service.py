@@ -1,22 +1,62 @@
 from datetime import datetime
+from app.services.scoring_features import PathFeatureExtractor
+
+# Path rules, matched as substrings anywhere in a path (so 'src/' is found in 'frontend/src/')
+GARBAGE_FILES = ['.DS_Store', 'Thumbs.db', '__pycache__', 'node_modules', '.env', 'venv']
+STRUCTURE_FOLDERS = ['src/', 'app/', 'lib/', 'components/', 'pages/', 'public/', 'server/', 'client/']
+LOCK_FILES = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock', 'go.sum', 'Cargo.lock', 'pom.xml', 'build.gradle']
+TEST_INDICATORS = ['test', 'tests', '__tests__', 'spec', 'pytest.ini']
+CI_MARKERS = ['.github', '.travis.yml', 'circleci']
+
+# README rules (setup keywords are matched against the lowercased README)
+SETUP_KEYWORDS = ['npm install', 'pip install', 'setup', 'getting started', 'run the app', 'docker run', 'mvn install', './mvnw']
+
+PATH_RULES = {
+    **{f"garbage:{junk}": [junk] for junk in GARBAGE_FILES},
+    "structure": STRUCTURE_FOLDERS,
+    "gitignore": ['.gitignore'],
+    "lock_file": LOCK_FILES,
+    "tests": TEST_INDICATORS,
+    "ci": CI_MARKERS,
+    "license_file": ['LICENSE'],
+}
 
 class ScoringService:
+    # Bump whenever a rule or weight changes (invalidates cached analyses).
+    # BatchScorer mirrors these rules; keep both in step.
+    VERSION = "3.0"
+
+    # Compiled once, shared by every instance
+    path_features = PathFeatureExtractor(PATH_RULES)
+
     def calculate_score(self, metadata, files, readme_content):
         """
         Advanced Scoring Algorithm v3.0 (Strict & Detailed)
         Total Score: 0 - 100
         """
+        # --- EDGE CASE: Empty Repository ---
+        if len(files) < 2:
+            return 10 # Participation award only.
+
+        # Every path rule is evaluated here, in one go over the file list
+        return self.score_features(metadata, self.path_features.extract(files), readme_content)
+
+    def feature_counts(self, files) -> dict:
+        """Per-rule counters for `files`, kept between analyses for incremental rescoring."""
+        return self.path_features.count(files)
+
+    def score_from_counts(self, metadata, counts, readme_content):
+        """calculate_score for the tree described by `counts` (see feature_counts)."""
+        return self.score_features(metadata, self.path_features.features_from_counts(counts), readme_content)
+
+    def score_features(self, metadata, features, readme_content):
+        """The v3.0 rules, given the path features of a tree (PathFeatureExtractor.extract)."""
         score = 0
-        repo_files = set(files) # Set for fast O(1) lookups
-        
-        # Convert all paths to a single string for substring searching (Fix for Monorepos)
-        # This allows us to find 'src' even if it is in 'frontend/src'
-        all_files_str = " ".join(files)
         
         readme_lower = readme_content.lower() if readme_content else ""
         
         # --- EDGE CASE: Empty Repository ---
-        if len(files) < 2:
+        if features["total_files"] < 2:
             return 10 # Participation award only.
 
         # =========================================================
@@ -26,8 +66,7 @@ class ScoringService:
         # A. Root Directory Clutter (5 pts)
         # Good repos have clean roots. Bad repos have 50 files in root.
         # We count files that don't have a '/' in them (meaning they are at the root)
-        root_file_count = sum(1 for f in files if "/" not in f)
-        if root_file_count < 15:
+        if features["root_files"] < 15:
             score += 5
         else:
             score += 0 # Too messy
@@ -35,22 +74,20 @@ class ScoringService:
         # B. The "Trash" Check (Negative Scoring)
         # Penalize for committing system files or secrets
         penalty = 0
-        garbage_files = ['.DS_Store', 'Thumbs.db', '__pycache__', 'node_modules', '.env', 'venv']
         
         # Check if any garbage string appears anywhere in the file paths
-        for junk in garbage_files:
-            if any(junk in f for f in files):
+        for junk in GARBAGE_FILES:
+            if features[f"garbage:{junk}"]:
                 penalty += 5 # Heavy penalty for each mistake
         
         score = max(0, score - penalty) # Deduct from current score
 
         # C. Standard Folders (15 pts)
         # We look for 'src', 'app', 'lib', or 'public' to see structure
-        # We search 'all_files_str' to find these folders even if nested
-        structure_folders = ['src/', 'app/', 'lib/', 'components/', 'pages/', 'public/', 'server/', 'client/']
-        if any(folder in all_files_str for folder in structure_folders):
+        # Found even if nested (see STRUCTURE_FOLDERS)
+        if features["structure"]:
             score += 15
-        elif len(files) > 3:
+        elif features["total_files"] > 3:
             score += 5 # Partial credit for having *some* files
 
         # =========================================================
@@ -64,8 +101,7 @@ class ScoringService:
             
             # B. "How-To" Instructions (10 pts)
             # A readme is useless without setup steps
-            setup_keywords = ['npm install', 'pip install', 'setup', 'getting started', 'run the app', 'docker run', 'mvn install', './mvnw']
-            if any(k in readme_lower for k in setup_keywords):
+            if any(k in readme_lower for k in SETUP_KEYWORDS):
                 score += 10
             
             # C. Visuals/Badges (5 pts)
@@ -78,13 +114,12 @@ class ScoringService:
         # =========================================================
         
         # A. Version Control (10 pts)
-        if '.gitignore' in repo_files or '.gitignore' in all_files_str:
+        if features["gitignore"]:
             score += 10
         
         # B. Dependency Locking (10 pts)
         # Shows they care about reproducible builds
-        lock_files = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock', 'go.sum', 'Cargo.lock', 'pom.xml', 'build.gradle']
-        if any(f in all_files_str for f in lock_files):
+        if features["lock_file"]:
             score += 10
 
         # =========================================================
@@ -92,12 +127,11 @@ class ScoringService:
         # =========================================================
         
         # A. Tests Existence (15 pts)
-        test_indicators = ['test', 'tests', '__tests__', 'spec', 'pytest.ini']
-        if any(t in all_files_str for t in test_indicators):
+        if features["tests"]:
             score += 15
             
         # B. Automation/CI (5 pts)
-        if '.github' in all_files_str or '.travis.yml' in all_files_str or 'circleci' in all_files_str:
+        if features["ci"]:
             score += 5
 
         # =========================================================
@@ -123,7 +157,7 @@ class ScoringService:
         # =========================================================
         
         # A. Licensing (5 pts) - Open Source Standard
-        if metadata.get('license') is not None or 'LICENSE' in all_files_str:
+        if metadata.get('license') is not None or features["license_file"]:
             score += 5
             
         # B. Description (5 pts) - GitHub UI Standard
@@ -0,0 +1,64 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) starts `fn()` as a task; callers
+    arriving while it runs wait on that same task and get the same result
+    or exception. The key is released as soon as the task finishes, so
+    later calls start fresh (caches are the place to reuse finished work).
+
+    Waiters are shielded: a caller that disconnects does not cancel the work
+    the others are waiting for. Per process only.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> running task
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def run(self, key, fn):
+        """Returns (result, leader): leader is False when the call joined one already running."""
+        task, leader = self.start(key, fn)
+        return await asyncio.shield(task), leader
+
+    def start(self, key, fn):
+        """
+        Starts or joins the call for `key` without waiting for it: returns
+        (task, leader). Await the task through asyncio.shield, like run().
+        """
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return task, leader
+
+    def _finished(self, key, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here too, in case every waiter went away
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.coalesced
+        return {
+            "executions": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / calls, 3) if calls else 0.0,
+            "in_flight": len(self._calls),
+        }
+
+
+_analysis_flights = SingleFlight()
+
+
+def get_analysis_flights() -> SingleFlight:
+    """Single-flight group for /api/analyze/, keyed on "owner/repo"."""
+    return _analysis_flights
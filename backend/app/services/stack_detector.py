@@ -0,0 +1,297 @@
+import asyncio
+import json
+import re
+import tomllib
+from app.config import Config
+from app.models import TechStack
+from app.services.github_scheduler import RateLimitExceeded
+from app.services.github_service import GitHubService
+
+FRONTEND, BACKEND, INFRASTRUCTURE = "frontend", "backend", "infrastructure"
+
+# Dependency name -> (category, label). Names are compared lower-cased, and
+# for Python with '_' and '.' read as '-' (PEP 503).
+NPM_PACKAGES = {
+    "react": (FRONTEND, "React"), "next": (FRONTEND, "Next.js"), "vue": (FRONTEND, "Vue.js"),
+    "nuxt": (FRONTEND, "Nuxt"), "@angular/core": (FRONTEND, "Angular"), "svelte": (FRONTEND, "Svelte"),
+    "@sveltejs/kit": (FRONTEND, "SvelteKit"), "solid-js": (FRONTEND, "SolidJS"), "astro": (FRONTEND, "Astro"),
+    "react-native": (FRONTEND, "React Native"), "expo": (FRONTEND, "Expo"), "electron": (FRONTEND, "Electron"),
+    "vite": (FRONTEND, "Vite"), "webpack": (FRONTEND, "Webpack"), "tailwindcss": (FRONTEND, "Tailwind"),
+    "bootstrap": (FRONTEND, "Bootstrap"), "@mui/material": (FRONTEND, "Material UI"),
+    "@chakra-ui/react": (FRONTEND, "Chakra UI"), "styled-components": (FRONTEND, "styled-components"),
+    "redux": (FRONTEND, "Redux"), "@reduxjs/toolkit": (FRONTEND, "Redux"), "zustand": (FRONTEND, "Zustand"),
+    "@tanstack/react-query": (FRONTEND, "React Query"), "three": (FRONTEND, "Three.js"),
+    "@apollo/client": (FRONTEND, "Apollo Client"),
+    "express": (BACKEND, "Express"), "@nestjs/core": (BACKEND, "NestJS"), "fastify": (BACKEND, "Fastify"),
+    "koa": (BACKEND, "Koa"), "hono": (BACKEND, "Hono"), "socket.io": (BACKEND, "Socket.IO"),
+    "@apollo/server": (BACKEND, "Apollo Server"), "apollo-server": (BACKEND, "Apollo Server"),
+    "prisma": (BACKEND, "Prisma"), "@prisma/client": (BACKEND, "Prisma"), "mongoose": (BACKEND, "Mongoose"),
+    "sequelize": (BACKEND, "Sequelize"), "typeorm": (BACKEND, "TypeORM"), "drizzle-orm": (BACKEND, "Drizzle"),
+    "pg": (INFRASTRUCTURE, "PostgreSQL"), "mysql2": (INFRASTRUCTURE, "MySQL"), "mongodb": (INFRASTRUCTURE, "MongoDB"),
+    "redis": (INFRASTRUCTURE, "Redis"), "ioredis": (INFRASTRUCTURE, "Redis"), "firebase": (INFRASTRUCTURE, "Firebase"),
+    "@supabase/supabase-js": (INFRASTRUCTURE, "Supabase"), "aws-sdk": (INFRASTRUCTURE, "AWS"),
+}
+PYTHON_PACKAGES = {
+    "fastapi": (BACKEND, "FastAPI"), "django": (BACKEND, "Django"), "flask": (BACKEND, "Flask"),
+    "djangorestframework": (BACKEND, "Django REST Framework"), "starlette": (BACKEND, "Starlette"),
+    "aiohttp": (BACKEND, "aiohttp"), "tornado": (BACKEND, "Tornado"), "sqlalchemy": (BACKEND, "SQLAlchemy"),
+    "alembic": (BACKEND, "Alembic"), "pydantic": (BACKEND, "Pydantic"), "celery": (BACKEND, "Celery"),
+    "uvicorn": (BACKEND, "Uvicorn"), "gunicorn": (BACKEND, "Gunicorn"), "graphene": (BACKEND, "Graphene"),
+    "torch": (BACKEND, "PyTorch"), "tensorflow": (BACKEND, "TensorFlow"), "scikit-learn": (BACKEND, "scikit-learn"),
+    "pandas": (BACKEND, "pandas"), "numpy": (BACKEND, "NumPy"), "langchain": (BACKEND, "LangChain"),
+    "transformers": (BACKEND, "Hugging Face Transformers"), "openai": (BACKEND, "OpenAI API"),
+    "google-generativeai": (BACKEND, "Gemini API"),
+    "streamlit": (FRONTEND, "Streamlit"), "gradio": (FRONTEND, "Gradio"), "dash": (FRONTEND, "Dash"),
+    "psycopg2": (INFRASTRUCTURE, "PostgreSQL"), "psycopg2-binary": (INFRASTRUCTURE, "PostgreSQL"),
+    "psycopg": (INFRASTRUCTURE, "PostgreSQL"), "asyncpg": (INFRASTRUCTURE, "PostgreSQL"),
+    "pymysql": (INFRASTRUCTURE, "MySQL"), "mysqlclient": (INFRASTRUCTURE, "MySQL"),
+    "pymongo": (INFRASTRUCTURE, "MongoDB"), "motor": (INFRASTRUCTURE, "MongoDB"), "redis": (INFRASTRUCTURE, "Redis"),
+    "boto3": (INFRASTRUCTURE, "AWS"), "firebase-admin": (INFRASTRUCTURE, "Firebase"),
+}
+JVM_ARTIFACTS = {
+    "spring-boot": (BACKEND, "Spring Boot"), "spring-boot-starter-data-jpa": (BACKEND, "Spring Data JPA"),
+    "spring-boot-starter-security": (BACKEND, "Spring Security"), "hibernate-core": (BACKEND, "Hibernate"),
+    "quarkus-core": (BACKEND, "Quarkus"), "micronaut-core": (BACKEND, "Micronaut"), "ktor-server-core": (BACKEND, "Ktor"),
+    "lombok": (BACKEND, "Lombok"), "junit-jupiter": (BACKEND, "JUnit"), "postgresql": (INFRASTRUCTURE, "PostgreSQL"),
+    "mysql-connector-j": (INFRASTRUCTURE, "MySQL"), "mysql-connector-java": (INFRASTRUCTURE, "MySQL"),
+    "spring-boot-starter-data-mongodb": (INFRASTRUCTURE, "MongoDB"),
+    "spring-boot-starter-data-redis": (INFRASTRUCTURE, "Redis"),
+}
+GO_MODULES = {
+    "github.com/gin-gonic/gin": (BACKEND, "Gin"), "github.com/labstack/echo": (BACKEND, "Echo"),
+    "github.com/gofiber/fiber": (BACKEND, "Fiber"), "github.com/go-chi/chi": (BACKEND, "chi"),
+    "github.com/gorilla/mux": (BACKEND, "Gorilla Mux"), "gorm.io/gorm": (BACKEND, "GORM"),
+    "google.golang.org/grpc": (BACKEND, "gRPC"), "github.com/jackc/pgx": (INFRASTRUCTURE, "PostgreSQL"),
+    "github.com/lib/pq": (INFRASTRUCTURE, "PostgreSQL"), "github.com/redis/go-redis": (INFRASTRUCTURE, "Redis"),
+    "github.com/go-redis/redis": (INFRASTRUCTURE, "Redis"), "go.mongodb.org/mongo-driver": (INFRASTRUCTURE, "MongoDB"),
+}
+CARGO_CRATES = {
+    "actix-web": (BACKEND, "Actix Web"), "axum": (BACKEND, "Axum"), "rocket": (BACKEND, "Rocket"),
+    "warp": (BACKEND, "Warp"), "tokio": (BACKEND, "Tokio"), "diesel": (BACKEND, "Diesel"), "sqlx": (BACKEND, "SQLx"),
+    "tonic": (BACKEND, "gRPC"), "yew": (FRONTEND, "Yew"), "leptos": (FRONTEND, "Leptos"), "tauri": (FRONTEND, "Tauri"),
+}
+DOCKER_IMAGES = {
+    "nginx": "Nginx", "postgres": "PostgreSQL", "mysql": "MySQL", "mariadb": "MariaDB", "mongo": "MongoDB",
+    "redis": "Redis", "rabbitmq": "RabbitMQ", "elasticsearch": "Elasticsearch", "traefik": "Traefik",
+}
+# Files whose mere presence in the tree names a platform (no fetch needed)
+PLATFORM_FILES = {
+    ".gitlab-ci.yml": "GitLab CI", ".travis.yml": "Travis CI", "Jenkinsfile": "Jenkins",
+    "azure-pipelines.yml": "Azure Pipelines", "Procfile": "Heroku", "render.yaml": "Render",
+    "vercel.json": "Vercel", "netlify.toml": "Netlify", "fly.toml": "Fly.io", "serverless.yml": "Serverless",
+    "Chart.yaml": "Helm",
+}
+PLATFORM_DIRS = {".github/workflows/": "GitHub Actions", ".circleci/": "CircleCI", "terraform/": "Terraform", "k8s/": "Kubernetes"}
+
+_REQUIREMENT_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_GRADLE_DEPENDENCY = re.compile(r"""['"]([\w.-]+):([\w.-]+)(?::[^'"]*)?['"]""")
+_MAVEN_ARTIFACT = re.compile(r"<artifactId>\s*([\w.-]+)\s*</artifactId>")
+_GO_REQUIRE = re.compile(r"^\s*(?:require\s+)?([\w.-]+\.[a-z]+/[\w./-]+?)(?:/v\d+)?\s+v\d", re.MULTILINE)
+_DOCKER_FROM = re.compile(r"^\s*FROM\s+(?:--platform=\S+\s+)?([^\s:@]+)", re.MULTILINE | re.IGNORECASE)
+_COMPOSE_IMAGE = re.compile(r"""^\s*image:\s*['"]?([^\s:'"@]+)""", re.MULTILINE)
+
+
+def _python_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class StackDetector:
+    """
+    Tech stack detection from the repo's own manifests, without Gemini.
+
+    The tree (or the PromptBuilder digest of it) decides which manifests
+    exist; up to STACK_MAX_MANIFESTS of them (package.json,
+    requirements.txt, pyproject.toml, pom.xml, build.gradle, go.mod,
+    Cargo.toml, Dockerfile, compose files), shallowest first and mixing
+    kinds, are fetched from the contents API, STACK_FETCH_CONCURRENCY at
+    a time. Their dependencies are looked up in the tables above. CI and
+    hosting config is recognised from its path alone.
+
+    Only known dependencies are reported, so the stack is precise but not
+    exhaustive: the Gemini prompt gets it as a starting point, and the
+    "fast" analysis mode returns it as is.
+    """
+
+    def __init__(self, github_service: GitHubService = None, max_manifests: int = None, concurrency: int = None):
+        self.github = github_service or GitHubService()
+        self.max_manifests = max_manifests or Config.STACK_MAX_MANIFESTS
+        self.concurrency = concurrency or Config.STACK_FETCH_CONCURRENCY
+        self.detections = 0
+        self.manifests_fetched = 0
+        self.fetch_errors = 0
+
+    @staticmethod
+    def manifest_kind(path: str):
+        """The parser for `path` ("package.json", "Dockerfile", ...), or None if it isn't a manifest we read."""
+        name = path.rsplit("/", 1)[-1]
+        if name in ("package.json", "requirements.txt", "pyproject.toml", "pom.xml", "go.mod", "Cargo.toml"):
+            return name
+        if name in ("build.gradle", "build.gradle.kts"):
+            return "build.gradle"
+        if name == "Dockerfile" or name.startswith("Dockerfile.") or name.endswith(".Dockerfile"):
+            return "Dockerfile"
+        if name in ("docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml"):
+            return "compose"
+        return None
+
+    def select_manifests(self, paths) -> list:
+        """
+        The manifests worth fetching among `paths` (in any order), at most
+        max_manifests: shallowest first, one of each kind before a second of any.
+        """
+        by_kind = {}
+        for path in sorted(paths, key=lambda p: (p.count("/"), p)):
+            kind = self.manifest_kind(path)
+            if kind:
+                by_kind.setdefault(kind, []).append(path)
+        selected = []
+        for round_ in range(max((len(found) for found in by_kind.values()), default=0)):
+            selected.extend(found[round_] for found in by_kind.values() if round_ < len(found))
+        return selected[:self.max_manifests]
+
+    async def detect(self, owner: str, repo_name: str, paths, ref: str = "HEAD"):
+        """
+        (TechStack, manifests read) for a repo whose file paths (or digest
+        candidates) are `paths`. A manifest that can't be fetched is skipped.
+        """
+        paths = list(paths)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(path: str):
+            async with semaphore:
+                return await self.github.fetch_file(owner, repo_name, path, ref)
+
+        selected = self.select_manifests(paths)
+        fetched = await asyncio.gather(*(fetch(path) for path in selected), return_exceptions=True)
+        contents = {}
+        for path, text in zip(selected, fetched):
+            if isinstance(text, RateLimitExceeded):
+                raise text
+            if isinstance(text, BaseException):
+                self.fetch_errors += 1
+                print(f" Warning: Could not fetch {path} for stack detection: {text}")
+            elif text is not None:
+                contents[path] = text
+        self.detections += 1
+        self.manifests_fetched += len(contents)
+        return self.stack_from(contents, paths), sorted(contents)
+
+    def stack_from(self, contents: dict, paths=()) -> TechStack:
+        """The TechStack from manifest texts ({path: text}) and the paths of the tree."""
+        found = {FRONTEND: [], BACKEND: [], INFRASTRUCTURE: []}
+
+        def add(category: str, label: str):
+            if label not in found[category]:
+                found[category].append(label)
+
+        for path, text in contents.items():
+            try:
+                for category, label in self._parse(self.manifest_kind(path), text):
+                    add(category, label)
+            except (ValueError, TypeError, AttributeError, tomllib.TOMLDecodeError) as e:
+                print(f" Warning: Could not parse {path}: {e}")
+        for path in paths:
+            name = path.rsplit("/", 1)[-1]
+            if name in PLATFORM_FILES:
+                add(INFRASTRUCTURE, PLATFORM_FILES[name])
+            for directory, label in PLATFORM_DIRS.items():
+                if path.startswith(directory):
+                    add(INFRASTRUCTURE, label)
+            if self.manifest_kind(path) in ("Dockerfile", "compose"):
+                add(INFRASTRUCTURE, "Docker")
+        return TechStack(**found)
+
+    def _parse(self, kind: str, text: str) -> list:
+        """(category, label) pairs found in one manifest."""
+        if kind == "package.json":
+            return self._from_package_json(json.loads(text))
+        if kind == "requirements.txt":
+            names = []
+            for line in text.splitlines():
+                line = line.split("#", 1)[0]
+                match = _REQUIREMENT_NAME.match(line)
+                if match and not line.lstrip().startswith("-"):
+                    names.append(match.group(1))
+            return self._with_language(self._lookup(names, PYTHON_PACKAGES, _python_name), "Python")
+        if kind == "pyproject.toml":
+            return self._from_pyproject(tomllib.loads(text))
+        if kind == "pom.xml":
+            return self._with_language(self._jvm(_MAVEN_ARTIFACT.findall(text)), "Java")
+        if kind == "build.gradle":
+            return self._with_language(self._jvm(name for _, name in _GRADLE_DEPENDENCY.findall(text)), "Java")
+        if kind == "go.mod":
+            return self._with_language(self._lookup(_GO_REQUIRE.findall(text), GO_MODULES), "Go")
+        if kind == "Cargo.toml":
+            data = tomllib.loads(text)
+            crates = [name for table in (data, data.get("workspace", {}))
+                      for section in ("dependencies", "dev-dependencies") for name in table.get(section, {})]
+            return self._with_language(self._lookup(crates, CARGO_CRATES), "Rust")
+        if kind in ("Dockerfile", "compose"):
+            images = (_DOCKER_FROM if kind == "Dockerfile" else _COMPOSE_IMAGE).findall(text)
+            labels = [DOCKER_IMAGES.get(image.rsplit("/", 1)[-1].lower()) for image in images]
+            return [(INFRASTRUCTURE, label) for label in labels if label]
+        return []
+
+    @staticmethod
+    def _lookup(names, table: dict, normalize=str.lower) -> list:
+        return [table[key] for key in (normalize(name) for name in names) if key in table]
+
+    @staticmethod
+    def _with_language(found: list, language: str) -> list:
+        """The manifest's language first, on the side its dependencies are mostly on (backend by default)."""
+        frontend = sum(category == FRONTEND for category, _ in found)
+        side = FRONTEND if frontend and frontend * 2 > len(found) else BACKEND
+        return [(side, language)] + found
+
+    def _from_package_json(self, data: dict) -> list:
+        names = [name for section in ("dependencies", "devDependencies", "peerDependencies")
+                 for name in (data.get(section) or {})]
+        found = self._lookup(names, NPM_PACKAGES)
+        if "typescript" in names:
+            found.insert(0, (FRONTEND if any(category == FRONTEND for category, _ in found) else BACKEND, "TypeScript"))
+        if any(category == BACKEND for category, _ in found):
+            found.insert(0, (BACKEND, "Node.js"))
+        return found
+
+    def _from_pyproject(self, data: dict) -> list:
+        project = data.get("project", {})
+        requirements = list(project.get("dependencies", []))
+        for extra in project.get("optional-dependencies", {}).values():
+            requirements.extend(extra)
+        names = [match.group(1) for match in map(_REQUIREMENT_NAME.match, requirements) if match]
+        poetry = data.get("tool", {}).get("poetry", {})
+        names.extend(poetry.get("dependencies", {}))
+        for group in poetry.get("group", {}).values():
+            names.extend(group.get("dependencies", {}))
+        return self._with_language(self._lookup(names, PYTHON_PACKAGES, _python_name), "Python")
+
+    @staticmethod
+    def _jvm(artifacts) -> list:
+        found = []
+        for artifact in artifacts:
+            artifact = artifact.lower()
+            if artifact in JVM_ARTIFACTS:
+                found.append(JVM_ARTIFACTS[artifact])
+            if artifact.startswith("spring-boot-starter"):
+                found.append(JVM_ARTIFACTS["spring-boot"])
+        return found
+
+    def stats(self) -> dict:
+        return {
+            "detections": self.detections,
+            "manifests_fetched": self.manifests_fetched,
+            "fetch_errors": self.fetch_errors,
+        }
+
+
+_default_detector = None
+
+
+def get_stack_detector():
+    """Process-wide stack detector (None when disabled in Config)."""
+    global _default_detector
+    if not Config.STACK_DETECTION_ENABLED:
+        return None
+    if _default_detector is None:
+        _default_detector = StackDetector()
+    return _default_detector
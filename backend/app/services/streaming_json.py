@@ -0,0 +1,195 @@
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_INVALID = object()
+
+
+def _loads(text: str):
+    """json.loads, retried without trailing commas; _INVALID if that fails too."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", text))
+    except ValueError:
+        return _INVALID
+
+
+class StreamingJSONParser:
+    """
+    Incremental, tolerant parser for one JSON object arriving in chunks
+    (Gemini's streamed answer).
+
+    `feed()` returns (key, value) for every top-level member completed by
+    the chunk, as soon as its closing quote or bracket arrives. Members
+    listed in `stream_arrays` are reported one element at a time instead,
+    as (key, element), and not again as a whole.
+
+    Tolerated along the way:
+    - text before the first '{' (```json fences, prose) and after the
+      object closes
+    - trailing commas, and missing commas between members
+    - a member that still doesn't parse: it's skipped (see `dropped`) and
+      the rest of the object is kept
+    - a truncated answer: finish() returns the members and array elements
+      completed before it broke off (`complete` is then False)
+    """
+
+    def __init__(self, stream_arrays=()):
+        self.stream_arrays = set(stream_arrays)
+        self.members = {}
+        self.dropped = []
+        self.closed = False  # Top-level object ended
+
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._stack = []  # Open '{' / '['
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._key_start = None
+        self._key = None  # Current top-level member; None while a key is expected
+        self._value_start = None
+        self._item_start = None  # Current element of a streamed array
+        self._events = []
+
+    @property
+    def complete(self) -> bool:
+        """The whole object arrived and every member parsed."""
+        return self.closed and not self.dropped
+
+    def feed(self, chunk: str) -> list:
+        """Adds the next chunk of text; returns the (key, value) pairs it completed."""
+        self._text += chunk
+        self._events = []
+        text, stack = self._text, self._stack
+        i = self._pos
+        while i < len(text) and not self.closed:
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._string_closed(i + 1)
+            elif not self._started:
+                if c == "{":
+                    self._started = True
+                    stack.append(c)
+            elif not c.isspace():
+                self._scan(c, i)
+            i += 1
+        self._pos = i
+        return self._events
+
+    def _scan(self, c: str, i: int):
+        stack = self._stack
+        if len(stack) == 1:
+            if self._key is None:  # Expecting a key (anything else but '}' is skipped)
+                if c == '"':
+                    self._open_string(i)
+                    self._key_start = i
+                elif c == "}":
+                    self.closed = True
+                return
+            if self._value_start is None:
+                if c == ":":
+                    return
+                if c in ",}":  # Key without a value
+                    self._key = None
+                    self.closed = c == "}"
+                    return
+                self._value_start = i
+            elif c in ",}":  # End of a number / true / false / null
+                self._member_done(i)
+                self.closed = c == "}"
+                return
+
+        if self._streaming() and len(stack) == 2:
+            if self._item_start is None:
+                if c in ",]":
+                    if c == "]":
+                        self._close_container(i)
+                    return
+                self._item_start = i
+            elif c in ",]":  # End of a scalar element
+                self._item_done(i)
+                if c == "]":
+                    self._close_container(i)
+                return
+
+        if c == '"':
+            self._open_string(i)
+        elif c in "{[":
+            stack.append(c)
+        elif c in "}]":
+            self._close_container(i)
+
+    def _open_string(self, i: int):
+        self._in_string = True
+        self._string_start = i
+
+    def _string_closed(self, end: int):
+        depth = len(self._stack)
+        if depth == 1:
+            if self._key is None and self._key_start == self._string_start:
+                key = _loads(self._text[self._key_start:end])
+                self._key = key if isinstance(key, str) else self._text[self._key_start + 1:end - 1]
+            elif self._value_start == self._string_start:
+                self._member_done(end)
+        elif depth == 2 and self._streaming() and self._item_start == self._string_start:
+            self._item_done(end)
+
+    def _close_container(self, i: int):
+        if len(self._stack) > 1:  # A stray closing bracket never ends the object
+            self._stack.pop()
+        depth = len(self._stack)
+        if depth == 2 and self._streaming() and self._item_start is not None:
+            self._item_done(i + 1)
+        elif depth == 1 and self._value_start is not None:
+            self._member_done(i + 1)
+
+    def _streaming(self) -> bool:
+        """Inside the array of a streamed member."""
+        return (self._key in self.stream_arrays and self._value_start is not None
+                and self._text[self._value_start] == "[")
+
+    def _item_done(self, end: int):
+        item = _loads(self._text[self._item_start:end])
+        self._item_start = None
+        if item is _INVALID:
+            self.dropped.append(f"{self._key}[{len(self.members.get(self._key, []))}]")
+            return
+        self.members.setdefault(self._key, []).append(item)
+        self._events.append((self._key, item))
+
+    def _member_done(self, end: int):
+        key = self._key
+        if key in self.stream_arrays and self._text[self._value_start] == "[":
+            self.members.setdefault(key, [])  # Elements were reported one by one
+        else:
+            value = _loads(self._text[self._value_start:end])
+            if value is _INVALID:
+                self.dropped.append(key)
+            else:
+                self.members[key] = value
+                self._events.append((key, value))
+        self._key = None
+        self._value_start = None
+
+    def finish(self) -> dict:
+        """
+        The members parsed so far, once the stream has ended: everything on a
+        complete answer, what could be recovered otherwise. None if nothing could.
+        """
+        if self._started and not self.closed and not self._in_string and len(self._stack) == 1 \
+                and self._value_start is not None:
+            self._member_done(len(self._text))  # A number cut off at the end is still usable
+        if self._streaming() and self._item_start is not None and not self.closed:
+            self._item_start = None  # Unfinished element
+        return dict(self.members) if self.members else None
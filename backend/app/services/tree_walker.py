@@ -0,0 +1,208 @@
+import asyncio
+import codecs
+import json
+import re
+from contextlib import aclosing
+from app.config import Config
+from app.services.github_scheduler import RateLimitExceeded
+
+
+class TreeStreamParser:
+    """
+    Pulls entries out of a `git/trees` JSON body while it is still downloading.
+
+    GitHub returns {"sha": ..., "url": ..., "tree": [{...}, ...], "truncated": bool}.
+    Entries are decoded one object at a time as soon as their bytes arrive,
+    so we never hold the whole (possibly multi-MB) document in memory.
+    """
+
+    _TREE_START = re.compile(r'"tree"\s*:\s*\[')
+    _TRUNCATED = re.compile(r'"truncated"\s*:\s*(true|false)')
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._json = json.JSONDecoder()
+        self._buf = ""
+        self._outside = ""  # Small text around the tree array (sha, url, truncated)
+        self._state = "head"  # head -> entries -> tail
+
+    def feed(self, chunk: bytes) -> list:
+        self._buf += self._decoder.decode(chunk)
+        entries = []
+
+        if self._state == "head":
+            match = self._TREE_START.search(self._buf)
+            if not match:
+                return entries
+            self._outside += self._buf[:match.start()]
+            self._buf = self._buf[match.end():]
+            self._state = "entries"
+
+        if self._state == "entries":
+            buf, pos, size = self._buf, 0, len(self._buf)
+            while True:
+                while pos < size and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos >= size:
+                    break
+                if buf[pos] == "]":
+                    self._state = "tail"
+                    pos += 1
+                    break
+                try:
+                    entry, pos = self._json.raw_decode(buf, pos)
+                except ValueError:
+                    break  # Object not complete yet, wait for more bytes
+                entries.append(entry)
+            self._buf = buf[pos:]
+
+        if self._state == "tail":
+            self._outside += self._buf
+            self._buf = ""
+
+        return entries
+
+    @property
+    def truncated(self) -> bool:
+        match = self._TRUNCATED.search(self._outside)
+        return bool(match and match.group(1) == "true")
+
+
+class TreeWalker:
+    """
+    Lists every file path of a repository, streaming paths out as they are parsed.
+
+    1. Tries the single recursive `git/trees/{ref}?recursive=1` call.
+    2. If GitHub marks that listing `truncated` (very large monorepos), it
+       walks the tree breadth-first instead: each top-level directory is
+       listed recursively on its own, and any directory that is still
+       truncated is split one level further. Up to `concurrency` listings
+       run at once.
+
+    `max_entries` caps how many paths are produced and `max_depth` skips
+    anything nested deeper than that, so memory scales with the caps, not
+    with the size of the repository.
+
+    A subtree that can't be listed is skipped and counted in
+    stats["failed_listings"]: the paths are then incomplete. GitHub's rate
+    limit ends the walk (RateLimitExceeded).
+    """
+
+    def __init__(self, github_service, max_entries: int = None, max_depth: int = None, concurrency: int = None):
+        self.github = github_service
+        self.max_entries = max_entries or Config.TREE_MAX_ENTRIES
+        self.max_depth = max_depth or Config.TREE_MAX_DEPTH
+        self.concurrency = concurrency or Config.TREE_WALK_CONCURRENCY
+        self.stats = {}
+
+    async def walk(self, owner: str, repo_name: str, ref: str = "HEAD"):
+        """Async generator of file (blob) paths."""
+        self.stats = {
+            "entries": 0,
+            "requests": 0,
+            "truncated_by_github": False,
+            "capped": False,
+            "skipped_too_deep": 0,
+            "failed_listings": 0,
+        }
+        seen = set()
+        trees_url = f"{self.github.BASE_URL}/{owner}/{repo_name}/git/trees"
+
+        # --- Attempt 1: one recursive listing ---
+        parser = TreeStreamParser()
+        async with aclosing(self._entries(f"{trees_url}/{ref}?recursive=1", parser)) as entries:
+            async for entry in entries:
+                if entry.get("type") == "blob" and self._accept(entry["path"], seen):
+                    yield entry["path"]
+                    if self.stats["capped"]:
+                        return
+
+        if not parser.truncated:
+            return
+
+        # --- Attempt 2: breadth-first walk of subtrees ---
+        self.stats["truncated_by_github"] = True
+        print(f"Warning: GitHub truncated the tree for {owner}/{repo_name}. Walking subtrees instead.")
+
+        async with aclosing(self._walk_subtrees(trees_url, ref)) as paths:
+            async for path in paths:
+                if self._accept(path, seen):
+                    yield path
+                    if self.stats["capped"]:
+                        return
+
+    def _accept(self, path: str, seen: set) -> bool:
+        if path in seen:
+            return False
+        if path.count("/") >= self.max_depth:
+            self.stats["skipped_too_deep"] += 1
+            return False
+
+        seen.add(path)
+        self.stats["entries"] += 1
+        if self.stats["entries"] >= self.max_entries:
+            self.stats["capped"] = True
+        return True
+
+    async def _entries(self, url: str, parser: TreeStreamParser):
+        self.stats["requests"] += 1
+        async with aclosing(self.github._stream_bytes(url)) as chunks:
+            async for chunk in chunks:
+                for entry in parser.feed(chunk):
+                    yield entry
+
+    async def _walk_subtrees(self, trees_url: str, ref: str):
+        # Work items: (path prefix, tree sha/ref, list recursively?)
+        work = asyncio.Queue()
+        # Bounded so that fast listings wait for the consumer instead of piling up paths
+        out = asyncio.Queue(maxsize=self.concurrency * 256)
+        work.put_nowait(("", ref, False))
+
+        async def worker():
+            while True:
+                prefix, sha, recursive = await work.get()
+                try:
+                    await self._list_subtree(trees_url, prefix, sha, recursive, work, out)
+                except RateLimitExceeded as e:
+                    await out.put(e)  # The rest would fail the same way
+                except Exception as e:
+                    self.stats["failed_listings"] += 1
+                    print(f"Warning: Could not list subtree '{prefix or '/'}': {e}")
+                finally:
+                    work.task_done()
+
+        async def finish():
+            await work.join()
+            await out.put(None)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(finish()))
+        try:
+            while True:
+                path = await out.get()
+                if path is None:
+                    return
+                if isinstance(path, RateLimitExceeded):
+                    raise path
+                yield path
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _list_subtree(self, trees_url, prefix, sha, recursive, work, out):
+        depth = prefix.count("/")
+        url = f"{trees_url}/{sha}?recursive=1" if recursive else f"{trees_url}/{sha}"
+        parser = TreeStreamParser()
+
+        async with aclosing(self._entries(url, parser)) as entries:
+            async for entry in entries:
+                path = prefix + entry["path"]
+                if entry.get("type") == "blob":
+                    await out.put(path)
+                elif entry.get("type") == "tree" and not recursive and depth + 1 < self.max_depth:
+                    work.put_nowait((path + "/", entry["sha"], True))
+
+        if recursive and parser.truncated:
+            # Still too big for one listing: list this level only and split again
+            work.put_nowait((prefix, sha, False))
@@ -0,0 +1,106 @@
+"""
+Cost of storing Analysis rows: one INSERT + COMMIT per analysis (the
+request waits for both) against the AnalysisWriter's write-behind bulk
+inserts.
+
+--rows analyses finish at once, --concurrency at a time, and each calls
+the router's _save_analysis. Every SQL statement takes --db-rtt-ms
+longer, like the round trip to a hosted Postgres (see
+bench_event_loop_stalls.add_db_rtt).
+
+Measured: latency of _save_analysis as the caller sees it, wall time
+until every row is in the database, and the statements and commits sent.
+
+    cd backend
+    python -m benchmarks.bench_analysis_writes --rows 2000 --db-rtt-ms 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from benchmarks.bench_event_loop_stalls import add_db_rtt, percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000, help="Analyses saved")
+    parser.add_argument("--concurrency", type=int, default=50, help="Saves in flight at once")
+    parser.add_argument("--db-rtt-ms", type=float, default=5, help="Added to every SQL statement")
+    parser.add_argument("--batch-size", type=int, default=100, help="ANALYSIS_WRITE_BATCH_SIZE")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir.name, 'bench.db')}",
+        "GITHUB_CACHE_PATH": os.path.join(workdir.name, "github_cache.sqlite3"),
+        "GEMINI_API_KEY": "benchmark",
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        from sqlalchemy import event, func, select
+        import main as app_main  # Creates the tables
+        from app import database, entity
+        from app.routers import analyze
+        from app.models import AnalysisResult
+        from app.services.analysis_writer import AnalysisWriter
+        from benchmarks.fake_gemini import DEFAULT_ANALYSIS
+    add_db_rtt(database.async_engine.sync_engine, args.db_rtt_ms)
+
+    counts = {"statements": 0, "commits": 0}
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute",
+                 lambda *a: counts.__setitem__("statements", counts["statements"] + 1))
+    event.listen(database.async_engine.sync_engine, "commit",
+                 lambda *a: counts.__setitem__("commits", counts["commits"] + 1))
+
+    result = AnalysisResult(
+        details={"name": "bench", "owner": "acme", "stars": 42, "forks": 7, "open_issues": 3},
+        score=87, summary=DEFAULT_ANALYSIS["summary"], roadmap=DEFAULT_ANALYSIS["roadmap"],
+        tech_stack=DEFAULT_ANALYSIS["tech_stack"], file_structure=[f"src/module_{i}.py" for i in range(40)],
+    )
+
+    async def run(writer):
+        analyze.analysis_writer = writer
+        gate = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def save(n: int):
+            async with gate, database.AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                await analyze._save_analysis(db, None, f"https://github.com/acme/bench-{n}", f"bench-{n}",
+                                             result, head_sha="abc123", cache_key=f"bench:{n}")
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        async with database.async_engine.begin() as conn:
+            await conn.execute(entity.Analysis.__table__.delete())
+        counts.update(statements=0, commits=0)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await asyncio.gather(*(save(n) for n in range(args.rows)))
+            if writer:
+                await writer.stop()
+        elapsed = time.perf_counter() - start
+        sent = dict(counts)
+        async with database.AsyncSessionLocal() as db:
+            stored = (await db.execute(select(func.count(entity.Analysis.id)))).scalar()
+        await database.async_engine.dispose()  # Pooled connections belong to this loop
+        return latencies, elapsed, sent, stored
+
+    print(f"{args.rows} analyses saved, {args.concurrency} at a time, +{args.db_rtt_ms:.0f} ms per SQL statement")
+    print(f"{'':<14} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>8} {'rows/s':>8} {'stmts':>7} {'commits':>8} {'stored':>7}")
+    for name, writer in (("insert+commit", None),
+                         ("write-behind", AnalysisWriter(batch_size=args.batch_size, interval=1.0,
+                                                         max_pending=args.rows + 1))):
+        latencies, elapsed, sent, stored = asyncio.run(run(writer))
+        print(f"{name:<14} {percentile(latencies, 50):>8.2f} {percentile(latencies, 99):>8.2f} {elapsed:>8.2f} "
+              f"{stored / elapsed:>8.0f} {sent['statements']:>7} {sent['commits']:>8} {stored:>7}")
+        if writer:
+            print(f"  {writer.stats()}")
+
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Scalar ScoringService.calculate_score in a loop vs. BatchScorer (NumPy).
+
+Checks first that both give the same score for every repo, including odd
+pushed_at values, empty READMEs, tiny repos, RepoSnapshot inputs and
+READMEs that end where a pattern starts, then reports repos/second for
+each batch size.
+
+    cd backend
+    python -m benchmarks.bench_batch_scoring --batches 10 1000 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.services.batch_scoring import BatchScorer
+from app.services.repo_snapshot import RepoSnapshot
+from app.services.scoring_service import SETUP_KEYWORDS, ScoringService
+from benchmarks.bench_scoring import random_tree
+
+README_PARTS = ["# Project", "Run `npm install` first.", "![badge](https://img.shields.io/x)",
+                '<IMG src="shot.png">', "Getting Started", "Lorem ipsum dolor sit amet. " * 20, "Ünïcödé ✓"]
+ODD_PUSHED_AT = [None, "", "garbage", 12345, "2023-02-30T10:00:00Z", "2023-10-25T10:00:60Z", "2023-1-5T1:2:3Z"]
+
+
+def random_repo(rng: random.Random, now: datetime) -> dict:
+    if rng.random() < 0.1:
+        pushed_at = rng.choice(ODD_PUSHED_AT)
+    else:
+        pushed_at = (now - timedelta(days=rng.randint(0, 200), seconds=rng.randint(0, 86400))).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "metadata": {
+            "pushed_at": pushed_at,
+            "license": rng.choice([None, {"key": "mit"}]),
+            "description": rng.choice([None, "", "short", "A much longer description"]),
+        },
+        "files": random_tree(rng, rng.choice([0, 1, 2, 3, 5, 20, 60, 200]), noise=rng.choice([0.0, 0.02, 0.2])),
+        "readme": " ".join(rng.sample(README_PARTS, rng.randint(0, len(README_PARTS)))),
+    }
+
+
+def boundary_repos() -> list:
+    """
+    Neighbouring repos whose READMEs together spell a pattern ("... npm " +
+    "install ..."): the batch buffer joins them, the scalar path must not.
+    """
+    repos = []
+    for pattern in SETUP_KEYWORDS + ["![", "<img"]:
+        for cut in range(1, len(pattern)):
+            for readme in ("x " + pattern[:cut], pattern[cut:] + " here"):
+                repos.append({"metadata": {}, "files": ["a.py", "b.py", "c.py"], "readme": readme})
+    return repos
+
+
+def check_parity(repos: list, scorer: BatchScorer, scoring: ScoringService):
+    expected = [scoring.calculate_score(r["metadata"], r["files"], r["readme"]) for r in repos]
+    as_snapshots = [{**r, "files": RepoSnapshot(r["files"])} for r in repos[::2]]
+    assert scorer.score_batch(repos) == expected, "Batch scores differ from calculate_score"
+    assert scorer.score_batch(as_snapshots) == expected[::2], "Batch scores differ for RepoSnapshot input"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    scorer = BatchScorer()
+    scoring = ScoringService()
+
+    check_parity([random_repo(rng, now) for _ in range(3000)] + boundary_repos(), scorer, scoring)
+    print("Parity: 3000 random repos + README boundaries, batch scores identical to calculate_score")
+
+    print(f"{'repos':>8} {'scalar repos/s':>15} {'batch repos/s':>14} {'speedup':>8}")
+    for size in args.batches:
+        repos = [random_repo(rng, now) for _ in range(size)]
+
+        start = time.perf_counter()
+        scalar = [scoring.calculate_score(r["metadata"], r["files"], r["readme"]) for r in repos]
+        scalar_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = scorer.score_batch(repos)
+        batch_s = time.perf_counter() - start
+
+        assert scalar == batch
+        print(f"{size:>8} {size / scalar_s:>15,.0f} {size / batch_s:>14,.0f} {scalar_s / batch_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+How long the app's event loop is stalled while analyses run: the cost of
+database calls made on the loop thread.
+
+The app runs under uvicorn on a local port, against fake_github and an
+in-process StubGeminiModel, with --analyses analyses of different repos
+sent at once (half of them signed in, so the user lookup and history row
+are part of it). Every SQL statement takes --db-rtt-ms longer, spent on
+the thread that runs it, like the round trip to a hosted Postgres: with
+a sync driver that is the event loop, with aiosqlite its connection
+thread.
+
+Measured meanwhile:
+- loop lag: how late a 10 ms asyncio.sleep in the app's loop wakes up
+- probe: latency of GET / sent every 20 ms from another thread
+
+Uses a temporary SQLite file. The script only uses the HTTP API, so it
+runs unchanged against older checkouts of the app for comparison.
+
+    cd backend
+    python -m benchmarks.bench_event_loop_stalls --analyses 40 --db-rtt-ms 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import fake_github
+from benchmarks.local_server import LocalServer
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class LoopLag:
+    """Oversleep of a `interval` asyncio.sleep loop, in ms: how long the loop couldn't run anything."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self.running = False
+
+    async def run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            if self.running:
+                self.samples.append((time.perf_counter() - start - self.interval) * 1000)
+
+
+def add_db_rtt(engine, rtt_ms: float):
+    """Every statement on `engine` sleeps `rtt_ms` on the thread executing it (SQLite trace callback)."""
+    from sqlalchemy import event
+
+    def on_connect(dbapi_connection, record):
+        raw = getattr(dbapi_connection, "driver_connection", dbapi_connection)  # Adapted async connection
+        raw = getattr(raw, "_conn", raw)  # aiosqlite.Connection -> sqlite3.Connection
+        raw.set_trace_callback(lambda sql: time.sleep(rtt_ms / 1000))
+
+    event.listen(engine, "connect", on_connect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--analyses", type=int, default=40, help="Analyses sent at once")
+    parser.add_argument("--rounds", type=int, default=2, help="Batches of --analyses, each on new repos")
+    parser.add_argument("--db-rtt-ms", type=float, default=5, help="Added to every SQL statement")
+    parser.add_argument("--github-latency-ms", type=float, default=50)
+    parser.add_argument("--gemini-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    github = LocalServer(fake_github.create_app(latency_ms=args.github_latency_ms)).__enter__()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir.name, 'bench.db')}",
+        "GITHUB_CACHE_PATH": os.path.join(workdir.name, "github_cache.sqlite3"),
+        "GITHUB_API_URL": github.url,
+        "GITHUB_TOKEN": "benchmark",
+        "GEMINI_API_KEY": "benchmark",
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import httpx
+        import jwt
+        import main as app_main
+        from app import database, entity
+        from app.config import Config
+        from app.routers import analyze
+        from benchmarks.fake_gemini import StubGeminiModel
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    analyze.ai_service.model = StubGeminiModel(latency_ms=args.gemini_ms)
+    analyze.ai_service.cache = None
+    for engine in (database.engine, getattr(database, "async_engine", None)):
+        if engine is not None:
+            add_db_rtt(engine.sync_engine if hasattr(engine, "sync_engine") else engine, args.db_rtt_ms)
+
+    with database.SessionLocal() as db:
+        db.add(entity.User(email="bench@example.com", full_name="Bench"))
+        db.commit()
+    token = jwt.encode({"sub": "bench@example.com"}, Config.JWT_SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
+
+    lag = LoopLag()
+
+    @app_main.app.get("/_bench/loop-lag")
+    async def start_loop_lag():
+        if not hasattr(lag, "task"):
+            lag.task = asyncio.create_task(lag.run())
+        return {}
+
+    probes = []
+    stop_probing = threading.Event()
+
+    def probe(url: str):
+        with httpx.Client(base_url=url, timeout=600) as client:
+            while not stop_probing.is_set():
+                start = time.perf_counter()
+                client.get("/")
+                probes.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.02)
+
+    print(f"{args.rounds} x {args.analyses} analyses at once, +{args.db_rtt_ms:.0f} ms per SQL statement, "
+          f"GitHub {args.github_latency_ms:.0f} ms, Gemini {args.gemini_ms:.0f} ms, "
+          f"{'async' if hasattr(database, 'async_engine') else 'sync'} database sessions")
+    with contextlib.redirect_stdout(io.StringIO()), LocalServer(app_main.app) as app_server, \
+            httpx.Client(base_url=app_server.url, timeout=600) as client:
+        client.get("/_bench/loop-lag")
+
+        def analyze_one(n: int):
+            headers = {"Authorization": f"Bearer {token}"} if n % 2 else {}
+            resp = client.post("/api/analyze/", json={"github_url": f"https://github.com/acme/stall-{n}"},
+                               headers=headers)
+            return resp.status_code
+
+        prober = threading.Thread(target=probe, args=(app_server.url,), daemon=True)
+        lag.running = True
+        prober.start()
+        start = time.perf_counter()
+        statuses = []
+        with ThreadPoolExecutor(max_workers=args.analyses) as pool:
+            for round_ in range(args.rounds):
+                ids = range(round_ * args.analyses, (round_ + 1) * args.analyses)
+                statuses += list(pool.map(analyze_one, ids))
+        elapsed = time.perf_counter() - start
+        lag.running = False
+        stop_probing.set()
+        prober.join()
+
+    failed = sum(status != 200 for status in statuses)
+    print(f"{len(statuses)} analyses in {elapsed:.1f} s ({len(statuses) / elapsed:.1f}/s), {failed} failed")
+    print(f"{'':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'mean ms':>8}")
+    for name, samples in (("loop lag", lag.samples), ("GET /", probes)):
+        print(f"{name:<10} {percentile(samples, 50):>8.1f} {percentile(samples, 99):>8.1f} "
+              f"{max(samples, default=0):>8.1f} {statistics.fmean(samples) if samples else 0:>8.1f}")
+
+    github.__exit__(None, None, None)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Bulk analyses under a requests-per-minute quota: one Gemini call per repo
+(analyze_code_quality) vs. batched prompts (analyze_code_quality_batch).
+
+A StubGeminiModel stands in for the API. It rejects calls over --rpm per
+simulated minute and takes time to write its answer (longer answers for
+bigger batches). The job paces its calls to the quota, as a bulk job
+has to, so both modes make the same number of calls per minute and
+differ in how many repos each call covers. --bad-section-rate damages
+that share of the sections in batched answers, so retries are counted
+too.
+
+One simulated minute lasts --minute-s seconds, and latencies are scaled
+to match. Reported: repos answered per (simulated) minute, Gemini calls,
+estimated prompt tokens per repo, and fallback answers.
+
+    cd backend
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_gemini_batch --repos 60 --rpm 15
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import re
+import time
+from collections import deque
+
+from app.config import Config
+from app.services.ai_service import AIService
+from app.services.gemini_executor import GeminiExecutor
+from app.services.prompt_builder import estimate_tokens
+from benchmarks import synthetic_repo
+from benchmarks.fake_gemini import DEFAULT_ANALYSIS, StubGeminiModel
+
+LABEL = re.compile(r"^\s*=== (R\d+): ", re.MULTILINE)
+
+
+class PacedModel:
+    """Delays calls so at most `rpm` start per `window_s`: the bulk job pacing itself to the quota."""
+
+    def __init__(self, model, rpm: int, window_s: float):
+        self.model = model
+        self.rpm = rpm
+        self.window_s = window_s
+        self._starts = deque()
+        self._lock = asyncio.Lock()
+
+    async def generate_content_async(self, prompt, **kwargs):
+        async with self._lock:
+            while len(self._starts) >= self.rpm:
+                wait = self._starts[0] + self.window_s - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait + 0.001)
+                while self._starts and self._starts[0] <= time.monotonic() - self.window_s:
+                    self._starts.popleft()
+            self._starts.append(time.monotonic())
+        return await self.model.generate_content_async(prompt, **kwargs)
+
+
+def make_responder(bad_section_rate: float, seed: int):
+    """Answers a batched prompt with a member per repo (some damaged), a single prompt with one analysis."""
+    rng = random.Random(seed)
+
+    def respond(prompt: str):
+        labels = LABEL.findall(prompt)
+        if not labels:
+            return DEFAULT_ANALYSIS
+        answer = {}
+        for label in labels:
+            section = dict(DEFAULT_ANALYSIS)
+            if rng.random() < bad_section_rate:
+                section["roadmap"] = [{"category": "Architecture"}]  # No title or description
+            answer[label] = section
+        return "```json\n" + json.dumps(answer) + "\n```"
+
+    return respond
+
+
+def make_repos(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    repos = []
+    for n in range(count):
+        shape = rng.choice(synthetic_repo.SHAPES)
+        repo = synthetic_repo.generate(rng.choice([30, 300, 3000]), shape, seed=seed + n)
+        repos.append({"name": f"acme/{shape}-{n}", "readme": repo["readme"], "files": repo["files"],
+                      "base_score": rng.randint(30, 80)})
+    return repos
+
+
+async def run_mode(batched: bool, repos: list, args) -> dict:
+    scale = 60 / args.minute_s  # Real seconds per simulated second
+    stub = StubGeminiModel(
+        latency_ms=args.first_token_ms / scale,
+        chars_per_second=args.chars_per_second * scale,
+        response=make_responder(args.bad_section_rate, args.seed),
+        rpm=args.rpm, window_s=args.minute_s,
+    )
+    ai = AIService()
+    ai.model, ai.cache = PacedModel(stub, args.rpm, args.minute_s), None
+    ai.executor = GeminiExecutor(max_concurrency=args.concurrency)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # AIService prints per call
+        if batched:
+            results = await ai.analyze_code_quality_batch(repos)
+        else:
+            results = await asyncio.gather(*(
+                ai.analyze_code_quality(repo["readme"], repo["files"], repo["base_score"]) for repo in repos
+            ))
+    elapsed = time.perf_counter() - start
+
+    answered = sum(not result.get("is_fallback") for result in results)
+    return {
+        "calls": stub.calls,
+        "batched_calls": sum(bool(LABEL.search(prompt)) for prompt in stub.prompts),
+        "rejected": stub.rejected,
+        "fallbacks": len(results) - answered,
+        "repos_per_minute": answered / (elapsed / args.minute_s),
+        "prompt_tokens_per_repo": sum(estimate_tokens(prompt) for prompt in stub.prompts) / len(repos),
+        "simulated_minutes": elapsed / args.minute_s,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", type=int, default=60)
+    parser.add_argument("--rpm", type=int, default=15, help="Requests per minute the quota allows")
+    parser.add_argument("--minute-s", type=float, default=4, help="Real seconds per simulated minute")
+    parser.add_argument("--first-token-ms", type=float, default=600, help="Simulated latency before the answer")
+    parser.add_argument("--chars-per-second", type=float, default=800, help="Simulated answer generation speed")
+    parser.add_argument("--bad-section-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-repos", type=int, nargs="+", default=[4, 8],
+                        help="GEMINI_BATCH_MAX_REPOS values to try")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    repos = make_repos(args.repos, args.seed)
+    print(f"{args.repos} repos, quota {args.rpm} requests/minute, {args.bad_section_rate:.0%} of batched "
+          f"sections damaged, batch budget {Config.GEMINI_BATCH_TOKEN_BUDGET} tokens "
+          f"({Config.GEMINI_BATCH_REPO_TOKEN_BUDGET} per repo)")
+    print(f"{'mode':<18} {'repos/min':>9} {'calls':>6} {'batched':>8} {'rejected':>9} {'fallbacks':>10} "
+          f"{'tokens/repo':>12} {'minutes':>8}")
+    modes = [("one per repo", False, None)] + [(f"batch of <= {n}", True, n) for n in args.max_repos]
+    for name, batched, max_repos in modes:
+        if max_repos:
+            Config.GEMINI_BATCH_MAX_REPOS = max_repos
+        row = asyncio.run(run_mode(batched, repos, args))
+        print(f"{name:<18} {row['repos_per_minute']:>9.1f} {row['calls']:>6} {row['batched_calls']:>8} "
+              f"{row['rejected']:>9} {row['fallbacks']:>10} {row['prompt_tokens_per_repo']:>12.0f} "
+              f"{row['simulated_minutes']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Gemini calls under a burst: unbounded vs. GeminiExecutor (bounded, then
+bounded with hedging).
+
+A StubGeminiModel stands in for the API: heavy-tailed latency (mostly a
+few hundred ms, a few multi-second stragglers) and a concurrent-request
+quota above which calls are rejected, like the real project limit.
+Requests arrive as Poisson traffic at each --rates value (by default one
+light load and one burst faster than the quota can serve), a share of
+them from signed-in users. Every request goes through
+AIService.analyze_code_quality (response cache off), so a rejected or
+timed-out call costs the caller a fallback answer.
+
+Reported per scenario and lane: end-to-end latency percentiles, fallback
+answers, and model calls made (hedges add calls).
+
+    cd backend
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_gemini_executor --requests 300 --rates 10 40 --quota 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import statistics
+import time
+
+from app.services.ai_service import AIService
+from app.services.gemini_executor import LANES, GeminiExecutor
+from benchmarks.fake_gemini import StubGeminiModel
+
+FILES = ["README.md", "src/main.py"]
+
+
+def heavy_tailed_latency(rng: random.Random, median_ms: float, straggler_share: float):
+    """Log-normal latency around `median_ms`; `straggler_share` of calls take 5-15x longer."""
+    def sample():
+        latency = rng.lognormvariate(0, 0.35) * median_ms
+        if rng.random() < straggler_share:
+            latency *= rng.uniform(5, 15)
+        return latency
+    return sample
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] if ordered else 0
+
+
+async def run_scenario(executor: GeminiExecutor, rate: float, args) -> dict:
+    rng = random.Random(args.seed)
+    model = StubGeminiModel(
+        latency_ms=heavy_tailed_latency(random.Random(args.seed + 1), args.median_ms, args.straggler_share),
+        quota=args.quota,
+    )
+    ai = AIService()
+    ai.model, ai.cache, ai.executor = model, None, executor
+    file_context = ai.describe_files(FILES)
+
+    results = {lane: [] for lane in LANES}
+
+    async def request(n: int, lane: str):
+        start = time.perf_counter()
+        result = await ai.analyze_code_quality(f"# repo {n}", None, 50, file_context=file_context, lane=lane)
+        results[lane].append(((time.perf_counter() - start) * 1000, bool(result.get("is_fallback"))))
+
+    tasks = []
+    with contextlib.redirect_stdout(io.StringIO()):  # AIService prints every error
+        for n in range(args.requests):
+            lane = "user" if rng.random() < args.user_share else "anonymous"
+            tasks.append(asyncio.create_task(request(n, lane)))
+            await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+
+    assert executor.in_flight == 0 and not any(executor._waiters.values()), "executor leaked a slot"
+    return {
+        "lanes": results,
+        "model_calls": model.calls,
+        "rejected": model.rejected,
+        "cancelled": model.cancelled,
+        "max_in_flight": model.max_in_flight,
+        "executor": executor.stats(),
+    }
+
+
+def report(name: str, outcome: dict):
+    executor = outcome["executor"]
+    print(f"\n{name}: {outcome['model_calls']} model calls, {outcome['rejected']} rejected by quota, "
+          f"{outcome['cancelled']} cancelled, max {outcome['max_in_flight']} in flight, "
+          f"{executor['timeouts']} timeouts, {executor['hedges']} hedges ({executor['hedge_wins']} won)")
+    for lane, rows in outcome["lanes"].items():
+        if not rows:
+            continue
+        ok = [ms for ms, fallback in rows if not fallback]
+        fallbacks = len(rows) - len(ok)
+        print(f"  {lane:<10} {len(rows):>5} req  {fallbacks:>5} fallback ({fallbacks / len(rows):>4.0%})  "
+              f"answered p50 {percentile(ok, 50):>7.0f}  p95 {percentile(ok, 95):>7.0f}  "
+              f"p99 {percentile(ok, 99):>7.0f} ms  mean {statistics.fmean(ok) if ok else 0:>7.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 40], help="Mean arrivals per second")
+    parser.add_argument("--user-share", type=float, default=0.2, help="Share of signed-in requests")
+    parser.add_argument("--quota", type=int, default=8, help="Concurrent calls the stub API accepts")
+    parser.add_argument("--median-ms", type=float, default=150)
+    parser.add_argument("--straggler-share", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=5, help="Executor deadline in seconds")
+    parser.add_argument("--reserved", type=int, default=2, help="Slots reserved for signed-in users")
+    parser.add_argument("--hedge-percentile", type=float, default=90)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenarios = {
+        "unbounded": lambda: GeminiExecutor(max_concurrency=10**9),
+        "bounded": lambda: GeminiExecutor(max_concurrency=args.quota, timeout=args.timeout,
+                                          user_reserved=args.reserved),
+        "bounded+hedged": lambda: GeminiExecutor(max_concurrency=args.quota, timeout=args.timeout,
+                                                 user_reserved=args.reserved, hedge_percentile=args.hedge_percentile),
+    }
+    for rate in args.rates:
+        print(f"\n=== {args.requests} requests at {rate}/s ({args.user_share:.0%} signed in), quota {args.quota}, "
+              f"median {args.median_ms} ms with {args.straggler_share:.0%} stragglers")
+        for name, make_executor in scenarios.items():
+            report(name, asyncio.run(run_scenario(make_executor(), rate, args)))
+
+
+if __name__ == "__main__":
+    main()
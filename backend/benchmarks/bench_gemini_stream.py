@@ -0,0 +1,130 @@
+"""
+Gemini answers read as a stream vs. read whole (GEMINI_STREAMING).
+
+1. Time to data: AIService.analyze_code_quality against FakeGemini (the
+   local gRPC stand-in, so the real client library and its streaming
+   call are exercised), the answer taking --latency-ms to generate.
+   Reported: when on_field delivered tech_stack, summary and the first
+   roadmap item, and when the call returned.
+2. Damaged answers: text the model sometimes sends instead of clean JSON
+   (prose around it, trailing commas, an answer cut off mid-roadmap, ...),
+   fed through StubGeminiModel. Reported per case: what the previous
+   fence-strip + json.loads handling kept (all or nothing) and what
+   StreamingJSONParser keeps.
+
+    cd backend
+    python -m benchmarks.bench_gemini_stream --latency-ms 3000 --runs 5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+
+from benchmarks.fake_gemini import DEFAULT_ANALYSIS, FakeGemini, StubGeminiModel
+
+FILES = ["package.json", "src/main.ts"]
+FIELDS = ("tech_stack", "summary", "roadmap")
+
+_ANSWER = json.dumps(DEFAULT_ANALYSIS, indent=2)
+_ROADMAP_AT = _ANSWER.index('"roadmap"')
+DAMAGED = {
+    "clean, fenced": "```json\n" + _ANSWER + "\n```",
+    "prose before and after": "Here is the analysis you asked for:\n" + _ANSWER + "\nHope this helps!",
+    "trailing commas": _ANSWER.replace("}\n  ]", "},\n  ]").replace('"Tailwind"\n', '"Tailwind",\n'),
+    "missing comma": _ANSWER.replace('},\n  "summary"', '}\n  "summary"'),
+    "cut off in the roadmap": _ANSWER[:_ROADMAP_AT + 700],
+    "cut off in the summary": _ANSWER[:_ANSWER.index('"summary"') + 40],
+    "unquoted value": _ANSWER.replace('"quality_bonus": 3', '"quality_bonus": three'),
+    "no JSON": "I'm sorry, I can't analyze this repository.",
+}
+
+
+def legacy_parse(text: str):
+    """The handling before streaming: strip fences, json.loads, all or nothing."""
+    try:
+        return json.loads(text.replace('```json', '').replace('```', '').strip())
+    except ValueError:
+        return None
+
+
+def fields_kept(result) -> list:
+    """The parts of DEFAULT_ANALYSIS a result kept (the roadmap with its item count)."""
+    if not result or result.get("is_fallback"):
+        return []
+    kept = [key for key in ("tech_stack", "summary") if result.get(key) == DEFAULT_ANALYSIS[key]]
+    roadmap = result.get("roadmap") or []
+    if roadmap and roadmap == DEFAULT_ANALYSIS["roadmap"][:len(roadmap)]:
+        kept.append(f"roadmap {len(roadmap)}/{len(DEFAULT_ANALYSIS['roadmap'])}")
+    return kept
+
+
+async def time_to_data(ai, streaming: bool) -> dict:
+    from app.config import Config
+    Config.GEMINI_STREAMING = streaming
+    start = time.perf_counter()
+    seen = {}
+
+    def on_field(key, value):
+        seen.setdefault(key, (time.perf_counter() - start) * 1000)
+
+    # A new README line per call, so every prompt is new
+    await ai.analyze_code_quality(f"# run {start}", FILES, 50, on_field=on_field)
+    seen["done"] = (time.perf_counter() - start) * 1000
+    return seen
+
+
+async def damaged_answers(ai) -> dict:
+    kept = {}
+    for name, text in DAMAGED.items():
+        ai.model = StubGeminiModel(response=text)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await ai.analyze_code_quality(f"# {name}", FILES, 50)
+        kept[name] = {"before": fields_kept(legacy_parse(text)), "now": fields_kept(result),
+                      "partial": bool(result.get("is_partial"))}
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=3000, help="Time Gemini takes to write the whole answer")
+    parser.add_argument("--chunk-chars", type=int, default=120, help="Characters per streamed chunk")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with FakeGemini(latency_ms=args.latency_ms, chunk_chars=args.chunk_chars) as gemini:
+        os.environ.update({"GEMINI_API_KEY": "benchmark", "GEMINI_API_ENDPOINT": gemini.endpoint})
+        with contextlib.redirect_stdout(io.StringIO()):
+            from app.services.ai_service import AIService
+            ai = AIService()
+        ai.cache = None
+
+        async def run_all():
+            timings = {}
+            for streaming in (False, True):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runs = [await time_to_data(ai, streaming) for _ in range(args.runs)]
+                timings[streaming] = {key: statistics.median(run.get(key, float("nan")) for run in runs)
+                                      for key in FIELDS + ("done",)}
+            return timings, await damaged_answers(ai)
+
+        timings, kept = asyncio.run(run_all())
+
+    print(f"Time to data, median of {args.runs} (answer written over {args.latency_ms:.0f} ms, "
+          f"{args.chunk_chars}-char chunks):")
+    print(f"  {'':<10} {'tech_stack':>11} {'summary':>9} {'1st roadmap':>12} {'returned':>9}")
+    for streaming, row in timings.items():
+        print(f"  {'streamed' if streaming else 'whole':<10} {row['tech_stack']:>8.0f} ms {row['summary']:>6.0f} ms "
+              f"{row['roadmap']:>9.0f} ms {row['done']:>6.0f} ms")
+
+    print("\nDamaged answers, parts kept (previous handling -> streaming parser):")
+    for name, row in kept.items():
+        before = ", ".join(row["before"]) or "fallback"
+        now = (", ".join(row["now"]) or "fallback") + (" (partial)" if row["partial"] else "")
+        print(f"  {name:<24} {before:<36} -> {now}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+REST (3 parallel calls) vs. GraphQL (1 query) fetch backends.
+
+Both run against the local fake GitHub server, serving a recorded repository
+snapshot from benchmarks/fixtures/. Reports wall time per fetch and how many
+API calls each backend spends.
+
+    cd backend
+    python -m benchmarks.bench_graphql --runs 50 --latency-ms 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.http_client import create_http_client
+from app.services.github_scheduler import GitHubRateLimiter
+from app.services.github_service import GitHubService
+from benchmarks import fake_github
+from benchmarks.local_server import LocalServer
+
+
+async def _run(base_url, mode, runs, tree_depth, app):
+    client = create_http_client()
+    # GraphQL needs a token; the fake server accepts anything
+    service = GitHubService(
+        client=client, base_url=base_url, cache=None, fetch_mode=mode,
+        rate_limiter=GitHubRateLimiter(["benchmark-token"], reserve=0, max_wait=0),
+    )
+    if tree_depth:
+        service.graphql = type(service.graphql)(service, tree_depth=tree_depth)
+
+    samples = []
+    calls_before = app.state.request_count
+    try:
+        for _ in range(runs):
+            start = time.perf_counter()
+            data = await service.fetch_repo_data("Kartikey1405", "GitGrade")
+            samples.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+
+    calls = (app.state.request_count - calls_before) / runs
+    return samples, calls, data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--fixture", default="gitgrade_repo")
+    args = parser.parse_args()
+
+    fixture = fake_github.load_fixture(args.fixture)
+    app = fake_github.create_app(
+        files=fixture["files"], readme=fixture["readme"], metadata=fixture["metadata"], latency_ms=args.latency_ms
+    )
+
+    with LocalServer(app) as server:
+        base_url = f"{server.url}/repos"
+        results = [
+            ("rest", *asyncio.run(_run(base_url, "rest", args.runs, None, app))),
+            ("graphql", *asyncio.run(_run(base_url, "graphql", args.runs, None, app))),
+            ("graphql (depth 2 -> REST tree)", *asyncio.run(_run(base_url, "graphql", args.runs, 2, app))),
+        ]
+
+    rest_files = results[0][3]["files"]
+    print(f"fixture={args.fixture} ({len(rest_files)} files), latency {args.latency_ms}ms per call, {args.runs} runs")
+    for label, samples, calls, data in results:
+        same = "same files" if list(data["files"]) == list(rest_files) else "FILES DIFFER"
+        print(f"{label:<32} mean={statistics.mean(samples) * 1000:7.2f}ms  "
+              f"p50={statistics.median(samples) * 1000:7.2f}ms  api_calls={calls:.1f}  ({same})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Latency of listing a user's analysis history as it grows: the
+/api/analyze/history endpoint (keyset pagination on the
+ix_analyses_user_history index, full_json_result left out) against the
+naive listing it replaces (whole rows, JSON included, paged with OFFSET),
+without the index (the schema before it) and with it.
+
+For each --sizes N, one user gets N analyses (other users as many again,
+interleaved) with a --json-kb result each. Timed, per page of --limit:
+the first page, and the last page, reached by OFFSET or by following
+next_cursor from the page before it.
+
+Uses a temporary SQLite file.
+
+    cd backend
+    python -m benchmarks.bench_history --sizes 100 1000 10000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.bench_event_loop_stalls import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Analyses in the history")
+    parser.add_argument("--limit", type=int, default=20, help="Page size")
+    parser.add_argument("--json-kb", type=float, default=8, help="Size of each stored full_json_result")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per page")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir.name, 'bench.db')}",
+        "GITHUB_CACHE_PATH": os.path.join(workdir.name, "github_cache.sqlite3"),
+        "GEMINI_API_KEY": "benchmark",
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import jwt
+        from sqlalchemy import insert, select
+        from sqlalchemy.orm import undefer
+        import main as app_main  # Creates the tables
+        from app import database, entity
+        from app.config import Config
+        from app.routers import analyze
+    analyze.analysis_writer = None
+
+    files = [f"src/package_{i // 50}/module_{i}.py" for i in range(int(args.json_kb * 1024 / 32))]
+    full_json = {"details": {"name": "bench", "owner": "acme", "stars": 1, "forks": 0, "open_issues": 0},
+                 "score": 80, "summary": "Synthetic.", "roadmap": [], "file_structure": files}
+
+    with database.SessionLocal() as db:
+        db.add_all([entity.User(email="bench@example.com"), entity.User(email="other@example.com")])
+        db.commit()
+    auth = "Bearer " + jwt.encode({"sub": "bench@example.com"}, Config.JWT_SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
+
+    def seed(start: int, count: int):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        with database.SessionLocal() as db:
+            for chunk in range(start, start + count, 500):
+                rows = [dict(user_id=1 + user, github_url=f"https://github.com/acme/repo-{n % 300}",
+                             repo_name=f"repo-{n % 300}", overall_score=n % 100, summary="Synthetic.",
+                             commit_sha=f"{n:040x}", cache_key=None, full_json_result=full_json,
+                             created_at=base + timedelta(minutes=n))
+                        for n in range(chunk, min(chunk + 500, start + count)) for user in (0, 1)]
+                db.execute(insert(entity.Analysis).values(rows))
+                db.commit()
+
+    async def naive_page(db, offset: int):
+        return (await db.execute(
+            select(entity.Analysis)
+            .options(undefer(entity.Analysis.full_json_result))
+            .where(entity.Analysis.user_id == 1)
+            .order_by(entity.Analysis.created_at.desc())
+            .offset(offset).limit(args.limit)
+        )).scalars().all()
+
+    async def keyset_page(db, cursor):
+        return await analyze.list_history(limit=args.limit, cursor=cursor, repo=None, min_score=None,
+                                          max_score=None, db=db, authorization=auth)
+
+    async def timed(page):
+        samples = []
+        for _ in range(args.repeat):
+            async with database.AsyncSessionLocal() as db:
+                start = time.perf_counter()
+                await page(db)
+                samples.append((time.perf_counter() - start) * 1000)
+        return percentile(samples, 50)
+
+    history_index = next(ix for ix in entity.Analysis.__table__.indexes if ix.name == "ix_analyses_user_history")
+
+    async def run(size: int):
+        last_offset = (size - 1) // args.limit * args.limit
+        results = {}
+        history_index.drop(bind=database.engine)
+        results["no index first"] = await timed(lambda db: naive_page(db, 0))
+        results["no index last"] = await timed(lambda db: naive_page(db, last_offset))
+        history_index.create(bind=database.engine)
+        results["offset first"] = await timed(lambda db: naive_page(db, 0))
+        results["offset last"] = await timed(lambda db: naive_page(db, last_offset))
+        cursor = None
+        async with database.AsyncSessionLocal() as db:
+            for _ in range(last_offset // args.limit):  # Walk to the last page, as a client would
+                cursor = (await keyset_page(db, cursor)).next_cursor
+        results["keyset first"] = await timed(lambda db: keyset_page(db, None))
+        results["keyset last"] = await timed(lambda db: keyset_page(db, cursor))
+        await database.async_engine.dispose()  # Pooled connections belong to this loop
+        return results
+
+    columns = ("no index first", "no index last", "offset first", "offset last", "keyset first", "keyset last")
+    print(f"History listing, {args.limit} per page, {args.json_kb:.0f} KB result per analysis (p50 ms)")
+    print(f"{'analyses':>9} " + " ".join(f"{k:>{len(k)}}" for k in columns))
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed(seeded, size - seeded)
+        seeded = size
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(run(size))
+        print(f"{size:>9} " + " ".join(f"{results[k]:>{len(k)}.2f}" for k in results))
+
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
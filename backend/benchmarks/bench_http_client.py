@@ -0,0 +1,76 @@
+"""
+Pooled vs. per-request HTTP client for GitHubService.fetch_repo_data.
+
+Runs against a local fake GitHub server (benchmarks/fake_github.py) over TLS,
+so every fresh client pays a real TCP + TLS handshake, just like production.
+
+    cd backend
+    python -m benchmarks.bench_http_client --runs 200 --latency-ms 5
+"""
+import argparse
+import asyncio
+import ssl
+import statistics
+import time
+
+import httpx
+
+from app.http_client import create_http_client
+from app.services.github_service import GitHubService
+from benchmarks import fake_github
+from benchmarks.local_server import LocalServer
+
+
+def _summary(label, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2]
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} p50={p50 * 1000:7.2f}ms  p95={p95 * 1000:7.2f}ms  mean={statistics.mean(samples) * 1000:7.2f}ms")
+
+
+async def _run_fresh_client(base_url, ssl_ctx, runs):
+    # Old behaviour: a brand-new AsyncClient for every analysis
+    samples = []
+    for i in range(runs):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(verify=ssl_ctx) as client:
+            await GitHubService(client=client, base_url=base_url, cache=None).fetch_repo_data("bench", f"repo{i}")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _run_pooled_client(base_url, ssl_ctx, runs):
+    samples = []
+    client = create_http_client(verify=ssl_ctx)
+    service = GitHubService(client=client, base_url=base_url, cache=None)
+    try:
+        for i in range(runs):
+            start = time.perf_counter()
+            await service.fetch_repo_data("bench", f"repo{i}")
+            samples.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    app = fake_github.create_app(latency_ms=args.latency_ms)
+    with LocalServer(app, tls=True) as server:
+        ssl_ctx = ssl.create_default_context(cafile=server.cert_path)
+        base_url = f"{server.url}/repos"
+
+        fresh = asyncio.run(_run_fresh_client(base_url, ssl_ctx, args.runs))
+        pooled = asyncio.run(_run_pooled_client(base_url, ssl_ctx, args.runs))
+
+    print(f"fetch_repo_data x{args.runs} (latency {args.latency_ms}ms per call)")
+    _summary("new client per analysis", fresh)
+    _summary("pooled keep-alive client", pooled)
+
+
+if __name__ == "__main__":
+    main()
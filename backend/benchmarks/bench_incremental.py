@@ -0,0 +1,142 @@
+"""
+Re-analysis after a push: full tree download vs. incremental rescoring from
+the compare API (IncrementalScorer).
+
+First checks parity offline: for random trees and random series of commits
+(adds, removes, renames), the score, the prompt's file inputs and
+file_structure computed from the updated counters must equal the ones
+computed from the full new tree.
+
+Then, against the fake GitHub server, it pushes a small commit to a large
+repo and times both ways of getting the new score and prompt inputs.
+
+    cd backend
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_incremental --sizes 1000 10000 50000 --latency-ms 30
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.ai_service import AIService
+from app.services.github_service import GitHubService
+from app.services.incremental_scoring import IncrementalScorer
+from app.services.scoring_service import ScoringService
+from benchmarks import fake_github
+from benchmarks.bench_scoring import RULE_PATTERNS, TRICKY, random_inputs, random_tree
+from benchmarks.bench_snapshot import realistic_tree
+from benchmarks.local_server import LocalServer
+
+STATS = {"entries": 1, "skipped_too_deep": 0}  # tree_stats of a complete listing
+
+
+class _Row:
+    """Stand-in for a RepoState row."""
+
+    def __init__(self, commit_sha: str, feature_state: dict):
+        self.commit_sha = commit_sha
+        self.feature_state = feature_state
+
+
+def random_commit(rng: random.Random, files: list, size: int):
+    """A new sorted file list plus its (added, removed) paths."""
+    current = set(files)
+    removed = rng.sample(files, min(len(files), rng.randint(0, size)))
+    current.difference_update(removed)
+    added = []
+    for path in random_tree(rng, rng.randint(0, size), noise=0.3):
+        if rng.random() < 0.2:
+            path = rng.choice(RULE_PATTERNS + TRICKY).rstrip("/")
+        if rng.random() < 0.3:
+            path = "a" + path  # Early in tree order, where the samples are
+        if path not in current:
+            current.add(path)
+            added.append(path)
+    return sorted(current), added, removed
+
+
+def expected(scoring, ai, metadata, files, readme):
+    return (
+        scoring.calculate_score(metadata, files, readme),
+        ai.describe_files(files),
+        files[:IncrementalScorer.FILE_STRUCTURE_LIMIT],
+    )
+
+
+def check_parity(cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    scorer = IncrementalScorer(github_service=object(), scoring_service=ScoringService(), ai_service=AIService())
+    scoring, ai = scorer.scoring, scorer.ai
+    checked = 0
+    for _ in range(cases):
+        metadata, files, readme = random_inputs(rng, rng.choice([0, 1, 2, 5, 20, 200, 2000]))
+        files = sorted(set(files))
+        state = scorer.build_state(files, STATS)
+        for _ in range(rng.randint(1, 5)):
+            files, added, removed = random_commit(rng, files, rng.choice([1, 5, 50]))
+            state = scorer.apply_changes(state, added, removed)
+            if state is None:
+                state = scorer.build_state(files, STATS)  # Sample ran out: the router downloads the tree
+                continue
+            got = (
+                scoring.score_from_counts(metadata, state["scoring"], readme),
+                scorer.file_context(state),
+                scorer.file_structure(state),
+            )
+            assert got == expected(scoring, ai, metadata, files, readme), f"Mismatch after +{added} -{removed}"
+            checked += 1
+    return checked
+
+
+async def _timed(coro):
+    start = time.perf_counter()
+    value = await coro
+    return value, (time.perf_counter() - start) * 1000
+
+
+async def compare_fetches(sizes: list, latency_ms: float, seed: int):
+    scoring, ai = ScoringService(), AIService()
+    print(f"{'paths':>8} {'full ms':>8} {'incremental ms':>15} {'speedup':>8}")
+    for size in sizes:
+        files = realistic_tree(random.Random(seed), size)
+        app = fake_github.create_app(files=files, latency_ms=latency_ms)
+        with LocalServer(app) as server:
+            github = GitHubService(base_url=server.url + "/repos", cache=None)
+            scorer = IncrementalScorer(github, scoring, ai)
+
+            # First analysis: full download, counters stored
+            head = await github.fetch_head_sha("acme", "big")
+            data = await github.fetch_repo_data("acme", "big")
+            row = _Row(head, scorer.build_state(data["files"], data["tree_stats"]))
+
+            # Push: a few files move, a few are added
+            app.state.files, _, _ = random_commit(random.Random(seed + 1), app.state.files, 10)
+            head = await github.fetch_head_sha("acme", "big")
+
+            full, full_ms = await _timed(github.fetch_repo_data("acme", "big"))
+            full_result = expected(scoring, ai, full["metadata"], full["files"], full["readme"])
+            incremental, incremental_ms = await _timed(scorer.fetch_repo_data("acme", "big", row, head))
+            state = incremental["state"]
+            incremental_result = (
+                scoring.score_from_counts(incremental["metadata"], state["scoring"], incremental["readme"]),
+                scorer.file_context(state),
+                scorer.file_structure(state),
+            )
+            assert incremental_result == full_result, f"Incremental result differs at {size} paths"
+            print(f"{size:>8} {full_ms:>8.1f} {incremental_ms:>15.1f} {full_ms / incremental_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--parity-cases", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Parity: {check_parity(args.parity_cases, args.seed)} incremental updates identical to a full rescan")
+    asyncio.run(compare_fetches(args.sizes, args.latency_ms, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+The analysis job queue (JobQueue + JobWorkerPool) under load.
+
+--jobs jobs are enqueued and run by --pools worker pools (standing in for
+processes sharing the database) of each --workers size. The handler just
+waits --job-ms, like an analysis waiting on GitHub and Gemini, so what's
+measured is the queue: throughput against worker count, and claim
+overhead. Every run checks that each job ran exactly once.
+
+The restart run stops the pools halfway (their running jobs go back to
+the queue), starts new ones, and checks that every job still completes,
+none twice.
+
+Uses a temporary SQLite file unless DATABASE_URL is set (e.g. Postgres,
+where claims use FOR UPDATE SKIP LOCKED).
+
+    cd backend
+    python -m benchmarks.bench_job_queue --jobs 200 --job-ms 100 --workers 1 4 16
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from collections import Counter
+
+_tmpdir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir.name, 'jobs.db')}")
+
+from app import entity  # noqa: E402
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine  # noqa: E402
+from app.services.job_queue import JobQueue, JobWorkerPool  # noqa: E402
+
+entity.Base.metadata.create_all(bind=engine)
+
+
+def reset():
+    db = SessionLocal()
+    db.query(entity.AnalysisJob).delete()
+    db.commit()
+    db.close()
+
+
+async def enqueue(queue: JobQueue, count: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return [(await queue.enqueue(db, f"https://github.com/bench/repo-{n}")).id for n in range(count)]
+
+
+async def run(queue: JobQueue, jobs: int, pools: int, workers: int, job_ms: float, restart_after: int = None):
+    ids = await enqueue(queue, jobs)
+    runs = Counter()  # Job id -> completed runs (a run stopped by the restart isn't counted)
+
+    async def handler(job):
+        await asyncio.sleep(job_ms / 1000)
+        runs[job["id"]] += 1
+        return {"ok": True}
+
+    def start():
+        return [JobWorkerPool(queue, handler, workers=workers, poll_interval=0.05).start() for _ in range(pools)]
+
+    start_time = time.perf_counter()
+    running = start()
+    if restart_after:
+        while sum(runs.values()) < restart_after:
+            await asyncio.sleep(0.005)
+        for pool in running:
+            await pool.stop()
+        running = start()
+    while queue.completed < len(ids):
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start_time
+    for pool in running:
+        await pool.stop()
+    await async_engine.dispose()  # Its connections belong to this run's event loop
+    return elapsed, ids, runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--job-ms", type=float, default=100, help="How long each job takes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16], help="Workers per pool to try")
+    parser.add_argument("--pools", type=int, default=2, help="Worker pools (processes) sharing the queue")
+    args = parser.parse_args()
+
+    print(f"{args.jobs} jobs of {args.job_ms:.0f} ms, {args.pools} pools, database {engine.url.get_backend_name()}")
+    print(f"{'run':<22} {'jobs/s':>8} {'ideal':>8} {'overhead ms/job':>16} {'ran twice':>10} {'missing':>8}")
+    cases = [(f"{args.pools} x {w} workers", w, None) for w in args.workers]
+    cases.append((f"restart, {args.pools} x {args.workers[-1]}", args.workers[-1], args.jobs // 2))
+    for name, workers, restart_after in cases:
+        reset()
+        queue = JobQueue(lease_seconds=30, max_attempts=3, max_queued=args.jobs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed, ids, runs = asyncio.run(run(queue, args.jobs, args.pools, workers, args.job_ms, restart_after))
+        slots = args.pools * workers
+        ideal = slots / (args.job_ms / 1000)
+        overhead = (elapsed * slots / args.jobs - args.job_ms / 1000) * 1000
+        twice = sum(count > 1 for count in runs.values())
+        missing = sum(job_id not in runs for job_id in ids)
+        print(f"{name:<22} {args.jobs / elapsed:>8.1f} {ideal:>8.1f} {max(0, overhead):>16.2f} {twice:>10} {missing:>8}")
+
+
+if __name__ == "__main__":
+    main()
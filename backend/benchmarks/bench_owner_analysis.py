@@ -0,0 +1,106 @@
+"""
+Auditing a whole GitHub owner: one POST /api/analyze/ per repository, one
+after the other (the way it had to be done), vs. one POST
+/api/analyze/owner streaming NDJSON.
+
+The app runs under uvicorn on a local port, against fake_github (with
+--owner-repos repositories, --github-latency-ms per call) and an
+in-process StubGeminiModel that takes --gemini-ms per answer plus time
+per character written, so batched prompts cost what their longer answers
+cost. The serial run only times --serial-sample repos and extrapolates.
+
+Reported: wall time for the owner, time to the first streamed repo,
+Gemini calls and GitHub requests.
+
+    cd backend
+    python -m benchmarks.bench_owner_analysis --owner-repos 300 --gemini-ms 2000
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks import fake_github
+from benchmarks.local_server import LocalServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--owner-repos", type=int, default=300)
+    parser.add_argument("--github-latency-ms", type=float, default=50)
+    parser.add_argument("--gemini-ms", type=float, default=2000, help="Gemini latency before the answer")
+    parser.add_argument("--chars-per-second", type=float, default=4000, help="Gemini answer generation speed")
+    parser.add_argument("--serial-sample", type=int, default=5, help="Repos timed one by one (then extrapolated)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8], help="BULK_CONCURRENCY values to try")
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    github_app = fake_github.create_app(latency_ms=args.github_latency_ms)
+    github_app.state.owner_repos = args.owner_repos
+    github = LocalServer(github_app).__enter__()
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir.name, 'bench.db')}",
+        "GITHUB_CACHE_PATH": os.path.join(workdir.name, "github_cache.sqlite3"),
+        "GITHUB_API_URL": github.url,
+        "GITHUB_TOKEN": "benchmark",  # 5,000 calls an hour; anonymous, a 100-repo owner is over quota
+        "GEMINI_API_KEY": "benchmark",
+        "JOBS_ENABLED": "false",
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        import httpx
+        import main as app_main
+        from app.config import Config
+        from app.routers import analyze
+        from benchmarks.bench_gemini_batch import make_responder
+        from benchmarks.fake_gemini import StubGeminiModel
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    stub = StubGeminiModel(latency_ms=args.gemini_ms, chars_per_second=args.chars_per_second,
+                           response=make_responder(0, 0))
+    analyze.ai_service.model = stub
+    analyze.ai_service.cache = None
+
+    # fake_github makes every 10th repo a fork and every 25th archived; the endpoint leaves both out
+    listed = [n for n in range(args.owner_repos) if n % 10 != 9 and n % 25 != 24]
+    print(f"Owner with {args.owner_repos} repos ({len(listed)} after leaving out forks and archived), GitHub {args.github_latency_ms:.0f} ms, Gemini {args.gemini_ms:.0f} ms + answer length")
+    print(f"{'run':<28} {'owner total s':>14} {'first repo s':>13} {'gemini calls':>13} {'github requests':>16}")
+    with LocalServer(app_main.app) as app_server, httpx.Client(base_url=app_server.url, timeout=3600) as client:
+        owner = "acme0"  # A new owner per run, so no run is served from the previous one's cache
+        calls, requests = stub.calls, github_app.state.request_count
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n in listed[:args.serial_sample]:
+                client.post("/api/analyze/", json={"github_url": f"https://github.com/{owner}/{owner}-{n}"})
+        per_repo = (time.perf_counter() - start) / args.serial_sample
+        print(f"{'serial /api/analyze/':<28} {per_repo * len(listed):>14.1f} {per_repo:>13.1f} "
+              f"{(stub.calls - calls) / args.serial_sample * len(listed):>13.0f} "
+              f"{(github_app.state.request_count - requests) / args.serial_sample * len(listed):>16.0f}  (extrapolated)")
+
+        for run, concurrency in enumerate(args.concurrency, start=1):
+            Config.BULK_CONCURRENCY = concurrency
+            owner = f"acme{run}"
+            calls, requests = stub.calls, github_app.state.request_count
+            start = time.perf_counter()
+            first = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                with client.stream("POST", "/api/analyze/owner", json={"owner": owner}) as resp:
+                    for line in resp.iter_lines():
+                        event = json.loads(line)
+                        if event["event"] == "repo" and first is None:
+                            first = time.perf_counter() - start
+                        summary = event["data"]
+            total = time.perf_counter() - start
+            print(f"{f'/api/analyze/owner, {concurrency} at once':<28} {total:>14.1f} {first or 0:>13.1f} "
+                  f"{stub.calls - calls:>13} {github_app.state.request_count - requests:>16}  "
+                  f"({summary['analyzed']} analyzed, {summary['failed']} failed)")
+
+    github.__exit__(None, None, None)
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
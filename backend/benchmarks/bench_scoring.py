@@ -0,0 +1,151 @@
+"""
+Path feature extraction in ScoringService.calculate_score: the compiled
+extractor vs. the original rule-by-rule scans.
+
+Times both across tree sizes. That they give the same scores is checked
+by tests/test_scoring_parity.py, which uses legacy_calculate_score and
+the random trees below.
+
+    cd backend
+    python -m benchmarks.bench_scoring --sizes 1000 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.services.scoring_service import PATH_RULES, ScoringService
+
+
+def legacy_calculate_score(metadata, files, readme_content):
+    """calculate_score as it was before the compiled extractor (v3.0 rules)."""
+    score = 0
+    repo_files = set(files)
+    all_files_str = " ".join(files)
+    readme_lower = readme_content.lower() if readme_content else ""
+
+    if len(files) < 2:
+        return 10
+
+    root_file_count = sum(1 for f in files if "/" not in f)
+    if root_file_count < 15:
+        score += 5
+
+    penalty = 0
+    garbage_files = ['.DS_Store', 'Thumbs.db', '__pycache__', 'node_modules', '.env', 'venv']
+    for junk in garbage_files:
+        if any(junk in f for f in files):
+            penalty += 5
+    score = max(0, score - penalty)
+
+    structure_folders = ['src/', 'app/', 'lib/', 'components/', 'pages/', 'public/', 'server/', 'client/']
+    if any(folder in all_files_str for folder in structure_folders):
+        score += 15
+    elif len(files) > 3:
+        score += 5
+
+    if readme_content:
+        if len(readme_content) > 1000: score += 5
+        elif len(readme_content) > 300: score += 2
+        setup_keywords = ['npm install', 'pip install', 'setup', 'getting started', 'run the app', 'docker run', 'mvn install', './mvnw']
+        if any(k in readme_lower for k in setup_keywords):
+            score += 10
+        if '![' in readme_content or '<img' in readme_lower:
+            score += 5
+
+    if '.gitignore' in repo_files or '.gitignore' in all_files_str:
+        score += 10
+
+    lock_files = ['package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Pipfile.lock', 'go.sum', 'Cargo.lock', 'pom.xml', 'build.gradle']
+    if any(f in all_files_str for f in lock_files):
+        score += 10
+
+    test_indicators = ['test', 'tests', '__tests__', 'spec', 'pytest.ini']
+    if any(t in all_files_str for t in test_indicators):
+        score += 15
+
+    if '.github' in all_files_str or '.travis.yml' in all_files_str or 'circleci' in all_files_str:
+        score += 5
+
+    last_push = metadata.get('pushed_at')
+    if last_push:
+        try:
+            push_date = datetime.strptime(last_push, "%Y-%m-%dT%H:%M:%SZ")
+            days_inactive = (datetime.now() - push_date).days
+            if days_inactive < 30: score += 10
+            elif days_inactive < 90: score += 5
+        except:
+            score += 5
+
+    if metadata.get('license') is not None or 'LICENSE' in all_files_str:
+        score += 5
+    if metadata.get('description') and len(metadata['description']) > 10:
+        score += 5
+
+    return max(0, min(100, score))
+
+
+WORDS = ["src", "app", "lib", "core", "utils", "models", "docs", "assets", "api", "internal", "pkg", "cmd", "web"]
+EXTS = [".py", ".ts", ".js", ".go", ".java", ".md", ".json", ".css", ".yml"]
+RULE_PATTERNS = sorted({p for patterns in PATH_RULES.values() for p in patterns})
+# Patterns that overlap each other or sit across separators
+TRICKY = ["specircleci", "contest", "xsrc/", "src", "my src/a", ".environment", ".venv", "LICENSE.md",
+          "license", "Test", "app", "a b/c d", "pages", ".github/workflows/ci.yml", "x.gitignore"]
+
+
+def random_tree(rng: random.Random, size: int, noise: float) -> list:
+    files = []
+    for i in range(size):
+        parts = [rng.choice(WORDS) + ("" if rng.random() < 0.7 else str(rng.randint(0, 9)))
+                 for _ in range(rng.randint(0, 5))]
+        name = f"file{i}{rng.choice(EXTS)}"
+        if rng.random() < noise:
+            name = rng.choice(RULE_PATTERNS + TRICKY) + ("" if rng.random() < 0.5 else name)
+        if parts and rng.random() < noise:
+            parts[rng.randrange(len(parts))] = rng.choice(RULE_PATTERNS + TRICKY).rstrip("/")
+        files.append("/".join(parts + [name]))
+    return files
+
+
+def random_inputs(rng: random.Random, size: int):
+    now = datetime.now()
+    metadata = {
+        "pushed_at": rng.choice([None, "garbage", (now - timedelta(days=rng.randint(0, 400))).strftime("%Y-%m-%dT%H:%M:%SZ")]),
+        "license": rng.choice([None, {"key": "mit"}]),
+        "description": rng.choice([None, "", "short", "A much longer description"]),
+    }
+    readme = rng.choice(["", "# Title", "Run `pip install -r requirements.txt` ![shot](a.png) " * rng.randint(1, 40)])
+    return metadata, random_tree(rng, size, noise=rng.choice([0.0, 0.001, 0.02, 0.3])), readme
+
+
+def _time(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    service = ScoringService()
+    rng = random.Random(args.seed)
+    metadata = {"pushed_at": None, "license": None, "description": "benchmark repository"}
+    print(f"{'paths':>10} {'legacy ms':>10} {'compiled ms':>12} {'speedup':>8}")
+    for size in args.sizes:
+        files = random_tree(rng, size, noise=0.0)  # No rule hits: every pattern is a full scan
+        legacy = _time(lambda: legacy_calculate_score(metadata, files, ""), args.runs)
+        compiled = _time(lambda: service.calculate_score(metadata, files, ""), args.runs)
+        assert legacy_calculate_score(metadata, files, "") == service.calculate_score(metadata, files, "")
+        print(f"{size:>10} {legacy:>10.2f} {compiled:>12.2f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
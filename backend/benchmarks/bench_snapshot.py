@@ -0,0 +1,111 @@
+"""
+Plain path list vs. RepoSnapshot for the per-analysis file work.
+
+For each tree size this measures:
+- memory held by the file list (tracemalloc)
+- CPU for the file work of one analysis: scoring, the Gemini prompt's
+  file section and the file_structure slice. "list" is the code as it was
+  before RepoSnapshot; "snapshot" is the current ScoringService/AIService.
+
+It also checks that both give the same score and slice, and that the
+current prompt inputs are the same from a list and from a RepoSnapshot.
+(The prompt's file section itself changed with PromptBuilder, so it isn't
+compared with the old one.)
+
+    cd backend
+    DATABASE_URL=sqlite:// python -m benchmarks.bench_snapshot --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from app.services.ai_service import AIService
+from app.services.repo_snapshot import RepoSnapshot
+from app.services.scoring_service import ScoringService
+from benchmarks.bench_scoring import legacy_calculate_score
+
+WORDS = ["src", "app", "lib", "core", "utils", "models", "views", "docs", "assets", "api", "internal",
+         "pkg", "cmd", "web", "components", "hooks", "services", "handlers", "config", "scripts"]
+EXTS = [".py", ".ts", ".tsx", ".js", ".go", ".java", ".md", ".json", ".css", ".yml"]
+
+# AIService's prompt file filter before PromptBuilder
+LEGACY_PRIORITY_FILES = [
+    'package.json', 'pom.xml', 'build.gradle', 'requirements.txt',
+    'Dockerfile', 'docker-compose.yml', 'vite.config', 'next.config',
+    'tsconfig.json', 'go.mod', 'Cargo.toml', 'App.tsx', 'main.py',
+    'tailwind.config.js', '.github/workflows'
+]
+
+
+def realistic_tree(rng: random.Random, size: int, files_per_dir: int = 12) -> list:
+    """About `files_per_dir` files per directory; directories nest up to 8 deep."""
+    dirs = [""]
+    for _ in range(max(1, size // files_per_dir)):
+        parent = rng.choice(dirs)
+        if parent.count("/") < 8:
+            dirs.append(f"{parent}{rng.choice(WORDS)}{rng.randint(0, 20)}/")
+    files = [f"{rng.choice(dirs)}{rng.choice(WORDS)}_{i}{rng.choice(EXTS)}" for i in range(size)]
+    files.sort()  # GitHub lists trees in path order
+    return files
+
+
+def legacy_describe_files(files):
+    """AIService's file handling before RepoSnapshot."""
+    all_files = " ".join(files)
+    is_monorepo = "backend/" in all_files and "frontend/" in all_files
+    has_gitignore = ".gitignore" in all_files
+    important_files = [
+        f for f in files
+        if any(k in f for k in LEGACY_PRIORITY_FILES) or f.count('/') <= 2
+    ]
+    return is_monorepo, has_gitignore, "\n".join(important_files[:80])
+
+
+def _held_bytes(build):
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scoring = ScoringService()
+    ai = AIService()
+    metadata = {"description": "benchmark repository"}
+
+    print(f"{'paths':>8} {'list MB':>8} {'snapshot MB':>12} {'list ms':>8} {'snapshot ms':>12}")
+    for size in args.sizes:
+        paths = realistic_tree(random.Random(args.seed), size)
+        # Fresh string copies, the way they come out of the JSON decoder
+        files, list_bytes = _held_bytes(lambda: [p.encode().decode() for p in paths])
+        snapshot, snapshot_bytes = _held_bytes(lambda: RepoSnapshot(paths))
+
+        legacy, list_ms = _timed(lambda: (
+            legacy_calculate_score(metadata, files, "# Readme"), legacy_describe_files(files), files[:50]
+        ))
+        current, snapshot_ms = _timed(lambda: (
+            scoring.calculate_score(metadata, snapshot, "# Readme"), ai.describe_files(snapshot), snapshot[:50]
+        ))
+
+        assert (legacy[0], legacy[2]) == (current[0], current[2]), f"List and snapshot results differ at {size} paths"
+        assert ai.describe_files(files) == current[1], f"Prompt inputs differ at {size} paths"
+        assert list(snapshot) == paths
+        mb = 1024 * 1024
+        print(f"{size:>8} {list_bytes / mb:>8.1f} {snapshot_bytes / mb:>12.1f} {list_ms:>8.1f} {snapshot_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
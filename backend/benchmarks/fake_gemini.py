@@ -0,0 +1,250 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+from google.ai.generativelanguage_v1beta.types import (
+    Candidate, Content, GenerateContentRequest, GenerateContentResponse, Part,
+)
+
+from benchmarks.local_server import make_self_signed_cert
+
+SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+DEFAULT_ANALYSIS = {
+    "tech_stack": {
+        "frontend": ["React", "Vite", "Tailwind"],
+        "backend": ["FastAPI", "SQLAlchemy"],
+        "infrastructure": ["Docker", "GitHub Actions"],
+    },
+    "summary": "A synthetic analysis returned by the local Gemini stand-in. "
+               "The layout is clear and the services are separated.",
+    "roadmap": [
+        {"title": f"Improvement {i}", "description": "Describe how to do it. " * 6, "category": "Architecture"}
+        for i in range(1, 7)
+    ],
+    "quality_bonus": 3,
+}
+
+
+def answer_text(response, prompt: str = "") -> str:
+    """
+    The model's text for `response`: a dict as fenced JSON, a str as is,
+    a callable called with the prompt (returning either).
+    """
+    if callable(response):
+        response = response(prompt)
+    if isinstance(response, str):
+        return response
+    return "```json\n" + json.dumps(response) + "\n```"
+
+
+class FakeGemini:
+    """
+    A local stand-in for the Gemini API: the GenerativeService gRPC endpoint
+    that google-generativeai's generate_content_async calls.
+
+    It listens with TLS on 127.0.0.1 using a throwaway certificate, and
+    points gRPC's root certificates at it (GRPC_DEFAULT_SSL_ROOTS_FILE_PATH).
+    That setting is process-wide and read once, so start FakeGemini before
+    anything opens a gRPC channel and don't call the real API from the
+    same process.
+
+    Point AIService at it with GEMINI_API_ENDPOINT=<endpoint>. Every call
+    answers `response` (a dict, sent as JSON text wrapped in a ```json
+    fence like the real model often does; a str is sent as is) after
+    `latency_ms`. Streamed calls (StreamGenerateContent) get the text in
+    `chunk_chars` pieces spread evenly over that time, the way the model
+    generates it.
+    `prompt_chars` records the size of every prompt received.
+
+        with FakeGemini(latency_ms=800) as gemini:
+            os.environ["GEMINI_API_ENDPOINT"] = gemini.endpoint
+    """
+
+    def __init__(self, latency_ms: float = 0, response=None, chunk_chars: int = 120, max_workers: int = 64):
+        self.latency_ms = latency_ms
+        self.response = DEFAULT_ANALYSIS if response is None else response
+        self.chunk_chars = chunk_chars
+        self.max_workers = max_workers
+        self.prompt_chars = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._tmpdir = None
+        self.endpoint = None
+
+    @property
+    def request_count(self) -> int:
+        return len(self.prompt_chars)
+
+    def _answer(self, request: GenerateContentRequest) -> str:
+        prompt = "".join(part.text for content in request.contents for part in content.parts)
+        with self._lock:
+            self.prompt_chars.append(len(prompt))
+        return answer_text(self.response, prompt)
+
+    @staticmethod
+    def _chunk(text: str, prompt_chars: int, finished: bool = True) -> GenerateContentResponse:
+        return GenerateContentResponse(candidates=[
+            Candidate(content=Content(parts=[Part(text=text)], role="model"),
+                      finish_reason=Candidate.FinishReason.STOP if finished else None)
+        ], usage_metadata=GenerateContentResponse.UsageMetadata(
+            prompt_token_count=prompt_chars // 4,  # Rough; the real API counts with its tokenizer
+            candidates_token_count=len(text) // 4,
+        ))
+
+    def _generate_content(self, request: GenerateContentRequest, context) -> GenerateContentResponse:
+        text = self._answer(request)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._chunk(text, self.prompt_chars[-1])
+
+    def _stream_generate_content(self, request: GenerateContentRequest, context):
+        text = self._answer(request)
+        prompt_chars = self.prompt_chars[-1]
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        for n, piece in enumerate(pieces):
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000 / len(pieces))
+            yield self._chunk(piece, prompt_chars, finished=n == len(pieces) - 1)
+
+    def __enter__(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        cert_path, key_path = make_self_signed_cert(self._tmpdir.name)
+        os.environ["GRPC_DEFAULT_SSL_ROOTS_FILE_PATH"] = cert_path
+
+        handler = grpc.method_handlers_generic_handler(SERVICE, {
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(
+                self._generate_content,
+                request_deserializer=GenerateContentRequest.deserialize,
+                response_serializer=GenerateContentResponse.serialize,
+            ),
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+                self._stream_generate_content,
+                request_deserializer=GenerateContentRequest.deserialize,
+                response_serializer=GenerateContentResponse.serialize,
+            ),
+        })
+        self._server = grpc.server(ThreadPoolExecutor(max_workers=self.max_workers))
+        self._server.add_generic_rpc_handlers((handler,))
+        with open(key_path, "rb") as key, open(cert_path, "rb") as cert:
+            credentials = grpc.ssl_server_credentials([(key.read(), cert.read())])
+        port = self._server.add_secure_port("127.0.0.1:0", credentials)
+        self._server.start()
+        self.endpoint = f"localhost:{port}"
+        return self
+
+    def __exit__(self, *exc):
+        self._server.stop(grace=None)
+        self._tmpdir.cleanup()
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StubStream:
+    """What generate_content_async(stream=True) returns: chunks to iterate with async for."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._chunks
+
+
+class StubGeminiModel:
+    """
+    An in-process stand-in for genai.GenerativeModel: no network, no gRPC.
+    Use it for tests of the code around the model (AIService, the executor)
+    rather than the client library itself:
+
+        ai = AIService()
+        ai.model = StubGeminiModel(latency_ms=lambda: random.expovariate(1 / 300))
+
+    `latency_ms` is a number or a callable returning one per call, so
+    latency distributions (heavy tails, outliers) can be injected. With
+    stream=True the answer comes in `chunk_chars` pieces spread over it.
+    `chars_per_second` adds generation time for the answer's length on top.
+    `error_rate` makes that share of calls raise (like a quota error), and
+    calls beyond `quota` concurrent ones, or beyond `rpm` started within any
+    `window_s` seconds, are rejected at once the way the API rejects
+    traffic over a project's limits.
+    Counts calls, rejections, cancelled calls and the highest concurrency
+    seen, and records every prompt.
+    """
+
+    def __init__(self, latency_ms=0, response=None, error_rate: float = 0, quota: int = None,
+                 seed: int = 0, chunk_chars: int = 120, chars_per_second: float = None,
+                 rpm: int = None, window_s: float = 60):
+        self.latency_ms = latency_ms
+        self.response = DEFAULT_ANALYSIS if response is None else response
+        self.chunk_chars = chunk_chars
+        self.chars_per_second = chars_per_second
+        self.error_rate = error_rate
+        self.quota = quota
+        self.rpm = rpm
+        self.window_s = window_s
+        self._rng = random.Random(seed)
+        self._starts = deque()
+        self.prompts = []
+        self.calls = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        self.calls += 1
+        self.prompts.append(prompt)
+        if self.quota is not None and self.in_flight >= self.quota:
+            self.rejected += 1
+            raise RuntimeError("429 Quota exceeded for concurrent requests (stub)")
+        if self.rpm is not None:
+            now = time.monotonic()
+            while self._starts and self._starts[0] <= now - self.window_s:
+                self._starts.popleft()
+            if len(self._starts) >= self.rpm:
+                self.rejected += 1
+                raise RuntimeError("429 Quota exceeded for requests per minute (stub)")
+            self._starts.append(now)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        latency = self.latency_ms() if callable(self.latency_ms) else self.latency_ms
+        failed = bool(self.error_rate) and self._rng.random() < self.error_rate
+        text = answer_text(self.response, prompt)
+        if self.chars_per_second:
+            latency += len(text) / self.chars_per_second * 1000
+        if stream:
+            return _StubStream(self._stream(text, latency, failed))
+        try:
+            await asyncio.sleep(latency / 1000)
+            if failed:
+                raise RuntimeError("429 Resource has been exhausted (stub)")
+            return _StubResponse(text)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, text: str, latency: float, failed: bool):
+        pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        try:
+            for piece in pieces:
+                await asyncio.sleep(latency / 1000 / len(pieces))
+                if failed:
+                    raise RuntimeError("429 Resource has been exhausted (stub)")
+                yield _StubResponse(piece)
+        except (asyncio.CancelledError, GeneratorExit):
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
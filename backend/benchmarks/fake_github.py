@@ -0,0 +1,284 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+DEFAULT_FILES = [
+    ".gitignore", "README.md", "LICENSE", "package.json", "package-lock.json",
+    "src/App.tsx", "src/main.tsx", "src/components/Navbar.tsx", "src/pages/Home.tsx",
+    "backend/main.py", "backend/requirements.txt", "backend/tests/test_api.py",
+    ".github/workflows/ci.yml", "Dockerfile",
+]
+
+# Served by /contents for the files of that name (app.state.contents overrides per path)
+DEFAULT_CONTENTS = {
+    "package.json": json.dumps({
+        "name": "demo", "private": True,
+        "dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0", "@tanstack/react-query": "^5.0.0"},
+        "devDependencies": {"vite": "^5.0.0", "typescript": "^5.3.0", "tailwindcss": "^3.4.0"},
+    }, indent=2),
+    "requirements.txt": "fastapi==0.110.0\nuvicorn[standard]\nSQLAlchemy>=2.0\npsycopg2-binary\n# tests\npytest\n",
+    "Dockerfile": "FROM python:3.11-slim\nWORKDIR /app\nCOPY . .\nCMD [\"uvicorn\", \"main:app\"]\n",
+}
+
+DEFAULT_README = "# Demo\n\n## Getting Started\n\n```\nnpm install\n```\n\n![screenshot](docs/shot.png)\n" * 20
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str) -> dict:
+    """A recorded repository snapshot: {"metadata", "files", "readme"}."""
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def _nested_tree(files, depth: int):
+    """GraphQL-style nested Tree entries, expanded `depth` levels deep."""
+    root = {}
+    for path in files:
+        node = root
+        parts = path.split("/")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = None
+
+    def entries(node, level):
+        out = []
+        for name, child in node.items():
+            if child is None:
+                out.append({"name": name, "type": "blob"})
+            elif level < depth:
+                out.append({"name": name, "type": "tree", "object": {"entries": entries(child, level + 1)}})
+            else:
+                out.append({"name": name, "type": "tree"})
+        return out
+
+    return {"entries": entries(root, 1)}
+
+
+def _tree_sha(directory: str) -> str:
+    # Fake tree SHAs just encode the directory path ("" = repository root)
+    return "t" + directory.encode().hex()
+
+
+def _tree_entries(files, directory: str, recursive: bool):
+    """git/trees style entries for `directory`, paths relative to it."""
+    prefix = f"{directory}/" if directory else ""
+    entries, seen_dirs = [], set()
+    for path in files:
+        if not path.startswith(prefix):
+            continue
+        rel = path[len(prefix):]
+        parts = rel.split("/")
+        dirs = parts[:-1] if recursive else parts[:1][:len(parts) - 1]
+        for i in range(len(dirs)):
+            sub = "/".join(parts[:i + 1])
+            if sub not in seen_dirs:
+                seen_dirs.add(sub)
+                entries.append({"path": sub, "type": "tree", "mode": "040000", "sha": _tree_sha(prefix + sub)})
+        if recursive or len(parts) == 1:
+            entries.append({"path": rel, "type": "blob", "mode": "100644"})
+    return entries
+
+
+def create_app(files=None, readme: str = DEFAULT_README, latency_ms: float = 0, truncate_at: int = None,
+               rate_limit: int = None, metadata: dict = None) -> FastAPI:
+    """
+    A minimal stand-in for the GitHub REST and GraphQL endpoints that GitHubService calls.
+    Every repo name resolves to the same synthetic repository. `latency_ms`
+    is added to each response to imitate the network round-trip. Responses
+    carry an ETag and honour If-None-Match, like the real API.
+
+    `truncate_at` mimics GitHub's limit on recursive tree listings: larger
+    listings are cut off and flagged `truncated: true`.
+
+    `rate_limit` gives every token (Authorization header) that many calls per
+    hour, reported through the X-RateLimit-* headers. 304s are free.
+
+    Paths are served in sorted order, like GitHub's tree listings. Assign a
+    new sorted list to `app.state.files` to push a commit: the HEAD SHA
+    follows the file list, and /compare diffs any two SHAs served so far.
+    `app.state.readme` and `app.state.metadata` can be swapped the same way.
+    /users/{owner}/repos lists `app.state.owner_repos` repositories named
+    "<owner>-<n>" (every 10th a fork, every 25th archived), paginated with
+    a Link header like GitHub's.
+    /contents serves `app.state.contents` ({path: text}), else DEFAULT_CONTENTS
+    by file name, for paths in the file list.
+    """
+    app = FastAPI()
+    app.state.files = sorted(DEFAULT_FILES if files is None else files)
+    app.state.readme = readme
+    app.state.metadata = metadata or {}
+    app.state.contents = {}
+    app.state.owner_repos = 30
+    app.state.commits = {}  # SHA -> file list at that commit
+    app.state.request_count = 0
+    app.state.used = {}  # Authorization header -> calls charged
+    reset_at = int(time.time()) + 3600
+
+    if rate_limit is not None:
+        @app.middleware("http")
+        async def rate_limit_headers(request: Request, call_next):
+            token = request.headers.get("authorization", "anonymous")
+            used = app.state.used.get(token, 0)
+            limit_headers = {"X-RateLimit-Limit": str(rate_limit), "X-RateLimit-Reset": str(reset_at)}
+            if used >= rate_limit:
+                return Response(status_code=403, headers={**limit_headers, "X-RateLimit-Remaining": "0"})
+
+            response = await call_next(request)
+            used = app.state.used.get(token, 0)
+            if response.status_code != 304:
+                used += 1
+                app.state.used[token] = used
+            response.headers.update({**limit_headers, "X-RateLimit-Remaining": str(rate_limit - used)})
+            return response
+
+    async def _delay():
+        app.state.request_count += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def _json(request: Request, payload) -> Response:
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/users/{owner}/repos")
+    async def owner_repos(request: Request, owner: str, page: int = 1, per_page: int = 30):
+        await _delay()
+        if owner == "missing":
+            raise HTTPException(status_code=404, detail="Not Found")
+        per_page = min(per_page, 100)
+        total = app.state.owner_repos
+        last = max(1, -(-total // per_page))
+        names = [f"{owner}-{n}" for n in range((page - 1) * per_page, min(page * per_page, total))]
+        response = _json(request, [
+            {**_metadata(owner, name), "fork": n % 10 == 9, "archived": n % 25 == 24}
+            for name, n in ((name, int(name.rsplit("-", 1)[1])) for name in names)
+        ])
+        links = [f'<{request.url.include_query_params(page=page + 1)}>; rel="next"'] if page < last else []
+        links.append(f'<{request.url.include_query_params(page=last)}>; rel="last"')
+        response.headers["Link"] = ", ".join(links)
+        return response
+
+    @app.get("/repos/{owner}/{repo}")
+    async def repo_metadata(request: Request, owner: str, repo: str):
+        await _delay()
+        if repo == "missing":
+            raise HTTPException(status_code=404, detail="Not Found")
+        return _json(request, _metadata(owner, repo))
+
+    def _metadata(owner: str, repo: str) -> dict:
+        return {
+            "name": repo,
+            "full_name": f"{owner}/{repo}",
+            "owner": {"login": owner},
+            "description": "A synthetic repository used for local benchmarks.",
+            "stargazers_count": 42,
+            "forks_count": 7,
+            "open_issues_count": 3,
+            "language": "TypeScript",
+            "license": {"key": "mit"},
+            "default_branch": "main",
+            "pushed_at": "2024-01-01T00:00:00Z",
+            **app.state.metadata,
+        }
+
+    @app.get("/repos/{owner}/{repo}/git/trees/{ref}")
+    async def repo_tree(request: Request, owner: str, repo: str, ref: str, recursive: int = 0):
+        await _delay()
+        directory = bytes.fromhex(ref[1:]).decode() if ref.startswith("t") else ""
+        entries = _tree_entries(app.state.files, directory, bool(recursive))
+        truncated = truncate_at is not None and len(entries) > truncate_at
+        return _json(request, {
+            "sha": _tree_sha(directory),
+            "tree": entries[:truncate_at] if truncated else entries,
+            "truncated": truncated,
+        })
+
+    @app.get("/repos/{owner}/{repo}/commits/{ref}")
+    async def repo_commit(request: Request, owner: str, repo: str, ref: str):
+        await _delay()
+        files = app.state.files
+        sha = hashlib.sha1(f"{owner}/{repo}@".encode() + "\n".join(files).encode()).hexdigest()
+        app.state.commits[sha] = files
+        if "application/vnd.github.sha" in request.headers.get("accept", ""):
+            if request.headers.get("if-none-match") == f'"{sha}"':
+                return Response(status_code=304, headers={"ETag": f'"{sha}"'})
+            return Response(content=sha, media_type="text/plain", headers={"ETag": f'"{sha}"'})
+        return _json(request, {"sha": sha, "commit": {"message": "synthetic commit"}})
+
+    @app.get("/repos/{owner}/{repo}/compare/{basehead}")
+    async def repo_compare(request: Request, owner: str, repo: str, basehead: str):
+        await _delay()
+        base, _, head = basehead.partition("...")
+        if base not in app.state.commits or head not in app.state.commits:
+            raise HTTPException(status_code=404, detail="Not Found")
+        before, after = set(app.state.commits[base]), set(app.state.commits[head])
+        changes = (
+            [{"filename": f, "status": "removed"} for f in sorted(before - after)]
+            + [{"filename": f, "status": "added"} for f in sorted(after - before)]
+        )
+        return _json(request, {"status": "ahead" if changes else "identical", "files": changes[:300]})
+
+    @app.get("/repos/{owner}/{repo}/readme")
+    async def repo_readme(request: Request, owner: str, repo: str):
+        await _delay()
+        return _json(request, {
+            "name": "README.md",
+            "encoding": "base64",
+            "content": base64.b64encode(app.state.readme.encode()).decode(),
+        })
+
+    @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def repo_contents(request: Request, owner: str, repo: str, path: str):
+        await _delay()
+        text = app.state.contents.get(path)
+        if text is None and path in app.state.files:
+            text = DEFAULT_CONTENTS.get(path.rsplit("/", 1)[-1])
+        if text is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return _json(request, {
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "encoding": "base64",
+            "content": base64.b64encode(text.encode()).decode(),
+        })
+
+    @app.post("/graphql")
+    async def graphql(request: Request):
+        # Only understands the RepoSnapshot query sent by GitHubGraphQLFetcher
+        await _delay()
+        body = await request.json()
+        variables = body.get("variables", {})
+        if variables.get("name") == "missing":
+            return {"data": {"repository": None}, "errors": [{"type": "NOT_FOUND", "message": "Could not resolve to a Repository"}]}
+
+        meta = _metadata(variables.get("owner"), variables.get("name"))
+        depth = body["query"].count("entries {")
+        readme = app.state.readme
+        repository = {
+            "name": meta["name"],
+            "owner": {"login": meta["owner"]["login"]},
+            "description": meta["description"],
+            "stargazerCount": meta["stargazers_count"],
+            "forkCount": meta["forks_count"],
+            "issues": {"totalCount": meta["open_issues_count"]},
+            "pullRequests": {"totalCount": 0},
+            "primaryLanguage": {"name": meta["language"]} if meta["language"] else None,
+            "licenseInfo": {"key": meta["license"]["key"], "name": None, "spdxId": None} if meta["license"] else None,
+            "pushedAt": meta["pushed_at"],
+            "defaultBranchRef": {"name": meta["default_branch"], "target": {"oid": "0" * 40}},
+            "readme0": {"text": readme, "isTruncated": False} if readme else None,
+            "tree": _nested_tree(app.state.files, depth),
+        }
+        return {"data": {"repository": repository}}
+
+    return app
@@ -0,0 +1,104 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import uvicorn
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_self_signed_cert(directory: str):
+    """Writes a throwaway localhost cert/key pair so benchmarks can exercise real TLS handshakes."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(datetime.utcnow() + timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([
+                x509.DNSName("localhost"),
+                x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+            ]),
+            critical=False,
+        )
+        .sign(key, hashes.SHA256())
+    )
+
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+    return cert_path, key_path
+
+
+class LocalServer:
+    """
+    Runs an ASGI app with uvicorn in a background thread.
+
+    Usage:
+        with LocalServer(app, tls=True) as server:
+            server.url  # -> "https://127.0.0.1:54321"
+    """
+
+    def __init__(self, app, tls: bool = False):
+        self.app = app
+        self.tls = tls
+        self.port = free_port()
+        self.cert_path = None
+        self._tmpdir = None
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        ssl_kwargs = {}
+        if self.tls:
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.cert_path, key_path = make_self_signed_cert(self._tmpdir.name)
+            ssl_kwargs = {"ssl_certfile": self.cert_path, "ssl_keyfile": key_path}
+
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning", **ssl_kwargs)
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Local benchmark server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+        if self._tmpdir:
+            self._tmpdir.cleanup()
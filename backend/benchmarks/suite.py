@@ -0,0 +1,278 @@
+"""
+GitGrade benchmark suite: time and memory per stage on synthetic repositories.
+
+Stages, for every shape x size (benchmarks/synthetic_repo.py):
+- snapshot:        RepoSnapshot from the path list (what fetch_repo_data builds)
+- score:           ScoringService.calculate_score
+- prompt:          AIService.describe_files + build_prompt
+- analyze:         POST /api/analyze/ end to end, cold (new repo, nothing cached)
+- analyze_same_prompt: new repo with identical content (Gemini response cache hit)
+- analyze_cached:  the same request again (result cache hit)
+- analyze_fast:    POST /api/analyze/ with "mode": "fast", cold (manifests read, no Gemini)
+and once per run:
+- pdf:             EmailService.generate_pdf for a full AnalysisResult
+
+Runs fully offline. GitHub is benchmarks/fake_github.py and Gemini is
+benchmarks/fake_gemini.py (a local gRPC server), each with a fixed latency.
+The database, GitHub cache and PDFs go to a temporary directory.
+
+Results are written as JSON to benchmarks/results/<commit>.json (or
+--output). Pass --compare with an earlier results file to print the change
+per stage. Inputs are deterministic, so runs on the same machine are
+comparable across commits.
+
+    cd backend
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 10 1000 100000 1000000 --shapes monorepo deep --stages score prompt
+    python -m benchmarks.suite --compare benchmarks/results/1c21462.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks import fake_github, synthetic_repo
+from benchmarks.fake_gemini import DEFAULT_ANALYSIS, FakeGemini
+from benchmarks.local_server import LocalServer
+
+REPO_STAGES = ("snapshot", "score", "prompt", "analyze", "analyze_same_prompt", "analyze_cached", "analyze_fast")
+STAGES = REPO_STAGES + ("pdf",)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SLOWER_THRESHOLD = 1.10  # --compare flags stages at least 10% slower
+
+
+def _commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except Exception:
+        return "unknown"
+
+
+def measure(fn, runs: int, memory: bool = True) -> dict:
+    """Median / min / max wall time of `runs` calls, plus the peak Python allocation of one more."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    peak_kb = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    return {
+        "runs": runs,
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "max_ms": round(max(samples), 3),
+        "peak_kb": peak_kb,
+    }
+
+
+class Suite:
+    def __init__(self, args, github_server: LocalServer, gemini: FakeGemini, workdir: str):
+        self.args = args
+        self.github = github_server
+        self.gemini = gemini
+        self.workdir = workdir
+        self.results = []
+
+        # The app reads its configuration at import time
+        os.environ.update({
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+            "GITHUB_CACHE_PATH": os.path.join(workdir, "github_cache.sqlite3"),
+            "GITHUB_API_URL": github_server.url,
+            "GEMINI_API_KEY": "benchmark",
+            "GEMINI_API_ENDPOINT": gemini.endpoint,
+        })
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main
+            from app.services.ai_service import AIService
+            from app.services.email_service import EmailService
+            from app.services.repo_snapshot import RepoSnapshot
+            from app.services.scoring_service import ScoringService
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        self.app = main.app
+        self.RepoSnapshot = RepoSnapshot
+        self.scoring = ScoringService()
+        self.ai = AIService()
+        self.email = EmailService()
+
+    def record(self, stage: str, shape, size, result: dict):
+        row = {"stage": stage, "shape": shape, "size": size, **result}
+        self.results.append(row)
+        label = f"{shape}/{size}" if shape else "-"
+        peak = f"{row['peak_kb'] / 1024:9.1f}" if row["peak_kb"] is not None else f"{'-':>9}"
+        print(f"{stage:<20} {label:<18} {row['median_ms']:>10.2f} {row['min_ms']:>10.2f} {row['max_ms']:>10.2f} {peak}")
+
+    # --- Stages ---
+
+    def run_offline(self, shape: str, size: int, repo: dict):
+        files, metadata, readme = repo["files"], repo["metadata"], repo["readme"]
+        snapshot = self.RepoSnapshot(files)
+        runs = self.args.runs
+
+        def prompt():
+            is_monorepo, has_gitignore, files_digest = self.ai.describe_files(snapshot)
+            return self.ai.build_prompt(readme, 50, is_monorepo, has_gitignore, files_digest)
+
+        stages = {
+            "snapshot": lambda: self.RepoSnapshot(files),
+            "score": lambda: self.scoring.calculate_score(metadata, snapshot, readme),
+            "prompt": prompt,
+        }
+        for stage, fn in stages.items():
+            if stage in self.args.stages:
+                self.record(stage, shape, size, measure(fn, runs))
+
+    def run_analyze(self, client, shape: str, size: int, repo: dict):
+        app = self.github.app
+        app.state.files, app.state.readme, app.state.metadata = repo["files"], repo["readme"], repo["metadata"]
+        counter = iter(range(10**9))
+        url = None
+
+        def post(new_repo: bool, new_prompt: bool = False, mode: str = "full"):
+            nonlocal url
+            if new_repo or url is None:
+                n = next(counter)
+                url = f"https://github.com/bench/{shape}-{size}-{n}"
+                # A README line of its own makes the Gemini prompt unique too
+                app.state.readme = f"<!-- run {n} -->\n{repo['readme']}" if new_prompt else repo["readme"]
+            with contextlib.redirect_stdout(io.StringIO()):
+                resp = client.post("/api/analyze/", json={"github_url": url, "mode": mode})
+            if resp.status_code != 200:
+                raise RuntimeError(f"/api/analyze/ returned {resp.status_code}: {resp.text[:200]}")
+
+        if "analyze" in self.args.stages:
+            self.record("analyze", shape, size, measure(lambda: post(True, True), self.args.analyze_runs, memory=False))
+        if "analyze_same_prompt" in self.args.stages:
+            post(True)
+            self.record("analyze_same_prompt", shape, size, measure(lambda: post(True), self.args.runs, memory=False))
+        if "analyze_cached" in self.args.stages:
+            post(True)
+            self.record("analyze_cached", shape, size, measure(lambda: post(False), self.args.runs, memory=False))
+        if "analyze_fast" in self.args.stages:
+            self.record("analyze_fast", shape, size,
+                        measure(lambda: post(True, mode="fast"), self.args.analyze_runs, memory=False))
+
+    def run_pdf(self):
+        from app.models import AnalysisResult
+        repo = synthetic_repo.generate(200, "monorepo")
+        result = AnalysisResult(
+            details={"name": repo["metadata"]["name"], "owner": "bench", "description": repo["metadata"]["description"],
+                     "stars": 1, "forks": 1, "open_issues": 1, "language": "TypeScript"},
+            score=72,
+            summary=DEFAULT_ANALYSIS["summary"] * 3,
+            roadmap=DEFAULT_ANALYSIS["roadmap"],
+            tech_stack=DEFAULT_ANALYSIS["tech_stack"],
+            file_structure=repo["files"][:50],
+        )
+        cwd = os.getcwd()
+        os.chdir(self.workdir)  # generate_pdf writes to ./reports/
+        try:
+            self.record("pdf", None, None, measure(lambda: self.email.generate_pdf(result), self.args.runs))
+        finally:
+            os.chdir(cwd)
+
+    def run(self):
+        from fastapi.testclient import TestClient
+
+        print(f"{'stage':<20} {'shape/size':<18} {'median ms':>10} {'min ms':>10} {'max ms':>10} {'peak MB':>9}")
+        with TestClient(self.app) as client:
+            for shape in self.args.shapes:
+                for size in self.args.sizes:
+                    repo = synthetic_repo.generate(size, shape, self.args.seed)
+                    self.run_offline(shape, size, repo)
+                    if size <= self.args.analyze_max_size:
+                        self.run_analyze(client, shape, size, repo)
+        if "pdf" in self.args.stages:
+            self.run_pdf()
+
+
+def compare(report: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["stage"], r["shape"], r["size"]): r for r in baseline["results"]}
+
+    print(f"\nCompared with {baseline['commit']} ({baseline_path})")
+    if baseline.get("settings") != report["settings"] or baseline.get("platform") != report["platform"]:
+        print("Note: settings or platform differ from the baseline; timings may not be comparable")
+    print(f"{'stage':<20} {'shape/size':<18} {'before ms':>10} {'now ms':>10} {'change':>8}")
+    for row in report["results"]:
+        old = before.get((row["stage"], row["shape"], row["size"]))
+        if not old:
+            continue
+        ratio = row["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        label = f"{row['shape']}/{row['size']}" if row["shape"] else "-"
+        flag = "  slower" if ratio >= SLOWER_THRESHOLD else ""
+        print(f"{row['stage']:<20} {label:<18} {old['median_ms']:>10.2f} {row['median_ms']:>10.2f} {ratio - 1:>+8.0%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--shapes", nargs="+", choices=synthetic_repo.SHAPES, default=list(synthetic_repo.SHAPES))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--analyze-runs", type=int, default=3)
+    parser.add_argument("--analyze-max-size", type=int, default=10000,
+                        help="Largest repo sent through /api/analyze/ (the fake server serialises the whole tree)")
+    parser.add_argument("--github-latency-ms", type=float, default=20)
+    parser.add_argument("--gemini-latency-ms", type=float, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    commit = _commit()
+    github_app = fake_github.create_app(latency_ms=args.github_latency_ms)
+
+    with tempfile.TemporaryDirectory() as workdir, FakeGemini(latency_ms=args.gemini_latency_ms) as gemini, \
+            LocalServer(github_app) as github_server:
+        suite = Suite(args, github_server, gemini, workdir)
+        suite.run()
+
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "settings": {
+            "runs": args.runs, "analyze_runs": args.analyze_runs, "seed": args.seed,
+            "github_latency_ms": args.github_latency_ms, "gemini_latency_ms": args.gemini_latency_ms,
+        },
+        "gemini": {
+            "requests": gemini.request_count,
+            "median_prompt_chars": statistics.median(gemini.prompt_chars) if gemini.prompt_chars else None,
+        },
+        "results": suite.results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Deterministic synthetic repositories for benchmarks.
+
+generate(size, shape, seed) always returns the same repository for the same
+arguments (on any machine / Python version), so timings of different
+commits are measured on identical inputs. Shapes:
+
+- "flat":     most files in the root or one directory down (scripts, docs dumps)
+- "deep":     long directory chains, up to 30 levels (Java packages, vendored trees)
+- "monorepo": frontend/, backend/ and packages/*, each with its own manifests,
+              src/ and tests/, plus CI config (the shape GitGrade sees most)
+
+Paths come back sorted, the order GitHub lists trees in.
+"""
+import random
+from datetime import datetime, timedelta
+
+SHAPES = ("flat", "deep", "monorepo")
+
+WORDS = ["src", "app", "lib", "core", "utils", "models", "views", "docs", "assets", "api", "internal",
+         "pkg", "cmd", "web", "components", "hooks", "services", "handlers", "config", "scripts",
+         "domain", "adapters", "shared", "common", "io", "store", "routes", "schemas", "widgets", "jobs"]
+EXTS = [".py", ".ts", ".tsx", ".js", ".go", ".java", ".md", ".json", ".css", ".yml", ".png", ".sql"]
+
+ROOT_FILES = {
+    "flat": ["README.md", "LICENSE", "requirements.txt", "main.py", ".gitignore"],
+    "deep": ["README.md", "pom.xml", ".gitignore", "LICENSE", ".github/workflows/build.yml"],
+    "monorepo": [
+        "README.md", ".gitignore", "LICENSE", "docker-compose.yml", ".github/workflows/ci.yml",
+        "frontend/package.json", "frontend/package-lock.json", "frontend/vite.config.ts",
+        "frontend/tsconfig.json", "frontend/src/App.tsx", "frontend/src/main.tsx",
+        "backend/requirements.txt", "backend/main.py", "backend/Dockerfile", "backend/tests/test_api.py",
+    ],
+}
+
+README_SECTIONS = [
+    "# {name}\n\nA synthetic repository generated for GitGrade benchmarks.\n",
+    "## Getting Started\n\n```\nnpm install\nnpm run dev\n```\n",
+    "## Backend\n\n```\npip install -r requirements.txt\nuvicorn main:app\n```\n",
+    "![screenshot](docs/screenshot.png)\n",
+    "## Architecture\n\n" + "The services talk over a shared message bus and a REST gateway. " * 8 + "\n",
+    "## Contributing\n\nOpen an issue first. Run the test suite before sending a pull request.\n",
+]
+
+# Fixed point in time so metadata (and pushed_at based scores) never depend on the day
+EPOCH = datetime(2025, 1, 1)
+
+
+def _directories(rng: random.Random, shape: str, count: int) -> list:
+    """`count` directory prefixes ("a/b/") for the given shape, root ("") first."""
+    dirs = [""]
+    if shape == "flat":
+        while len(dirs) < count:
+            dirs.append(f"{rng.choice(WORDS)}{len(dirs)}/")
+        return dirs
+
+    if shape == "deep":
+        # Grow chains: usually extend one of the most recent (deepest) directories
+        while len(dirs) < count:
+            parent = dirs[-rng.randint(1, min(len(dirs), 4))]
+            while parent.count("/") >= 30:
+                parent = dirs[rng.randrange(len(dirs) // 2)]
+            dirs.append(f"{parent}{rng.choice(WORDS)}{len(dirs)}/")
+        return dirs
+
+    # monorepo: a few workspaces, each a small tree of its own
+    workspaces = ["frontend/src/", "backend/app/", "backend/tests/"]
+    workspaces += [f"packages/{rng.choice(WORDS)}-{i}/src/" for i in range(max(1, count // 50))]
+    dirs += workspaces
+    while len(dirs) < count:
+        parent = dirs[rng.randrange(1, len(dirs))]
+        if parent.count("/") < 9:
+            dirs.append(f"{parent}{rng.choice(WORDS)}{len(dirs)}/")
+    return dirs[:count]
+
+
+def generate(size: int, shape: str = "monorepo", seed: int = 0) -> dict:
+    """A repository with exactly `size` files: {"metadata", "files", "readme"}."""
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape {shape!r}, expected one of {SHAPES}")
+    rng = random.Random(f"{shape}:{size}:{seed}")
+
+    files = ROOT_FILES[shape][:size]
+    files_per_dir = {"flat": 40, "deep": 6, "monorepo": 12}[shape]
+    dirs = _directories(rng, shape, max(1, (size - len(files)) // files_per_dir))
+    if shape == "flat":
+        dirs += [""] * len(dirs)  # Half the files straight in the root
+
+    files += [
+        f"{rng.choice(dirs)}{rng.choice(WORDS)}_{i}{rng.choice(EXTS)}"
+        for i in range(size - len(files))
+    ]
+    files.sort()
+
+    name = f"synthetic-{shape}-{size}"
+    readme = "\n".join(section.format(name=name) for section in README_SECTIONS[: 1 + rng.randint(0, 5)])
+    pushed_at = EPOCH - timedelta(days=rng.randint(0, 120), seconds=rng.randint(0, 86399))
+    metadata = {
+        "name": name,
+        "full_name": f"bench/{name}",
+        "owner": {"login": "bench"},
+        "description": f"Synthetic {shape} repository with {size} files",
+        "stargazers_count": rng.randint(0, 5000),
+        "forks_count": rng.randint(0, 500),
+        "open_issues_count": rng.randint(0, 200),
+        "language": {"flat": "Python", "deep": "Java", "monorepo": "TypeScript"}[shape],
+        "license": {"key": "mit"} if rng.random() < 0.7 else None,
+        "default_branch": "main",
+        "pushed_at": pushed_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    return {"metadata": metadata, "files": files, "readme": readme}
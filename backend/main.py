@@ -1,9 +1,11 @@
 
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import analyze, auth, payment
-from app.database import engine
+from app.routers import analyze, auth, payment, metrics
+from app.database import engine, async_engine
+from app.http_client import init_http_client, close_http_client
 from app import entity  
 
 import uvicorn
@@ -19,6 +21,10 @@ logger = logging.getLogger(__name__)
 
 
 entity.Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist: add indexes declared since they were created
+for table in entity.Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
 
 
 def heartbeat_ping():
@@ -57,10 +63,30 @@ def start_keep_alive_thread():
     thread.start()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled HTTP client (GitHub + Google), reused across all requests
+    app.state.http_client = await init_http_client()
+    start_keep_alive_thread()
+    # Workers for queued analyses (/api/analyze/jobs)
+    job_workers = analyze.start_job_workers()
+    # Bulk inserts of Analysis rows, written behind the requests
+    analysis_writer = analyze.start_analysis_writer()
+    yield
+    if job_workers:
+        await job_workers.stop()
+    if analysis_writer:
+        await analysis_writer.stop()  # Writes the rows still queued
+    await close_http_client()
+    # Close pooled async DB connections (aiosqlite's connection threads would keep the process alive)
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title="GitGrade API",
     description="Backend for GitHub Analysis Hackathon Project",
-    version="2.0"
+    version="2.0",
+    lifespan=lifespan
 )
 
 
@@ -76,13 +102,9 @@ app.add_middleware(
 app.include_router(analyze.router, prefix="/api/analyze", tags=["Analysis"])
 app.include_router(payment.router, prefix="/api/payment", tags=["Payment"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 
-@app.on_event("startup")
-async def startup_event():
-   
-    start_keep_alive_thread()
-
 @app.get("/")
 def home():
     return {"message": "GitGrade 2.0 Backend is Running Successfully!"}
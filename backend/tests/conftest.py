@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# app.database builds its engines from DATABASE_URL at import: a throwaway SQLite file for the tests
+_workdir = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir.name, 'test.db')}")
+os.environ.setdefault("GITHUB_CACHE_PATH", os.path.join(_workdir.name, "github_cache.sqlite3"))
@@ -0,0 +1,120 @@
+"""AnalysisWriter keeps rows through database outages and drops only rows the database rejects."""
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import OperationalError
+
+from app import database, entity
+from app.services import analysis_writer
+from app.services.analysis_writer import AnalysisWriter
+
+
+@pytest.fixture(autouse=True)
+def analyses_table():
+    entity.Base.metadata.create_all(bind=database.engine)
+    with database.SessionLocal() as db:
+        db.execute(delete(entity.Analysis))
+        db.commit()
+
+
+def row(n: int, **extra) -> dict:
+    return {"user_id": None, "github_url": f"https://github.com/acme/r{n}", "repo_name": f"r{n}",
+            "overall_score": 50, "summary": "s", "commit_sha": None, "cache_key": None,
+            "full_json_result": {}, **extra}
+
+
+def stored() -> int:
+    with database.SessionLocal() as db:
+        return db.execute(select(func.count(entity.Analysis.id))).scalar()
+
+
+class DatabaseDown:
+    """Stands in for AsyncSessionLocal while the database is unreachable."""
+
+    def __call__(self):
+        raise OperationalError("INSERT INTO analyses", {}, ConnectionRefusedError("connection refused"))
+
+
+def run(test):
+    async def main():
+        try:
+            await test()
+        finally:
+            await database.async_engine.dispose()
+    asyncio.run(main())
+
+
+def test_rows_survive_an_outage(monkeypatch):
+    async def test():
+        writer = AnalysisWriter(batch_size=10, interval=0.01, max_pending=100)
+        monkeypatch.setattr(analysis_writer, "AsyncSessionLocal", DatabaseDown())
+        for n in range(25):
+            await writer.add(row(n))
+        assert not await writer.flush(force=True)
+        assert not await writer.flush()  # Backing off: doesn't try again yet
+        assert writer.stats()["pending"] == 25 and writer.stats()["backoff_s"] > 0
+
+        monkeypatch.setattr(analysis_writer, "AsyncSessionLocal", database.AsyncSessionLocal)
+        assert await writer.flush(force=True)
+        await writer.stop()
+        assert writer.stats()["written"] == 25 and writer.stats()["backoff_s"] == 0
+    run(test)
+    assert stored() == 25
+
+
+def test_rejected_rows_are_dropped_alone():
+    async def test():
+        writer = AnalysisWriter(batch_size=16, interval=60, max_pending=100)
+        for n in range(16):
+            # Rows 5 and 11 reuse row 0's primary key
+            await writer.add(row(n, id=1 if n in (5, 11) else n + 1))
+        assert await writer.flush()
+        await writer.stop()
+        assert writer.stats()["rejected"] == 2
+    run(test)
+    assert stored() == 14
+
+
+def test_full_queue_drops_new_rows(monkeypatch):
+    async def test():
+        writer = AnalysisWriter(batch_size=10, interval=60, max_pending=5)
+        monkeypatch.setattr(analysis_writer, "AsyncSessionLocal", DatabaseDown())
+        for n in range(8):
+            await writer.add(row(n))
+        assert writer.stats()["pending"] == 5 and writer.stats()["dropped"] == 3
+        await writer.stop()
+        assert writer.stats()["unwritten_at_stop"] == 5
+    run(test)
+    assert stored() == 0
+
+
+
+def test_cancelled_flush_writes_rows_once():
+    async def test():
+        writer = AnalysisWriter(batch_size=10, interval=60, max_pending=100)
+        real_write = writer._write
+
+        async def slow_write(batch):
+            await real_write(batch)
+            await asyncio.sleep(0.05)  # Committed, not yet taken off the queue
+
+        writer._write = slow_write
+        for n in range(30):
+            await writer.add(row(n))
+        flushing = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0.01)
+        flushing.cancel()
+        await writer.stop()
+    run(test)
+    assert stored() == 30
+
+
+def test_has_pending():
+    async def test():
+        writer = AnalysisWriter(batch_size=10, interval=60, max_pending=100)
+        await writer.add(row(1, user_id=7))
+        assert writer.has_pending(7) and not writer.has_pending(8)
+        await writer.stop()
+        assert not writer.has_pending(7)
+    run(test)
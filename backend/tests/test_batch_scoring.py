@@ -0,0 +1,31 @@
+"""BatchScorer.score_batch must give calculate_score's score for every repo."""
+import random
+from datetime import datetime
+
+import pytest
+
+from app.services.batch_scoring import BatchScorer
+from app.services.scoring_service import ScoringService
+from benchmarks.bench_batch_scoring import boundary_repos, check_parity, random_repo
+
+scorer = BatchScorer()
+scoring = ScoringService()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_repos(seed):
+    rng = random.Random(seed)
+    now = datetime.now()
+    check_parity([random_repo(rng, now) for _ in range(300)], scorer, scoring)
+
+
+def test_readme_boundaries():
+    repos = boundary_repos()
+    assert len(repos) >= BatchScorer.MIN_VECTOR_BATCH  # Takes the NumPy path
+    check_parity(repos, scorer, scoring)
+
+
+def test_readme_boundary_alternating():
+    repos = [{"metadata": {}, "files": ["a.py", "b.py", "c.py"], "readme": "x npm " if i % 2 else "install here"}
+             for i in range(40)]
+    check_parity(repos, scorer, scoring)
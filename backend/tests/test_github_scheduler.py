@@ -0,0 +1,28 @@
+"""TokenBudget follows the REST ("core") rate limit window only."""
+from app.services.github_scheduler import TokenBudget
+
+
+def limit_headers(remaining: int, reset: int, resource: str = None) -> dict:
+    headers = {"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": str(remaining), "X-RateLimit-Reset": str(reset)}
+    if resource:
+        headers["X-RateLimit-Resource"] = resource
+    return headers
+
+
+def test_core_headers_update_the_budget():
+    budget = TokenBudget("token")
+    budget.update(limit_headers(4000, 2_000_000_000, "core"))
+    assert (budget.remaining, budget.reset_at) == (4000, 2_000_000_000)
+
+
+def test_headers_without_resource_count_as_core():
+    budget = TokenBudget("token")
+    budget.update(limit_headers(4000, 2_000_000_000))
+    assert budget.remaining == 4000
+
+
+def test_graphql_headers_leave_the_rest_budget_alone():
+    budget = TokenBudget("token")
+    budget.update(limit_headers(4000, 2_000_000_000, "core"))
+    budget.update(limit_headers(12, 2_000_000_100, "graphql"))
+    assert (budget.remaining, budget.reset_at) == (4000, 2_000_000_000)
@@ -0,0 +1,72 @@
+"""GitHubService against a fake GitHub (httpx.MockTransport)."""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.github_cache import GitHubResponseCache
+from app.services.github_scheduler import GitHubRateLimiter
+from app.services.github_service import GitHubService
+
+API = "https://api.github.test"
+
+
+def fake_github(repo_count: int, per_page: int = 100):
+    """Owner "acme" with `repo_count` repos; pages carry an ETag and answer If-None-Match with 304."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", 1))
+        etag = f'"page-{page}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        last = -(-repo_count // per_page)
+        headers = {"ETag": etag}
+        if last > 1:
+            base = str(request.url.copy_remove_param("page"))
+            headers["Link"] = f'<{base}&page={min(page + 1, last)}>; rel="next", <{base}&page={last}>; rel="last"'
+        repos = [{"name": f"repo-{n}", "fork": False, "archived": False}
+                 for n in range((page - 1) * per_page, min(page * per_page, repo_count))]
+        return httpx.Response(200, json=repos, headers=headers)
+    return handler
+
+
+def service(cache) -> GitHubService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake_github(300)))
+    return GitHubService(client=client, base_url=f"{API}/repos", cache=cache,
+                         rate_limiter=GitHubRateLimiter([], reserve=0, max_wait=0))
+
+
+@pytest.mark.parametrize("restart", [False, True])
+def test_repeat_listing_keeps_every_page(tmp_path, restart):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = GitHubResponseCache(memory_bytes=1 << 20, disk_path=path, disk_bytes=1 << 20)
+
+    first = asyncio.run(service(cache).list_repos("acme", limit=1000))
+    if restart:  # Only the disk tier is left
+        cache = GitHubResponseCache(memory_bytes=1 << 20, disk_path=path, disk_bytes=1 << 20)
+    second = asyncio.run(service(cache).list_repos("acme", limit=1000))
+
+    assert len(first) == len(second) == 300
+    assert cache.revalidated == 3
+
+
+def test_streamed_tree_listing_moves_to_a_token_with_quota_left():
+    tree = {"tree": [{"path": "README.md", "type": "blob"}, {"path": "src/app.py", "type": "blob"}],
+            "truncated": False}
+    tokens = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        tokens.append(request.headers["Authorization"])
+        if request.headers["Authorization"] == "token spent":
+            return httpx.Response(403, json={"message": "API rate limit exceeded"},
+                                  headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "4000000000"})
+        return httpx.Response(200, json=tree, headers={"X-RateLimit-Remaining": "4999",
+                                                       "X-RateLimit-Reset": "4000000000"})
+
+    limiter = GitHubRateLimiter(["spent", "fresh"], reserve=0, max_wait=0)
+    github = GitHubService(client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+                           base_url=f"{API}/repos", cache=None, rate_limiter=limiter)
+
+    files, stats = asyncio.run(github._fetch_tree("acme", "big", "HEAD"))
+    assert list(files) == ["README.md", "src/app.py"]
+    assert tokens == ["token spent", "token fresh"]
+    assert limiter.budgets[0].remaining == 0
@@ -0,0 +1,104 @@
+"""/api/analyze/history: keyset pages, filters, and reading the user's own queued rows."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+import main
+from app import database, entity
+from app.config import Config
+from app.routers import analyze
+from app.services.analysis_writer import AnalysisWriter
+
+client = TestClient(main.app)  # No lifespan: the writer starts on its first row
+
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + jwt.encode({"sub": email}, Config.JWT_SECRET_KEY,
+                                                    algorithm=Config.JWT_ALGORITHM)}
+
+
+@pytest.fixture(autouse=True)
+def history():
+    with database.SessionLocal() as db:
+        db.execute(delete(entity.Analysis))
+        db.execute(delete(entity.User))
+        db.add_all([entity.User(id=1, email="a@example.com"), entity.User(id=2, email="b@example.com")])
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        owners = ["alice", "bob"]
+        db.execute(insert(entity.Analysis).values([
+            dict(user_id=1 + i % 2, github_url=f"https://github.com/{owners[i % 4 // 2]}/app{i % 3}/",
+                 repo_name=f"app{i % 3}", overall_score=i % 100, summary="s", commit_sha=None, cache_key=None,
+                 full_json_result={}, created_at=base + timedelta(seconds=i // 3))  # Ties on created_at
+            for i in range(300)
+        ]))
+        db.commit()
+
+
+def pages(**params) -> list:
+    ids, cursor = [], None
+    while True:
+        page = client.get("/api/analyze/history", params={**params, **({"cursor": cursor} if cursor else {})},
+                          headers=auth("a@example.com")).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_requires_sign_in():
+    assert client.get("/api/analyze/history").status_code == 401
+    assert client.get("/api/analyze/history", headers={"Authorization": "Bearer x"}).status_code == 401
+
+
+def test_pages_walk_the_whole_history_newest_first():
+    with database.SessionLocal() as db:
+        rows = db.query(entity.Analysis.id).filter(entity.Analysis.user_id == 1) \
+            .order_by(entity.Analysis.created_at.desc(), entity.Analysis.id.desc()).all()
+    assert pages(limit=7) == [r.id for r in rows]
+
+
+def test_invalid_cursor():
+    assert client.get("/api/analyze/history", params={"cursor": "zzz"},
+                      headers=auth("a@example.com")).status_code == 400
+
+
+@pytest.mark.parametrize("repo, owners", [
+    ("app1", {"alice", "bob"}),
+    ("alice/app1", {"alice"}),
+    ("https://github.com/bob/APP1/", {"bob"}),
+])
+def test_repo_filter(repo, owners):
+    page = client.get("/api/analyze/history", params={"repo": repo, "limit": 100},
+                      headers=auth("a@example.com")).json()
+    assert page["items"]
+    assert {item["github_url"].split("/")[3] for item in page["items"]} == owners
+    assert {item["repo_name"] for item in page["items"]} == {"app1"}
+
+
+def test_score_filter():
+    items = client.get("/api/analyze/history", params={"min_score": 10, "max_score": 20, "limit": 100},
+                       headers=auth("a@example.com")).json()["items"]
+    assert items and all(10 <= item["score"] <= 20 for item in items)
+
+
+def test_only_the_readers_queued_rows_are_flushed(monkeypatch):
+    writer = AnalysisWriter(batch_size=100, interval=60, max_pending=100)
+    monkeypatch.setattr(analyze, "analysis_writer", writer)
+    new_row = dict(github_url="https://github.com/alice/fresh", repo_name="fresh", overall_score=99,
+                   summary="s", commit_sha=None, cache_key=None, full_json_result={})
+
+    async def queue(user_id):
+        await writer.add({**new_row, "user_id": user_id})
+
+    with TestClient(main.app) as app_client:  # One loop for the requests and the writer
+        app_client.portal.call(queue, 2)
+        newest = app_client.get("/api/analyze/history", params={"limit": 1}, headers=auth("a@example.com")).json()
+        assert newest["items"][0]["repo_name"] != "fresh" and writer.stats()["pending"] == 1  # Not a's row
+
+        app_client.portal.call(queue, 1)
+        newest = app_client.get("/api/analyze/history", params={"limit": 1}, headers=auth("a@example.com")).json()
+        assert newest["items"][0]["repo_name"] == "fresh" and writer.stats()["pending"] == 0
@@ -0,0 +1,56 @@
+"""JobWorkerPool with an in-memory stand-in for JobQueue."""
+import asyncio
+
+from app.services.job_queue import JobWorkerPool
+
+
+class FlakyQueue:
+    """Hands out `jobs` in order; the first complete() loses its database connection."""
+
+    lease_seconds = 60
+    max_attempts = 3
+
+    def __init__(self, jobs: list):
+        self.jobs = list(jobs)
+        self.completed = []
+        self.wakeup = None
+        self._failures = 1
+
+    async def claim(self, db, worker_id):
+        return self.jobs.pop(0) if self.jobs else None
+
+    async def complete(self, db, job_id, worker_id, result):
+        if self._failures:
+            self._failures -= 1
+            raise ConnectionResetError("db connection reset")
+        self.completed.append(job_id)
+
+    async def fail(self, db, job_id, worker_id, error):
+        pass
+
+    async def release(self, db, job_id, worker_id, **kwargs):
+        pass
+
+    async def renew(self, db, job_id, worker_id):
+        return True
+
+    async def purge(self, db, hours):
+        return 0
+
+
+def test_worker_survives_a_failed_complete():
+    async def run():
+        queue = FlakyQueue([{"id": "a", "attempts": 1}, {"id": "b", "attempts": 1}])
+        pool = JobWorkerPool(queue, handler=lambda job: asyncio.sleep(0, {"ok": job["id"]}),
+                             workers=1, poll_interval=0.01).start()
+        for _ in range(100):
+            if queue.completed:
+                break
+            await asyncio.sleep(0.01)
+        alive = not pool._tasks[0].done()
+        await pool.stop()
+        return queue.completed, alive
+
+    completed, alive = asyncio.run(run())
+    assert completed == ["b"]
+    assert alive
@@ -0,0 +1,46 @@
+"""
+ScoringService.calculate_score (compiled path extractor) must give the
+same score as the v3.0 rule-by-rule implementation it replaced
+(benchmarks.bench_scoring.legacy_calculate_score), from a plain file
+list and from a RepoSnapshot.
+"""
+import random
+
+import pytest
+
+from app.services.repo_snapshot import RepoSnapshot
+from app.services.scoring_service import ScoringService
+from benchmarks import fake_github
+from benchmarks.bench_scoring import TRICKY, legacy_calculate_score, random_inputs
+
+SIZES = [0, 1, 2, 3, 4, 10, 14, 15, 16, 50, 500, 3000]
+
+service = ScoringService()
+
+
+def assert_parity(metadata, files, readme):
+    expected = legacy_calculate_score(metadata, files, readme)
+    for given in (files, RepoSnapshot(files)):
+        got = service.calculate_score(metadata, given, readme)
+        assert got == expected, f"Score mismatch ({got} != {expected}) for {len(files)} files: {files[:10]}"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_trees(seed):
+    """Rule patterns sprinkled into paths, overlapping patterns, paths with spaces, tiny repos."""
+    rng = random.Random(seed)
+    for _ in range(100):
+        assert_parity(*random_inputs(rng, rng.choice(SIZES)))
+
+
+def test_recorded_fixture():
+    fixture = fake_github.load_fixture("gitgrade_repo")
+    assert_parity(fixture["metadata"], fixture["files"], fixture["readme"])
+
+
+def test_root_files_only():
+    assert_parity({}, [f"a{i}" for i in range(20)], "")
+
+
+def test_patterns_across_separators():
+    assert_parity({}, TRICKY, "")
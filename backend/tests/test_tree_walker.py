@@ -0,0 +1,78 @@
+"""TreeWalker's subtree walk when a listing fails, and what the router caches from it."""
+import asyncio
+import json
+from contextlib import aclosing
+
+import pytest
+
+from app import database
+from app.models import RepoDetails
+from app.routers import analyze
+from app.services.analysis_progress import AnalysisProgress
+from app.services.github_scheduler import GitHubError, RateLimitExceeded
+from app.services.tree_walker import TreeWalker
+
+TREES = "https://api.github.test/repos/acme/big/git/trees"
+
+
+class FakeGitHub:
+    """Serves a truncated root listing whose subtree "b" fails with `error`."""
+
+    BASE_URL = "https://api.github.test/repos"
+
+    def __init__(self, error: Exception):
+        self.bodies = {
+            f"{TREES}/HEAD?recursive=1": {"tree": [{"path": "a/x.py", "type": "blob"}], "truncated": True},
+            f"{TREES}/HEAD": {"tree": [{"path": "a", "type": "tree", "sha": "sa"},
+                                       {"path": "b", "type": "tree", "sha": "sb"},
+                                       {"path": "README.md", "type": "blob"}], "truncated": False},
+            f"{TREES}/sa?recursive=1": {"tree": [{"path": "x.py", "type": "blob"}], "truncated": False},
+            f"{TREES}/sb?recursive=1": error,
+        }
+
+    async def _stream_bytes(self, url: str, headers: dict = None):
+        body = self.bodies[url]
+        if isinstance(body, Exception):
+            raise body
+        yield json.dumps(body).encode()
+
+
+async def walk(walker: TreeWalker) -> list:
+    async with aclosing(walker.walk("acme", "big")) as paths:
+        return sorted([path async for path in paths])
+
+
+def test_failed_subtree_is_counted():
+    walker = TreeWalker(FakeGitHub(GitHubError("GitHub returned 502")), concurrency=2)
+    assert asyncio.run(walk(walker)) == ["README.md", "a/x.py"]
+    assert walker.stats["failed_listings"] == 1
+
+
+def test_rate_limit_ends_the_walk():
+    walker = TreeWalker(FakeGitHub(RateLimitExceeded(60)), concurrency=2)
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(walk(walker))
+
+
+@pytest.mark.parametrize("tree_stats, cached", [({"entries": 2, "failed_listings": 0}, True),
+                                                ({"entries": 2, "failed_listings": 1}, False)])
+def test_incomplete_file_list_is_not_cached(tree_stats, cached):
+    key = f"acme|big|{'0' * 40}|failed-{tree_stats['failed_listings']}"
+    prepared = {
+        "head_sha": "0" * 40, "cache_key": key, "state": None, "base_score": 50, "detected_stack": None,
+        "file_structure": ["README.md", "a/x.py"], "repo_data": {"files": ["README.md", "a/x.py"],
+                                                                 "tree_stats": tree_stats},
+        "details": RepoDetails(name="big", owner="acme", stars=0, forks=0, open_issues=0),
+    }
+
+    async def finish():
+        try:
+            async with database.AsyncSessionLocal() as db:
+                return await analyze._finish_analysis(db, "acme", "big", prepared, {"summary": "Fine."},
+                                                      AnalysisProgress())
+        finally:
+            await database.async_engine.dispose()
+
+    analysis = asyncio.run(finish())
+    assert (analysis["cache_key"] == key) is cached
+    assert (analyze.result_cache.memory.get(key) is not None) is cached